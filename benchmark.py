@@ -0,0 +1,325 @@
+"""
+Benchmark suite on synthetic data (src/synthetic.py).
+
+    python benchmark.py --sizes 1000 10000 100000
+    python benchmark.py --save-baseline
+    python benchmark.py --baseline benchmarks/baseline.json
+
+For every size (MA1 students per year) a dataset is generated and the
+pipeline is timed stage by stage: ingestion, process_all_data,
+create_merged_data, each analysis of compute_all_statistics and each figure.
+The results are written as JSON with the scaling exponent of every stage
+(the slope of log time over log size) and compared against a stored
+baseline.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import sys
+import tempfile
+
+from src import profiling
+from src.analysis import compute_all_statistics
+from src.ingestion import load_all_csvs
+from src.processing import create_merged_data, process_all_data
+from src.synthetic import generate_dataset
+
+SIZES = [1000, 5000]
+# Students per year of the untimed warm-up run, which pays for the lazy
+# imports (scipy, matplotlib) so they are not timed as part of a stage
+WARMUP_SIZE = 100
+YEARS = range(2018, 2025)
+RESULTS_FILE = "output/benchmark.json"
+BASELINE_FILE = "benchmarks/baseline.json"
+
+# A stage is a regression when it is this much slower than the baseline...
+REGRESSION_RATIO = 1.25
+# ...and slower by at least this many seconds (ignores timer noise)
+REGRESSION_MIN_SECONDS = 0.05
+
+# Stages timed directly; analyses and figures come from their own
+# "analysis.*" and "figure.*" profiling stages
+PIPELINE_STAGES = [
+    "load_all_csvs",
+    "process_all_data",
+    "create_merged_data",
+    "compute_all_statistics",
+    "generate_all_visualizations",
+]
+
+
+def run_pipeline(data_dir, figures=True):
+    """Run the pipeline on `data_dir` once; returns {stage: wall seconds}."""
+    profiling.start(memory=False)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            with profiling.stage("load_all_csvs") as timed:
+                data = load_all_csvs(data_dir, verbose=False)
+                timed["rows"] = sum(
+                    len(df) for ys in data.values() for df in ys.values()
+                )
+            with profiling.stage("process_all_data", timed["rows"]):
+                processed = process_all_data(data)
+            del data
+            with profiling.stage("create_merged_data"):
+                merged = create_merged_data(processed)
+            with profiling.stage("compute_all_statistics"):
+                stats = compute_all_statistics(processed, merged)
+            if figures:
+                from src.visualization import generate_all_visualizations
+
+                with tempfile.TemporaryDirectory() as output_dir:
+                    with profiling.stage("generate_all_visualizations"):
+                        generate_all_visualizations(
+                            merged, stats, output_dir, use_cache=False
+                        )
+    finally:
+        records = profiling.stop()
+
+    return {
+        s["stage"]: s["wall_s"]
+        for s in profiling.summarize(records)
+        if s["stage"] in PIPELINE_STAGES
+        or s["stage"].startswith(("analysis.", "figure."))
+    }
+
+
+def run_suite(sizes, years=YEARS, repeat=1, figures=True, seed=0, work_dir=None):
+    """
+    Time the pipeline on a generated dataset of every size, keeping the
+    fastest of `repeat` runs per stage. Returns {size: {stage: seconds}}.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory(dir=work_dir) as root:
+        warmup_dir = os.path.join(root, "warmup")
+        generate_dataset(warmup_dir, students=WARMUP_SIZE, years=years, seed=seed)
+        run_pipeline(warmup_dir, figures)
+
+        for size in sizes:
+            data_dir = os.path.join(root, str(size))
+            print(f"Generating {size} students per year...")
+            generate_dataset(data_dir, students=size, years=years, seed=seed)
+
+            times = {}
+            for i in range(repeat):
+                print(f"  - Run {i + 1}/{repeat}")
+                for name, seconds in run_pipeline(data_dir, figures).items():
+                    times[name] = min(times.get(name, math.inf), seconds)
+            results[size] = times
+    return results
+
+
+def scaling_exponents(results):
+    """Least-squares slope of log(seconds) over log(size) for every stage."""
+    exponents = {}
+    stages = {name for times in results.values() for name in times}
+    for name in stages:
+        points = [
+            (math.log(size), math.log(times[name]))
+            for size, times in results.items()
+            if times.get(name, 0) > 0
+        ]
+        if len(points) < 2:
+            continue
+        mean_x = sum(x for x, _ in points) / len(points)
+        mean_y = sum(y for _, y in points) / len(points)
+        var = sum((x - mean_x) ** 2 for x, _ in points)
+        if var > 0:
+            cov = sum((x - mean_x) * (y - mean_y) for x, y in points)
+            exponents[name] = round(cov / var, 3)
+    return exponents
+
+
+def compare(results, baseline):
+    """(size, stage, baseline s, current s, ratio) for every regressed stage."""
+    regressions = []
+    for size, times in results.items():
+        base = baseline.get("results", {}).get(str(size), {})
+        for name, seconds in times.items():
+            if name not in base or base[name] <= 0:
+                continue
+            ratio = seconds / base[name]
+            if (
+                ratio > REGRESSION_RATIO
+                and seconds - base[name] >= REGRESSION_MIN_SECONDS
+            ):
+                regressions.append((size, name, base[name], seconds, ratio))
+    return regressions
+
+
+def format_results(results, exponents, baseline=None):
+    """Seconds per stage and size, with the scaling exponent and the ratio to
+    the baseline at the largest size."""
+    sizes = sorted(results)
+    stages = sorted(
+        {name for times in results.values() for name in times},
+        key=lambda name: (
+            PIPELINE_STAGES.index(name) if name in PIPELINE_STAGES else 99,
+            name,
+        ),
+    )
+    base = (baseline or {}).get("results", {}).get(str(sizes[-1]), {})
+
+    width = max(len("Stage"), *(len(name) for name in stages))
+    header = f"{'Stage':<{width}}" + "".join(f" {size:>10,}" for size in sizes)
+    header += f" {'Exponent':>8}"
+    if baseline:
+        header += f" {'vs base':>8}"
+    lines = [header]
+    for name in stages:
+        line = f"{name:<{width}}"
+        for size in sizes:
+            seconds = results[size].get(name)
+            line += f" {'-':>10}" if seconds is None else f" {seconds:>10.3f}"
+        exponent = exponents.get(name)
+        line += f" {'-':>8}" if exponent is None else f" {exponent:>8.2f}"
+        if baseline:
+            seconds = results[sizes[-1]].get(name)
+            if name in base and base[name] > 0 and seconds is not None:
+                line += f" {seconds / base[name]:>7.2f}x"
+            else:
+                line += f" {'-':>8}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def plot_scaling(results, path):
+    """Log-log plot of the pipeline stages' time over size."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    sizes = sorted(results)
+    fig, ax = plt.subplots(figsize=(10, 6))
+    for name in PIPELINE_STAGES:
+        seconds = [results[size].get(name) for size in sizes]
+        if all(s is not None for s in seconds):
+            ax.plot(sizes, seconds, marker="o", label=name)
+    ax.set_xscale("log")
+    ax.set_yscale("log")
+    ax.set_xlabel("MA1 students per year")
+    ax.set_ylabel("Seconds")
+    ax.set_title("Benchmark scaling")
+    ax.legend()
+    ax.grid(True, which="both", alpha=0.3)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fig.savefig(path, dpi=150, bbox_inches="tight")
+    plt.close(fig)
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="MATAN benchmark suite")
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=int,
+        default=SIZES,
+        help="MA1 students per year of each generated dataset (1000 to 1000000)",
+    )
+    parser.add_argument(
+        "--years",
+        type=int,
+        default=len(YEARS),
+        help=f"years per dataset, starting at {YEARS[0]}",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="runs per size; the fastest counts"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="generator seed")
+    parser.add_argument(
+        "--no-figures", action="store_true", help="skip figure generation"
+    )
+    parser.add_argument(
+        "--work-dir", help="where to generate the datasets (default: system temp)"
+    )
+    parser.add_argument(
+        "--output", default=RESULTS_FILE, help="JSON file for the results"
+    )
+    parser.add_argument("--plot", metavar="PNG", help="write a scaling plot")
+    parser.add_argument(
+        "--baseline",
+        nargs="?",
+        const=BASELINE_FILE,
+        metavar="FILE",
+        help=f"compare against a stored baseline (default: {BASELINE_FILE}); "
+        "exits with an error on regressions",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        nargs="?",
+        const=BASELINE_FILE,
+        metavar="FILE",
+        help=f"store the results as the baseline (default: {BASELINE_FILE})",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    years = range(YEARS[0], YEARS[0] + args.years)
+
+    baseline = None
+    if args.baseline:
+        # Timings are machine-specific, so no baseline ships with the repo
+        if not os.path.exists(args.baseline):
+            sys.exit(
+                f"Baseline {args.baseline} not found; record one on this machine "
+                f"with --save-baseline first"
+            )
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = run_suite(
+        sorted(set(args.sizes)),
+        years=years,
+        repeat=args.repeat,
+        figures=not args.no_figures,
+        seed=args.seed,
+        work_dir=args.work_dir,
+    )
+    exponents = scaling_exponents(results)
+    data = {
+        "years": [years.start, years.stop - 1],
+        "seed": args.seed,
+        "figures": not args.no_figures,
+        "results": {str(size): times for size, times in results.items()},
+        "exponents": exponents,
+    }
+
+    print()
+    print(format_results(results, exponents, baseline))
+    write_json(args.output, data)
+    print(f"\nResults written to {args.output}")
+    if args.plot:
+        plot_scaling(results, args.plot)
+        print(f"Scaling plot written to {args.plot}")
+    if args.save_baseline:
+        write_json(args.save_baseline, data)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if baseline:
+        regressions = compare(results, baseline)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+            for size, name, before, after, ratio in regressions:
+                print(
+                    f"  - {name} at {size:,}: {before:.3f}s -> {after:.3f}s "
+                    f"({ratio:.2f}x)"
+                )
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
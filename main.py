@@ -1,12 +1,43 @@
+import argparse
 import os
+import re
+import subprocess
+import sys
 import pandas as pd
-from src.ingestion import load_all_csvs
-from src.processing import process_all_data, create_merged_data
-from src.analysis import compute_all_statistics
-from src.visualization import generate_all_visualizations
+from src.processing import create_merged_data
+from src.pipeline import load_and_process
+from src.analysis import ANALYSES, compute_all_statistics, needs_merged
+from src.report import REPORT_ANALYSES, REPORT_TITLE, write_html_report
+from src.export import export_processed, export_stats, load_processed
+from src.preview import PREVIEW_FRACTION
+from src import profiling
 
 DATA_DIR = "data/MATAN"
 OUTPUT_DIR = "output"
+# Processes used to process data and render figures; None means one per CPU,
+# 1 runs inline
+WORKERS = None
+
+# Import of main.py must stay under this budget and must not pull in these
+STARTUP_BUDGET_SECONDS = 1.0
+HEAVY_MODULES = ["matplotlib", "seaborn", "scipy"]
+
+PROFILE_FILE = "profile.json"
+# With --quarantine, rows failing data checks go to this subdirectory of
+# --output-dir
+QUARANTINE_DIR = "quarantine"
+QUALITY_FILE = "data_quality.json"
+# With --preview, outputs go to this subdirectory of --output-dir
+PREVIEW_DIR = "preview"
+PREVIEW_FILE = "preview.json"
+
+OUTPUTS = ["figures", "reports", "html", "export", "processed", "summary"]
+# Analyses each output reads; "export" writes whatever was computed
+OUTPUT_ANALYSES = {
+    "reports": ["single_course", "correlation"],
+    "html": REPORT_ANALYSES,
+    "summary": ["single_course", "correlation", "easiest_hardest", "ma2_pass_model"],
+}
 
 
 def save_summary_csv(stats, output_dir):
@@ -64,25 +95,19 @@ def save_summary_csv(stats, output_dir):
     print(f"  - correlation_analysis.csv... saved")
 
 
-def print_summary(stats):
+def print_summary(stats, title="SUMMARY"):
     print("\n" + "=" * 50)
-    print("SUMMARY")
+    print(title)
     print("=" * 50)
 
-    total_ma1 = sum(s["total_students"] for s in stats["single_course"]["MA1"].values())
-    total_ma2 = sum(s["total_students"] for s in stats["single_course"]["MA2"].values())
-
-    avg_pass_ma1 = sum(
-        s["pass_rate"] for s in stats["single_course"]["MA1"].values()
-    ) / len(stats["single_course"]["MA1"])
-    avg_pass_ma2 = sum(
-        s["pass_rate"] for s in stats["single_course"]["MA2"].values()
-    ) / len(stats["single_course"]["MA2"])
-
-    print(f"Total MA1 student records: {total_ma1}")
-    print(f"Total MA2 student records: {total_ma2}")
-    print(f"Average pass rate MA1: {avg_pass_ma1*100:.1f}%")
-    print(f"Average pass rate MA2: {avg_pass_ma2*100:.1f}%")
+    for course in ["MA1", "MA2"]:
+        course_stats = stats["single_course"][course].values()
+        if not course_stats:
+            continue
+        total = sum(s["total_students"] for s in course_stats)
+        avg_pass = sum(s["pass_rate"] for s in course_stats) / len(course_stats)
+        print(f"Total {course} student records: {total}")
+        print(f"Average pass rate {course}: {avg_pass*100:.1f}%")
 
     correlations = [
         c["pearson_points"]
@@ -93,49 +118,494 @@ def print_summary(stats):
         avg_corr = sum(correlations) / len(correlations)
         print(f"Average correlation (points): {avg_corr:.3f}")
 
-    total_ma2_before = sum(c["ma2_before_ma1"] for c in stats["correlation"].values())
-    print(f"Students who passed MA2 before MA1: {total_ma2_before}")
+    model = stats.get("ma2_pass_model")
+    if model and model["cv"]:
+        print(
+            f"MA2 pass model (5-fold CV): AUC {model['cv']['auc']:.3f}, accuracy {model['cv']['accuracy']*100:.1f}%"
+        )
+
+    if stats["correlation"]:
+        total_ma2_before = sum(
+            c["ma2_before_ma1"] for c in stats["correlation"].values()
+        )
+        print(f"Students who passed MA2 before MA1: {total_ma2_before}")
 
-    eh = stats["easiest_hardest"]
-    if eh["easiest"]:
+    eh = stats["easiest_hardest"] or {}
+    if eh.get("easiest"):
         print(
             f"\nEasiest exam: {eh['easiest']['course']} {eh['easiest']['year']} ({eh['easiest']['pass_rate']*100:.1f}%)"
         )
-    if eh["hardest"]:
+    if eh.get("hardest"):
         print(
             f"Hardest exam: {eh['hardest']['course']} {eh['hardest']['year']} ({eh['hardest']['pass_rate']*100:.1f}%)"
         )
 
 
-def main():
+def check_startup(budget=STARTUP_BUDGET_SECONDS):
+    """
+    Time `import main` in a fresh interpreter with -X importtime and check it
+    against the budget and the list of modules that must be imported lazily.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+    )
+
+    total_us = 0
+    imported = set()
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)", line)
+        if not match:
+            continue
+        cumulative, indent, module = match.groups()
+        imported.add(module.split(".")[0])
+        if len(indent) == 1:
+            total_us += int(cumulative)
+
+    seconds = total_us / 1e6
+    heavy = sorted(m for m in HEAVY_MODULES if m in imported)
+
+    print(f"Startup import time: {seconds:.3f}s (budget {budget:.3f}s)")
+    if heavy:
+        print(f"Heavy modules imported at startup: {', '.join(heavy)}")
+
+    return result.returncode == 0 and seconds <= budget and not heavy
+
+
+def parse_years(value):
+    """Parse "2021", "2019-2021" or "2019,2021-2023" into a list of years."""
+    years = []
+    for part in value.split(","):
+        start, _, end = part.strip().partition("-")
+        try:
+            years.extend(range(int(start), int(end or start) + 1))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid year range: {part!r}")
+    return years
+
+
+def parse_window(value):
+    """Parse a COVID window given as name=start-end."""
+    match = re.fullmatch(r"(\w+)=(\d{4})(?:-(\d{4}))?", value.strip())
+    if not match:
+        raise argparse.ArgumentTypeError(f"expected name=start-end, got {value!r}")
+    name, start, end = match.groups()
+    return name, (int(start), int(end or start))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="MATAN Analysis Tool")
+    parser.add_argument(
+        "--data-dir",
+        default=DATA_DIR,
+        help="directory of CSV files, or an SQLite database made with --ingest",
+    )
+    parser.add_argument(
+        "--ingest",
+        metavar="DB",
+        help="append the CSVs from --data-dir to the SQLite database DB and exit",
+    )
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, help="output directory")
+    parser.add_argument(
+        "--courses", nargs="+", choices=["MA1", "MA2"], help="courses to load"
+    )
+    parser.add_argument(
+        "--years",
+        nargs="+",
+        type=parse_years,
+        help="years to load, e.g. 2021, 2019-2021 or 2019,2021",
+    )
+    parser.add_argument(
+        "--analyses", nargs="+", choices=ANALYSES, help="analyses to compute"
+    )
+    parser.add_argument(
+        "--figures",
+        nargs="+",
+        metavar="FIGURE",
+        help="figures to render (see src/visualization.py FIGURE_INPUTS)",
+    )
+    parser.add_argument(
+        "--outputs",
+        nargs="+",
+        choices=OUTPUTS,
+        help="outputs to produce (default: all, or only figures with --figures)",
+    )
+    parser.add_argument(
+        "--covid-window",
+        action="append",
+        type=parse_window,
+        metavar="NAME=START-END",
+        help="COVID comparison window, repeatable (default: analysis.COVID_WINDOWS)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=WORKERS,
+        help="processes used to process data and render figures (1 runs inline)",
+    )
+    parser.add_argument(
+        "--from-processed",
+        action="store_true",
+        help="reload processed data exported to <output-dir>/processed "
+        "instead of parsing the CSVs",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=float,
+        metavar="MB",
+        help="process one course-year at a time and fail if peak RSS exceeds MB",
+    )
+    parser.add_argument(
+        "--quarantine",
+        action="store_true",
+        help="drop rows failing the data-quality checks and write them to "
+        f"<output-dir>/{QUARANTINE_DIR}",
+    )
+    parser.add_argument(
+        "--preview",
+        nargs="?",
+        const=PREVIEW_FRACTION,
+        type=float,
+        metavar="FRACTION",
+        help="run on a stratified sample of FRACTION of every course-year "
+        f"(default {PREVIEW_FRACTION}) and estimate the headline statistics with "
+        f"error bounds; outputs go to <output-dir>/{PREVIEW_DIR}",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="",
+        metavar="FILE",
+        help="record time and memory of every stage and write a JSON trace to "
+        f"FILE (default: <output-dir>/{PROFILE_FILE})",
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="with --profile, trace allocations with tracemalloc; this slows "
+        "the run down, so use --no-profile-memory for accurate timings",
+    )
+    parser.add_argument(
+        "--profile-table",
+        action="store_true",
+        help="with --profile, also print a per-stage table at the end",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="serve analyses and figures over HTTP from memory (see src/server.py)",
+    )
+    parser.add_argument("--port", type=int, default=8765, help="port for --serve")
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running and reprocess CSVs added to or changed in --data-dir",
+    )
+    parser.add_argument(
+        "--stats-only",
+        action="store_true",
+        help="compute statistics and CSV reports only, without figures",
+    )
+    parser.add_argument(
+        "--check-startup",
+        action="store_true",
+        help="check the import time of main.py against the startup budget",
+    )
+    args = parser.parse_args(argv)
+
+    if args.years is not None:
+        args.years = sorted({year for years in args.years for year in years})
+
+    if args.outputs is None:
+        if args.figures is not None and args.analyses is None:
+            args.outputs = ["figures"]
+        else:
+            args.outputs = list(OUTPUTS)
+    if args.stats_only:
+        args.outputs = [o for o in args.outputs if o != "figures"]
+    if args.quarantine and args.from_processed:
+        parser.error(
+            "--quarantine checks raw rows and cannot be combined with --from-processed"
+        )
+    if args.preview is not None:
+        if not 0 < args.preview <= 1:
+            parser.error("--preview FRACTION must be in (0, 1]")
+        if args.from_processed or args.memory_budget is not None:
+            parser.error(
+                "--preview cannot be combined with --from-processed or --memory-budget"
+            )
+        args.output_dir = os.path.join(args.output_dir, PREVIEW_DIR)
+
+    return args
+
+
+def required_analyses(args, figure_analyses=None):
+    """
+    Analyses needed for the selected outputs, or None (all) when neither
+    analyses nor figures were selected.
+    """
+    if args.analyses is None and args.figures is None:
+        return None
+
+    needed = list(args.analyses or [])
+    if "figures" in args.outputs:
+        needed += figure_analyses(args.figures)
+    for output in args.outputs:
+        needed += OUTPUT_ANALYSES.get(output, [])
+    return sorted(set(needed), key=ANALYSES.index)
+
+
+def write_outputs(args, processed, merged, stats, changed=None):
+    if "figures" in args.outputs:
+        from src.visualization import generate_all_visualizations
+
+        with profiling.stage("output.figures"):
+            generate_all_visualizations(
+                merged,
+                stats,
+                args.output_dir,
+                workers=args.workers,
+                figures=args.figures,
+            )
+
+    if "reports" in args.outputs:
+        print("\nSaving reports...")
+        with profiling.stage("output.reports"):
+            save_summary_csv(stats, args.output_dir)
+
+    if "html" in args.outputs:
+        print("\nWriting HTML report...")
+        with profiling.stage("output.html"):
+            title = REPORT_TITLE
+            if args.preview is not None:
+                title += f" (PREGLED: uzorak {args.preview:.0%}, procjene)"
+            write_html_report(stats, args.output_dir, title=title)
+
+    # --memory-budget only keeps compact frames, which are not exported
+    if (
+        "processed" in args.outputs
+        and not args.from_processed
+        and args.memory_budget is None
+    ):
+        print("\nExporting processed data...")
+        with profiling.stage("output.processed"):
+            export_processed(processed, merged, args.output_dir, changed)
+
+    if "export" in args.outputs:
+        print("\nExporting statistics tables...")
+        with profiling.stage("output.export"):
+            export_stats(stats, args.output_dir)
+
+    if "summary" in args.outputs:
+        if args.preview is None:
+            print_summary(stats)
+        else:
+            print_summary(stats, "SUMMARY (PREVIEW: SAMPLE ONLY)")
+
+
+def write_quarantine_report(args, processed):
+    """Report rows quarantined while loading and the data-quality counts."""
+    from src import validation
+
+    counts = validation.stop_quarantine()
+    directory = os.path.join(args.output_dir, QUARANTINE_DIR)
+    path = os.path.join(directory, QUALITY_FILE)
+    validation.write_report(path, processed)
+    total = sum(counts.values())
+    print(f"  - Quarantined {total} rows from {len(counts)} course-years")
+    print(f"  - Data-quality report saved to: {path}")
+
+
+def write_preview(args, data, processed, merged, designs, stats):
+    """Estimate the headline statistics of a --preview run and write them."""
+    import json
+
+    from src.preview import format_estimates, preview_estimates
+
+    estimates = preview_estimates(data, processed, merged, designs, stats)
+    path = os.path.join(args.output_dir, PREVIEW_FILE)
+    os.makedirs(args.output_dir, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"fraction": args.preview, "estimates": estimates}, f, indent=1)
+
+    print("\n" + "=" * 50)
+    print(f"PREVIEW ({args.preview:.0%} stratified sample, 95% bounds)")
+    print("=" * 50)
+    print(format_estimates(estimates))
+    print(f"\nPreview estimates saved to: {path}")
+    print("All other outputs were computed on the sample only.")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.check_startup:
+        sys.exit(0 if check_startup() else 1)
+
+    if args.quarantine:
+        from src import validation
+
+        validation.start_quarantine(os.path.join(args.output_dir, QUARANTINE_DIR))
+
+    if args.serve:
+        from src.server import serve
+
+        covid_windows = dict(args.covid_window) if args.covid_window else None
+        serve(args.data_dir, port=args.port, covid_windows=covid_windows)
+        return
+
+    if args.watch:
+        from src.watch import watch
+
+        def on_update(processed, merged, stats, changed):
+            write_outputs(args, processed, merged, stats, changed)
+
+        covid_windows = dict(args.covid_window) if args.covid_window else None
+        watch(
+            args.data_dir,
+            on_update,
+            covid_windows=covid_windows,
+            courses=args.courses,
+            years=args.years,
+        )
+        return
+
+    if args.ingest:
+        from src.storage import ingest_csvs
+
+        print(f"Ingesting {args.data_dir} into {args.ingest}...")
+        ingest_csvs(args.ingest, args.data_dir, courses=args.courses, years=args.years)
+        if args.quarantine:
+            from src import validation
+
+            counts = validation.stop_quarantine()
+            print(f"Quarantined {sum(counts.values())} rows; they were not ingested")
+        return
+
+    figures = "figures" in args.outputs
+    if figures:
+        from src.visualization import figure_analyses, resolve_figures
+
+        try:
+            resolve_figures(args.figures)
+        except ValueError as e:
+            sys.exit(str(e))
+    else:
+        figure_analyses = None
+
+    analyses = required_analyses(args, figure_analyses)
+    use_merged = needs_merged(analyses) or (
+        figures and "scatter_points" in resolve_figures(args.figures)
+    )
+
     print("=" * 50)
     print("MATAN Analysis Tool")
     print("=" * 50)
 
-    print("\nLoading data...")
-    data = load_all_csvs(DATA_DIR)
+    if args.profile is not None:
+        profiling.start(memory=args.profile_memory)
+
+    covid_windows = dict(args.covid_window) if args.covid_window else None
+    stats = None
+    if args.from_processed:
+        print("\nLoading processed data...")
+        with profiling.stage("load_processed"):
+            processed, merged = load_processed(
+                args.output_dir,
+                courses=None if args.courses is None else args.courses + ["merged"],
+                years=args.years,
+            )
+        if not use_merged:
+            merged = {}
+        elif not merged:
+            merged = create_merged_data(processed)
+    elif args.preview is not None:
+        from src.ingestion import load_all_csvs
+        from src.preview import load_preview
 
-    print("\nProcessing data...")
-    processed = process_all_data(data)
-    merged = create_merged_data(processed)
+        print(f"\nLoading data for a {args.preview:.0%} stratified preview...")
+        with profiling.stage("load_preview"):
+            data = load_all_csvs(args.data_dir, courses=args.courses, years=args.years)
+            processed, merged, designs = load_preview(
+                data, args.preview, merge=use_merged
+            )
+    elif args.memory_budget is not None:
+        from src.bounded import run_bounded
+
+        print(
+            f"\nLoading, processing and analyzing one course-year at a time "
+            f"({args.memory_budget:.0f} MB budget)..."
+        )
+        try:
+            with profiling.stage("run_bounded"):
+                processed, merged, stats, _ = run_bounded(
+                    args.data_dir,
+                    args.memory_budget,
+                    courses=args.courses,
+                    years=args.years,
+                    covid_windows=covid_windows,
+                    analyses=analyses,
+                    merge=use_merged,
+                )
+        except MemoryError as e:
+            sys.exit(str(e))
+    else:
+        print("\nLoading and processing data...")
+        with profiling.stage("load_and_process"):
+            processed, merged = load_and_process(
+                args.data_dir,
+                courses=args.courses,
+                years=args.years,
+                workers=args.workers,
+                merge=use_merged,
+            )
     print(f"  - Processed {len(processed['MA1'])} years of MA1 data")
     print(f"  - Processed {len(processed['MA2'])} years of MA2 data")
     print(f"  - Created {len(merged)} merged datasets")
 
-    print("\nRunning analyses...")
-    stats = compute_all_statistics(processed, merged)
-    print("  - Single course statistics... done")
-    print("  - Correlation analysis... done")
-    print("  - COVID impact analysis... done")
+    if args.quarantine:
+        write_quarantine_report(args, processed)
+
+    if stats is None:
+        print("\nRunning analyses...")
+        with profiling.stage("analyses"):
+            stats = compute_all_statistics(processed, merged, covid_windows, analyses)
+        if analyses is None:
+            print("  - Single course statistics... done")
+            print("  - Correlation analysis... done")
+            print("  - COVID impact analysis... done")
+            print("  - MA2 pass prediction model... done")
+        else:
+            print(f"  - {', '.join(analyses)}... done")
+
+    with profiling.stage("outputs"):
+        write_outputs(args, processed, merged, stats)
+
+    if args.preview is not None:
+        write_preview(args, data, processed, merged, designs, stats)
 
-    generate_all_visualizations(processed, merged, stats, OUTPUT_DIR)
+    print(f"\nOutput saved to: {args.output_dir}/")
 
-    print("\nSaving reports...")
-    save_summary_csv(stats, OUTPUT_DIR)
+    if args.profile is not None:
+        trace = profiling.stop()
+        path = args.profile or os.path.join(args.output_dir, PROFILE_FILE)
+        profiling.write_trace(path, trace)
+        print(f"Profile written to: {path}")
+        if args.profile_table:
+            print()
+            print(profiling.format_table(trace))
 
-    print_summary(stats)
+    if args.memory_budget is not None:
+        from src.bounded import peak_rss_mb
 
-    print(f"\nOutput saved to: {OUTPUT_DIR}/")
+        peak = peak_rss_mb()
+        if peak is not None:
+            print(f"Peak RSS: {peak:.0f} MB (budget {args.memory_budget:.0f} MB)")
+            if peak > args.memory_budget:
+                sys.exit("Peak RSS exceeded the memory budget while writing outputs")
 
 
 if __name__ == "__main__":
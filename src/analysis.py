@@ -1,20 +1,26 @@
 import pandas as pd
 import numpy as np
-from scipy import stats
 
+from src.prediction import ma2_pass_model
+from src.profiling import stage
+from src.processing import grade_boundaries
+from src.whatif import threshold_what_if
 
-def detect_pass_threshold(df, year=None):
+GRADES = [2, 3, 4, 5]
+
+# 5-point bins over the 0-100 points range
+HISTOGRAM_EDGES = np.linspace(0, 100, 21)
 
-    try:
-        year_int = int(year) if year is not None else None
-    except Exception:
-        year_int = None
+# Inclusive (first_year, last_year) windows compared by covid_impact_analysis
+COVID_WINDOWS = {
+    "pre_covid": (2018, 2018),
+    "covid": (2019, 2020),
+    "post_covid": (2021, 2024),
+}
 
-    if year_int is not None:
-        return 45 if year_int <= 2022 else 50
 
-    # If year is unknown, default to 50
-    return 50
+def detect_pass_threshold(df, year=None):
+    return grade_boundaries(year)[0]
 
 
 def single_course_stats(df, course, year):
@@ -170,6 +176,8 @@ def failed_attempts_distribution(df):
 
 
 def correlation_analysis(merged_df):
+    from scipy import stats
+
     both_passed = merged_df[merged_df["both_passed"]].copy()
     both_passed = both_passed.dropna(
         subset=["ma1_points", "ma2_points", "ma1_grade", "ma2_grade"]
@@ -233,53 +241,93 @@ def correlation_analysis(merged_df):
     }
 
 
-def ma1_predicts_ma2(merged_df):
-    ma1_passed = merged_df[merged_df["ma1_passed"]].copy()
-    ma1_passed = ma1_passed.dropna(subset=["ma1_grade"])
+def grade_tensor(merged):
+    """
+    Count MA1 -> MA2 grade transitions for all years with a single bincount.
+
+    Returns a dict with `counts`, a years x 5 x 4 integer tensor indexed by
+    (year, MA1 grade, MA2 outcome), where the MA2 axis holds grades 2-5
+    followed by "did not pass MA2". Only students who passed MA1 are counted.
+    Per-year grade matrices and predictive tables are slices of this tensor.
+    """
+    years = sorted(merged.keys())
+    n_grades = len(GRADES)
+
+    codes = []
+    for i, year in enumerate(years):
+        df = merged[year]
+        ma1_grade = df["ma1_grade"].to_numpy(dtype=float)
+        ma2_grade = df["ma2_grade"].to_numpy(dtype=float)
+        ma2_passed = df["ma2_passed"].to_numpy(dtype=bool)
+
+        valid = df["ma1_passed"].to_numpy(dtype=bool) & np.isin(ma1_grade, GRADES)
+        ma2_idx = np.where(ma2_passed, ma2_grade - GRADES[0], n_grades)
+        valid &= ~ma2_passed | np.isin(ma2_grade, GRADES)
+
+        ma1_idx = ma1_grade[valid].astype(int) - GRADES[0]
+        codes.append(
+            (i * n_grades + ma1_idx) * (n_grades + 1) + ma2_idx[valid].astype(int)
+        )
+
+    size = len(years) * n_grades * (n_grades + 1)
+    flat = np.bincount(
+        np.concatenate(codes) if codes else np.empty(0, dtype=int), minlength=size
+    )
+
+    return {
+        "years": years,
+        "grades": list(GRADES),
+        "counts": flat.reshape(len(years), n_grades, n_grades + 1),
+    }
+
 
-    if len(ma1_passed) < 10:
+def tensor_grade_matrix(tensor, year):
+    i = tensor["years"].index(year)
+    return pd.DataFrame(
+        tensor["counts"][i, :, : len(GRADES)],
+        index=pd.Index(GRADES, name="MA1"),
+        columns=pd.Index(GRADES, name="MA2"),
+    )
+
+
+def tensor_ma1_predicts_ma2(tensor, year):
+    i = tensor["years"].index(year)
+    counts = tensor["counts"][i]
+    totals = counts.sum(axis=1)
+
+    if totals.sum() < 10:
         return None
 
+    both = counts[:, : len(GRADES)]
+    ma2_passed = both.sum(axis=1)
+    grade_sums = both @ np.array(GRADES)
+
     result = {}
-    for grade in [2, 3, 4, 5]:
-        subset = ma1_passed[ma1_passed["ma1_grade"] == grade]
-        if len(subset) == 0:
+    for g, grade in enumerate(GRADES):
+        total = int(totals[g])
+        if total == 0:
             continue
 
-        ma2_passed_count = int(subset["ma2_passed"].sum())
-        total = len(subset)
-
-        ma2_grades = subset[subset["ma2_passed"]]["ma2_grade"]
-        avg_ma2 = round(float(ma2_grades.mean()), 2) if len(ma2_grades) > 0 else None
-
         result[grade] = {
-            "total": int(total),
-            "ma2_passed": ma2_passed_count,
-            "ma2_pass_rate": round(ma2_passed_count / total, 4) if total > 0 else 0,
-            "avg_ma2_grade": avg_ma2,
+            "total": total,
+            "ma2_passed": int(ma2_passed[g]),
+            "ma2_pass_rate": round(int(ma2_passed[g]) / total, 4),
+            "avg_ma2_grade": (
+                round(float(grade_sums[g] / ma2_passed[g]), 2)
+                if ma2_passed[g] > 0
+                else None
+            ),
         }
 
     return result
 
 
-def grade_matrix(merged_df):
-    both = merged_df[merged_df["both_passed"]].copy()
-    both["ma1_grade_int"] = both["ma1_grade"].astype(int)
-    both["ma2_grade_int"] = both["ma2_grade"].astype(int)
-
-    matrix = pd.crosstab(
-        both["ma1_grade_int"], both["ma2_grade_int"], rownames=["MA1"], colnames=["MA2"]
-    )
-
-    for grade in [2, 3, 4, 5]:
-        if grade not in matrix.index:
-            matrix.loc[grade] = 0
-        if grade not in matrix.columns:
-            matrix[grade] = 0
+def ma1_predicts_ma2(merged_df):
+    return tensor_ma1_predicts_ma2(grade_tensor({0: merged_df}), 0)
 
-    matrix = matrix.reindex(index=[2, 3, 4, 5], columns=[2, 3, 4, 5], fill_value=0)
 
-    return matrix
+def grade_matrix(merged_df):
+    return tensor_grade_matrix(grade_tensor({0: merged_df}), 0)
 
 
 def year_over_year_comparison(processed, merged):
@@ -322,30 +370,161 @@ def year_over_year_comparison(processed, merged):
     return pd.DataFrame(rows)
 
 
-def covid_impact_analysis(processed):
-    pre_covid_years = [2018]
-    covid_years = [2019, 2020]
-    post_covid_years = [2021, 2022, 2023, 2024]
+YEAR_INDEX_FIELDS = [
+    "enrolled",
+    "passed",
+    "grade_sum",
+    "points_sum",
+    "attempts_sum",
+    "passed_attempts_sum",
+    "never_attempted",
+    "rejected",
+    "pass_rate_sum",
+    "years",
+]
 
-    def avg_pass_rate(years, course_data):
-        rates = []
-        for y in years:
-            if y in course_data:
-                rates.append(course_data[y]["passed"].mean())
-        return float(np.mean(rates)) if rates else None
 
+def build_year_index(processed):
+    """
+    Per-course prefix sums of yearly totals over a dense year axis.
+
+    Years without data contribute zeros, so the position of any year is
+    `year - first_year` and every window aggregate is a difference of two
+    prefix rows.
+    """
+    index = {}
+    for course in ["MA1", "MA2"]:
+        years = sorted(processed[course].keys())
+        if not years:
+            index[course] = None
+            continue
+
+        first_year = years[0]
+        n = years[-1] - first_year + 1
+        totals = np.zeros((n, len(YEAR_INDEX_FIELDS)))
+
+        for year in years:
+            df = processed[course][year]
+            passed = df["passed"].to_numpy(dtype=bool)
+            attempts = df["num_attempts"].to_numpy(dtype=float)
+            totals[year - first_year] = [
+                len(df),
+                passed.sum(),
+                np.nansum(df["final_grade"].to_numpy(dtype=float)[passed]),
+                np.nansum(df["final_points"].to_numpy(dtype=float)[passed]),
+                attempts.sum(),
+                attempts[passed].sum(),
+                (attempts == 0).sum(),
+                df["rejected_grade"].sum(),
+                passed.mean() if len(df) > 0 else 0,
+                1,
+            ]
+
+        prefix = np.zeros((n + 1, len(YEAR_INDEX_FIELDS)))
+        np.cumsum(totals, axis=0, out=prefix[1:])
+
+        index[course] = {
+            "first_year": first_year,
+            "last_year": years[-1],
+            "prefix": prefix,
+        }
+
+    return index
+
+
+def window_aggregates(index, course, starts, ends):
+    """
+    Aggregate any number of inclusive [start, end] year windows at once.
+
+    Returns a dict of arrays (one value per window). Rates are NaN for
+    windows without data.
+    """
+    course_index = index[course]
+    starts = np.atleast_1d(np.asarray(starts))
+    ends = np.atleast_1d(np.asarray(ends))
+
+    if course_index is None:
+        sums = np.zeros((len(starts), len(YEAR_INDEX_FIELDS)))
+    else:
+        prefix = course_index["prefix"]
+        n = len(prefix) - 1
+        lo = np.clip(starts - course_index["first_year"], 0, n)
+        hi = np.clip(ends - course_index["first_year"] + 1, 0, n)
+        hi = np.maximum(hi, lo)
+        sums = prefix[hi] - prefix[lo]
+
+    field = {name: sums[:, i] for i, name in enumerate(YEAR_INDEX_FIELDS)}
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "start": starts,
+            "end": ends,
+            "n_years": field["years"].astype(int),
+            "enrolled": field["enrolled"].astype(int),
+            "passed": field["passed"].astype(int),
+            "pass_rate": field["passed"] / field["enrolled"],
+            "mean_yearly_pass_rate": field["pass_rate_sum"] / field["years"],
+            "avg_grade": field["grade_sum"] / field["passed"],
+            "avg_points_passed": field["points_sum"] / field["passed"],
+            "avg_attempts": field["attempts_sum"] / field["enrolled"],
+            "avg_attempts_to_pass": field["passed_attempts_sum"] / field["passed"],
+            "never_attempted_rate": field["never_attempted"] / field["enrolled"],
+            "rejected": field["rejected"].astype(int),
+        }
+
+
+def window_aggregate(index, course, start, end):
+    result = window_aggregates(index, course, [start], [end])
+    return {
+        k: (
+            (None if np.isnan(v[0]) else float(v[0]))
+            if v.dtype.kind == "f"
+            else int(v[0])
+        )
+        for k, v in result.items()
+    }
+
+
+def rolling_windows(index, width=3):
+    """Aggregates for every `width`-year window of each course."""
     result = {}
     for course in ["MA1", "MA2"]:
-        pre = avg_pass_rate(pre_covid_years, processed[course])
-        covid = avg_pass_rate(covid_years, processed[course])
-        post = avg_pass_rate(post_covid_years, processed[course])
+        if index[course] is None:
+            result[course] = None
+            continue
+
+        starts = np.arange(
+            index[course]["first_year"], index[course]["last_year"] - width + 2
+        )
+        result[course] = pd.DataFrame(
+            window_aggregates(index, course, starts, starts + width - 1)
+        )
+    return result
+
+
+def covid_impact_analysis(processed, windows=None, index=None):
+    windows = windows or COVID_WINDOWS
+    index = index or build_year_index(processed)
+
+    starts = [start for start, end in windows.values()]
+    ends = [end for start, end in windows.values()]
+
+    result = {"windows": dict(windows)}
+    for course in ["MA1", "MA2"]:
+        # Average of the yearly pass rates, so every year weighs the same
+        rates = window_aggregates(index, course, starts, ends)["mean_yearly_pass_rate"]
+        rates = {
+            name: None if np.isnan(rate) else float(rate)
+            for name, rate in zip(windows, rates)
+        }
 
         result[course] = {
-            "pre_covid_pass_rate": round(pre, 4) if pre else None,
-            "covid_pass_rate": round(covid, 4) if covid else None,
-            "post_covid_pass_rate": round(post, 4) if post else None,
+            f"{name}_pass_rate": round(rate, 4) if rate else None
+            for name, rate in rates.items()
         }
 
+        pre = rates.get("pre_covid")
+        covid = rates.get("covid")
         if pre and covid:
             diff = covid - pre
             result[course]["covid_difference"] = round(diff, 4)
@@ -394,37 +573,24 @@ def cross_year_rejections(processed):
             df_current = processed[course][year_current]
             df_next = processed[course][year_next]
 
-            # Students who appear in both years
-            ids_current = set(df_current["id"].tolist())
-            ids_next = set(df_next["id"].tolist())
-            common_ids = ids_current & ids_next
+            # Students who appear in both years (first row per student)
+            current = df_current.drop_duplicates("id")
+            current = current[current["id"].isin(df_next["id"])]
 
-            if not common_ids:
+            if current.empty:
                 continue
 
-            # Find students who had 'DA' (passed) on any exam in current year
-            # but didn't finalize (passed = False, meaning no ISVU Ocjena)
+            # Had 'DA' (passed) on any exam in current year but didn't
+            # finalize (passed = False, meaning no ISVU Ocjena)
             exams = get_exam_columns(df_current)
-
-            rejected_students = []
-            for student_id in common_ids:
-                student_row = df_current[df_current["id"] == student_id].iloc[0]
-
-                # Check if student had 'DA' on any exam
-                had_da = False
-                for name, points_col, prolaz_col, time_col in exams:
-                    if prolaz_col in student_row.index and student_row[prolaz_col]:
-                        had_da = True
-                        break
-
-                # If they had DA but didn't finalize (passed = False)
-                if had_da and not student_row["passed"]:
-                    rejected_students.append(student_id)
+            prolaz_cols = [prolaz_col for _, _, prolaz_col, _ in exams]
+            had_da = current[prolaz_cols].astype(bool).any(axis=1)
+            rejected = current.loc[had_da & ~current["passed"].astype(bool), "id"]
 
             key = f"{year_current}->{year_next}"
             result[course][key] = {
-                "count": len(rejected_students),
-                "students": rejected_students,
+                "count": len(rejected),
+                "students": sorted(rejected.tolist()),
             }
 
     return result
@@ -436,8 +602,12 @@ def statistical_significance_tests(processed):
     1. T-test: Is MA2 significantly harder than MA1?
     2. Linear regression trend analysis for each course
     """
-    years = sorted(processed["MA1"].keys())
-    
+    from scipy import stats
+
+    years = sorted(set(processed["MA1"].keys()) & set(processed["MA2"].keys()))
+    if len(years) < 3:
+        return None
+
     ma1_rates = [processed["MA1"][y]["passed"].mean() for y in years]
     ma2_rates = [processed["MA2"][y]["passed"].mean() for y in years]
     
@@ -472,25 +642,16 @@ def statistical_significance_tests(processed):
     }
 
 
-def grade_transition_analysis(grade_matrices):
+def grade_transition_analysis(tensor):
     """
     Analyze how grades change from MA1 to MA2.
     """
-    improved = 0
-    same = 0
-    dropped = 0
-    
-    for year, matrix in grade_matrices.items():
-        for ma1 in [2, 3, 4, 5]:
-            for ma2 in [2, 3, 4, 5]:
-                count = matrix.loc[ma1, ma2] if ma1 in matrix.index and ma2 in matrix.columns else 0
-                if ma2 > ma1:
-                    improved += count
-                elif ma2 == ma1:
-                    same += count
-                else:
-                    dropped += count
-    
+    both = tensor["counts"][:, :, : len(GRADES)].sum(axis=0)
+
+    improved = np.triu(both, k=1).sum()
+    same = np.trace(both)
+    dropped = np.tril(both, k=-1).sum()
+
     total = improved + same + dropped
     return {
         "improved": int(improved),
@@ -536,16 +697,162 @@ def perfect_scores_analysis(processed):
     return result
 
 
-def compute_all_statistics(processed, merged):
+def exam_histograms(processed, edges=HISTOGRAM_EDGES):
+    """
+    Pre-binned exam points of passed and failed attempts for every
+    course-year-exam, counted with a single bincount over all of them.
+
+    Returns hist[course][year] = {"exams", "edges", "passed", "failed"} where
+    "passed"/"failed" are (n_exams, n_bins) count arrays. Points outside the
+    edges are clipped into the first/last bin.
+    """
+    from src.processing import get_exam_columns
+
+    edges = np.asarray(edges, dtype=float)
+    n_bins = len(edges) - 1
+
+    groups = []
+    for course in ["MA1", "MA2"]:
+        for year in sorted(processed[course].keys()):
+            groups.append((course, year, get_exam_columns(processed[course][year])))
+    max_exams = max((len(exams) for _, _, exams in groups), default=0)
+
+    codes = []
+    for g, (course, year, exams) in enumerate(groups):
+        if not exams:
+            continue
+        df = processed[course][year]
+        points = df[[points_col for _, points_col, _, _ in exams]].to_numpy(float)
+        passed = df[[prolaz_col for _, _, prolaz_col, _ in exams]].to_numpy(bool)
+        points = np.nan_to_num(points, nan=0.0)
+
+        counted = passed | (points > 0)
+        bins = np.clip(np.searchsorted(edges, points, side="right") - 1, 0, n_bins - 1)
+        exam_idx = np.broadcast_to(np.arange(len(exams)), points.shape)
+
+        code = ((g * max_exams + exam_idx) * n_bins + bins) * 2 + passed
+        codes.append(code[counted])
+
+    counts = np.bincount(
+        np.concatenate(codes) if codes else np.empty(0, dtype=int),
+        minlength=len(groups) * max_exams * n_bins * 2,
+    ).reshape(len(groups), max_exams, n_bins, 2)
+
+    result = {"MA1": {}, "MA2": {}}
+    for g, (course, year, exams) in enumerate(groups):
+        result[course][year] = {
+            "exams": [name for name, _, _, _ in exams],
+            "edges": edges,
+            "passed": counts[g, : len(exams), :, 1],
+            "failed": counts[g, : len(exams), :, 0],
+        }
+    return result
+
+
+# Every analysis in compute_all_statistics, in the order it is computed
+ANALYSES = [
+    "single_course",
+    "pass_by_exam",
+    "attempts_dist",
+    "failed_attempts_dist",
+    "correlation",
+    "grade_tensor",
+    "grade_matrix",
+    "ma1_predicts_ma2",
+    "year_comparison",
+    "year_index",
+    "rolling_windows",
+    "covid_impact",
+    "easiest_hardest",
+    "cross_year_rejections",
+    "statistical_tests",
+    "grade_transition",
+    "dropout",
+    "perfect_scores",
+    "ma2_pass_model",
+    "threshold_what_if",
+    "points_histograms",
+]
+
+ANALYSIS_DEPENDENCIES = {
+    "grade_matrix": ["grade_tensor"],
+    "ma1_predicts_ma2": ["grade_tensor"],
+    "grade_transition": ["grade_tensor"],
+    "rolling_windows": ["year_index"],
+    "covid_impact": ["year_index"],
+}
+
+# Analyses that read the merged MA1/MA2 frames
+MERGED_ANALYSES = {"correlation", "grade_tensor", "year_comparison"}
+
+
+def resolve_analyses(names=None):
+    """Selected analyses plus everything they depend on, in ANALYSES order."""
+    if names is None:
+        return list(ANALYSES)
+
+    unknown = set(names) - set(ANALYSES)
+    if unknown:
+        raise ValueError(f"Unknown analyses: {', '.join(sorted(unknown))}")
+
+    selected = set()
+    pending = list(names)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(ANALYSIS_DEPENDENCIES.get(name, []))
+
+    return [name for name in ANALYSES if name in selected]
+
+
+def needs_merged(names=None):
+    return bool(MERGED_ANALYSES & set(resolve_analyses(names)))
+
+
+# Analyses computed independently per course-year and per merged year
+COURSE_YEAR_ANALYSES = [
+    "single_course",
+    "pass_by_exam",
+    "attempts_dist",
+    "failed_attempts_dist",
+]
+MERGED_YEAR_ANALYSES = ["correlation"]
+
+# func(df, course, year) of each per course-year analysis
+COURSE_YEAR_FUNCTIONS = {
+    "single_course": lambda df, course, year: single_course_stats(df, course, year),
+    "pass_by_exam": lambda df, course, year: pass_rate_by_exam(df, course),
+    "attempts_dist": lambda df, course, year: attempts_distribution(df),
+    "failed_attempts_dist": lambda df, course, year: failed_attempts_distribution(df),
+}
+
+
+def compute_all_statistics(
+    processed, merged, covid_windows=None, analyses=None, previous=None
+):
+    """
+    Compute the analyses named in `analyses` (default: all of ANALYSES) and
+    their dependencies. Analyses that are not selected keep their empty value.
+
+    `previous` holds per course-year / per-year results (as in the stats
+    dict) that are still valid and are reused instead of recomputed.
+    """
+    selected = set(resolve_analyses(analyses))
+    previous = previous or {}
+
     all_stats = {
         "single_course": {"MA1": {}, "MA2": {}},
         "pass_by_exam": {"MA1": {}, "MA2": {}},
         "attempts_dist": {"MA1": {}, "MA2": {}},
         "failed_attempts_dist": {"MA1": {}, "MA2": {}},
         "correlation": {},
+        "grade_tensor": None,
         "grade_matrix": {},
         "ma1_predicts_ma2": {},
         "year_comparison": None,
+        "year_index": None,
+        "rolling_windows": None,
         "covid_impact": None,
         "easiest_hardest": None,
         "cross_year_rejections": None,
@@ -553,31 +860,103 @@ def compute_all_statistics(processed, merged):
         "grade_transition": None,
         "dropout": None,
         "perfect_scores": None,
+        "ma2_pass_model": None,
+        "threshold_what_if": None,
+        "points_histograms": None,
     }
 
+    rows = sum(len(df) for course in processed.values() for df in course.values())
+    merged_rows = sum(len(df) for df in merged.values())
+
     for course in ["MA1", "MA2"]:
         for year, df in processed[course].items():
-            all_stats["single_course"][course][year] = single_course_stats(
-                df, course, year
-            )
-            all_stats["pass_by_exam"][course][year] = pass_rate_by_exam(df, course)
-            all_stats["attempts_dist"][course][year] = attempts_distribution(df)
-            all_stats["failed_attempts_dist"][course][year] = (
-                failed_attempts_distribution(df)
-            )
+            for name in COURSE_YEAR_ANALYSES:
+                if name not in selected:
+                    continue
+                reused = previous.get(name, {}).get(course, {})
+                if year in reused:
+                    all_stats[name][course][year] = reused[year]
+                else:
+                    with stage(f"analysis.{name}", len(df)):
+                        all_stats[name][course][year] = COURSE_YEAR_FUNCTIONS[name](
+                            df, course, year
+                        )
+
+    if "grade_tensor" in selected:
+        with stage("analysis.grade_tensor", merged_rows):
+            all_stats["grade_tensor"] = grade_tensor(merged)
+    tensor = all_stats["grade_tensor"]
 
     for year, df in merged.items():
-        all_stats["correlation"][year] = correlation_analysis(df)
-        all_stats["grade_matrix"][year] = grade_matrix(df)
-        all_stats["ma1_predicts_ma2"][year] = ma1_predicts_ma2(df)
-
-    all_stats["year_comparison"] = year_over_year_comparison(processed, merged)
-    all_stats["covid_impact"] = covid_impact_analysis(processed)
-    all_stats["easiest_hardest"] = easiest_hardest_exams(processed)
-    all_stats["cross_year_rejections"] = cross_year_rejections(processed)
-    all_stats["statistical_tests"] = statistical_significance_tests(processed)
-    all_stats["grade_transition"] = grade_transition_analysis(all_stats["grade_matrix"])
-    all_stats["dropout"] = dropout_analysis(processed)
-    all_stats["perfect_scores"] = perfect_scores_analysis(processed)
+        if "correlation" in selected:
+            reused = previous.get("correlation", {})
+            if year in reused:
+                all_stats["correlation"][year] = reused[year]
+            else:
+                with stage("analysis.correlation", len(df)):
+                    all_stats["correlation"][year] = correlation_analysis(df)
+        if "grade_matrix" in selected:
+            all_stats["grade_matrix"][year] = tensor_grade_matrix(tensor, year)
+        if "ma1_predicts_ma2" in selected:
+            all_stats["ma1_predicts_ma2"][year] = tensor_ma1_predicts_ma2(
+                tensor, year
+            )
+
+    # Analyses over all years, in ANALYSES order
+    cross_year = {
+        "year_comparison": lambda: year_over_year_comparison(processed, merged),
+        "year_index": lambda: build_year_index(processed),
+        "rolling_windows": lambda: rolling_windows(all_stats["year_index"]),
+        "covid_impact": lambda: covid_impact_analysis(
+            processed, covid_windows, all_stats["year_index"]
+        ),
+        "easiest_hardest": lambda: easiest_hardest_exams(processed),
+        "cross_year_rejections": lambda: cross_year_rejections(processed),
+        "statistical_tests": lambda: statistical_significance_tests(processed),
+        "grade_transition": lambda: grade_transition_analysis(tensor),
+        "dropout": lambda: dropout_analysis(processed),
+        "perfect_scores": lambda: perfect_scores_analysis(processed),
+        "ma2_pass_model": lambda: ma2_pass_model(processed),
+        "threshold_what_if": lambda: threshold_what_if(processed),
+        "points_histograms": lambda: exam_histograms(processed),
+    }
+    for name, compute in cross_year.items():
+        if name in selected:
+            with stage(f"analysis.{name}", rows):
+                all_stats[name] = compute()
 
     return all_stats
+
+
+def update_statistics(
+    all_stats, processed, merged, changed, covid_windows=None, analyses=None
+):
+    """
+    Recompute `all_stats` after the (course, year) pairs in `changed` were
+    added, modified or removed. Per course-year and per-year results of
+    untouched years are reused; analyses spanning years are recomputed.
+    """
+    changed = set(changed)
+    changed_years = {year for _, year in changed}
+
+    previous = {}
+    for name in COURSE_YEAR_ANALYSES:
+        previous[name] = {
+            course: {
+                year: value
+                for year, value in all_stats[name][course].items()
+                if (course, year) not in changed
+            }
+            for course in ["MA1", "MA2"]
+        }
+    for name in MERGED_YEAR_ANALYSES:
+        previous[name] = {
+            year: value
+            for year, value in all_stats[name].items()
+            if year not in changed_years
+        }
+
+    return compute_all_statistics(
+        processed, merged, covid_windows, analyses, previous=previous
+    )
+
@@ -0,0 +1,175 @@
+"""
+Bounded-memory pipeline: one course-year at a time.
+
+Each course-year is loaded and processed, its per course-year analyses are
+computed, and it is merged with the other course of the same year. Then only
+the compact columns the cross-year analyses read are kept and the raw and
+processed frames are released. The cross-year analyses run at the end on the
+compact frames, reusing the streamed per course-year results, so the stats
+are the same as in a normal run.
+
+Peak RSS is checked after every course-year against the budget.
+"""
+
+import os
+import sys
+
+from src.analysis import (
+    COURSE_YEAR_ANALYSES,
+    COURSE_YEAR_FUNCTIONS,
+    MERGED_YEAR_ANALYSES,
+    compute_all_statistics,
+    correlation_analysis,
+    resolve_analyses,
+)
+from src.ingestion import find_csv_files, load_csv
+from src.pipeline import process_one
+from src.processing import get_exam_columns, merge_ma1_ma2
+from src.profiling import stage
+
+# Processed columns read by the cross-year analyses, besides the exam points
+# and pass columns
+COMPACT_COLUMNS = [
+    "id",
+    "passed",
+    "final_grade",
+    "final_points",
+    "num_attempts",
+    "rejected_grade",
+    "passed_on_exam",
+    "passed_on_continual",
+]
+# Merged columns read by grade_tensor, year_comparison and the scatter plot
+COMPACT_MERGED_COLUMNS = [
+    "ma1_passed",
+    "ma1_grade",
+    "ma1_points",
+    "ma2_passed",
+    "ma2_grade",
+    "ma2_points",
+    "both_passed",
+    "ma2_before_ma1",
+]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, None if unavailable."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+def compact_frame(df):
+    """The columns of a processed frame the cross-year analyses read."""
+    exams = get_exam_columns(df)
+    columns = list(COMPACT_COLUMNS)
+    for _, points_col, prolaz_col, _ in exams:
+        columns += [points_col, prolaz_col]
+    compact = df[columns].copy()
+    compact.attrs["exams"] = exams
+    return compact
+
+
+def _course_years(data_dir, courses=None, years=None, verbose=True):
+    """Yield (course, year, raw frame) in year order, one frame at a time."""
+    if os.path.isfile(data_dir):
+        from src.storage import connect, course_years, load_frame
+
+        conn = connect(data_dir)
+        try:
+            keys = [
+                (course, year)
+                for course, year in course_years(conn)
+                if course in ("MA1", "MA2")
+                and (courses is None or course in courses)
+                and (years is None or year in years)
+            ]
+            for course, year in sorted(keys, key=lambda k: (k[1], k[0])):
+                df = load_frame(conn, course, year, verbose)
+                yield course, year, df
+        finally:
+            conn.close()
+        return
+
+    files = find_csv_files(data_dir, courses, years)
+    for course, year in sorted(files, key=lambda k: (k[1], k[0])):
+        df = load_csv(files[(course, year)], verbose)
+        if df is not None:
+            yield course, year, df
+
+
+def run_bounded(
+    data_dir,
+    budget_mb,
+    courses=None,
+    years=None,
+    covid_windows=None,
+    analyses=None,
+    merge=True,
+    verbose=True,
+):
+    """
+    Load, process and analyze one course-year at a time. Returns (processed,
+    merged, stats, peak_mb), where processed and merged hold the compact
+    frames. Raises MemoryError as soon as peak RSS exceeds `budget_mb`.
+    `verbose=False` runs silently.
+    """
+    selected = resolve_analyses(analyses)
+    previous = {name: {"MA1": {}, "MA2": {}} for name in COURSE_YEAR_ANALYSES}
+    previous.update({name: {} for name in MERGED_YEAR_ANALYSES})
+
+    processed = {"MA1": {}, "MA2": {}}
+    merged = {}
+    pending = {}
+
+    def check(label):
+        peak = peak_rss_mb()
+        if peak is not None and peak > budget_mb:
+            raise MemoryError(
+                f"Peak RSS {peak:.0f} MB exceeds the {budget_mb:.0f} MB budget "
+                f"after {label}"
+            )
+
+    for course, year, raw in _course_years(data_dir, courses, years, verbose):
+        df = process_one(course, year, raw)
+        del raw
+        for name in COURSE_YEAR_ANALYSES:
+            if name in selected:
+                with stage(f"analysis.{name}", len(df)):
+                    result = COURSE_YEAR_FUNCTIONS[name](df, course, year)
+                previous[name][course][year] = result
+
+        # Keep the full frame only until the other course of its year arrives
+        other = pending.pop(("MA2" if course == "MA1" else "MA1", year), None)
+        if merge and other is not None:
+            ma1, ma2 = (df, other) if course == "MA1" else (other, df)
+            with stage("process.merge_ma1_ma2", len(ma1) + len(ma2)):
+                merged_df = merge_ma1_ma2(ma1, ma2)
+            if "correlation" in selected:
+                with stage("analysis.correlation", len(merged_df)):
+                    previous["correlation"][year] = correlation_analysis(merged_df)
+            merged[year] = merged_df[COMPACT_MERGED_COLUMNS].copy()
+            del ma1, ma2, merged_df
+        elif merge:
+            pending[(course, year)] = df
+
+        processed[course][year] = compact_frame(df)
+        del df, other
+        if verbose:
+            print(f"  - Processed {course}_{year}")
+        check(f"{course}_{year}")
+
+        # A year without its other course is never merged
+        for key in [k for k in pending if k[1] < year]:
+            del pending[key]
+
+    processed = {course: dict(sorted(ys.items())) for course, ys in processed.items()}
+    stats = compute_all_statistics(
+        processed, merged, covid_windows, analyses, previous=previous
+    )
+    check("the cross-year analyses")
+    return processed, merged, stats, peak_rss_mb()
@@ -0,0 +1,194 @@
+"""
+Columnar table store: one directory per dataset, one .npy file per column.
+
+A dataset directory holds `manifest.json` (tables, row counts, column names,
+dtypes and files) and a subdirectory per table. Columns are plain numpy
+arrays - numbers, bools, datetime64 and fixed-width unicode strings - so
+they load without parsing or pickling and can be memory-mapped.
+
+Datasets are written to a temporary sibling directory and swapped in place,
+so readers never see a partially written dataset.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+MANIFEST_FILE = "manifest.json"
+FORMAT_VERSION = 1
+
+
+def encode_column(values):
+    """
+    Convert a column to a typed numpy array: strings become fixed-width
+    unicode (missing as ""), numbers stay numeric (missing as NaN).
+
+    Returns (array, restore): `restore` is "str" for string columns with
+    missing values and "bool" for object columns of bools (with missing
+    values stored as NaN), so read_frame can rebuild the original column,
+    and None otherwise.
+    """
+    series = pd.Series(values)
+    dtype = series.dtype
+
+    if pd.api.types.is_bool_dtype(dtype):
+        return series.to_numpy(dtype=bool), None
+    if pd.api.types.is_datetime64_dtype(dtype):
+        return series.to_numpy(), None
+    if pd.api.types.is_numeric_dtype(dtype):
+        return series.to_numpy(dtype=float if series.hasnans else None), None
+
+    # Object columns: bools, numbers (with None) or strings
+    non_null = [v for v in series if v is not None and v == v]
+    if non_null and all(isinstance(v, (bool, np.bool_)) for v in non_null):
+        if len(non_null) == len(series):
+            return series.to_numpy(dtype=bool), "bool"
+        return series.astype(float).to_numpy(), "bool"
+    if non_null and all(
+        isinstance(v, (int, float, np.number, np.bool_)) for v in non_null
+    ):
+        return series.astype(float).to_numpy(), None
+
+    restore = "str" if len(non_null) < len(series) else None
+    strings = series.astype(object).where(series.notna(), "").astype(str)
+    if not len(strings):
+        return np.empty(0, dtype="<U1"), None
+    return strings.to_numpy(dtype=str), restore
+
+
+def decode_column(array, restore):
+    """Inverse of the encoding of missing values and object bools."""
+    if restore == "str":
+        values = pd.Series(array)
+        return values.where(values != "")
+    if restore == "bool":
+        values = pd.Series(array.astype(bool), dtype=object)
+        if array.dtype == bool:
+            return values
+        return values.where(~np.isnan(array), np.nan)
+    return array
+
+
+def _replace_dir(src, dst):
+    """Move `src` to `dst`, replacing an existing `dst` directory."""
+    if not os.path.exists(dst):
+        os.replace(src, dst)
+        return
+
+    old = tempfile.mkdtemp(prefix=".old-", dir=os.path.dirname(dst))
+    os.rmdir(old)
+    os.replace(dst, old)
+    os.replace(src, dst)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def _link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def write_tables(path, tables, meta=None, keep=()):
+    """
+    Write `tables` ({name: DataFrame or dict of columns}) as a dataset at
+    `path`. Tables named in `keep` are carried over unchanged from the
+    dataset already at `path` (hard-linked, not re-encoded). Returns the
+    manifest.
+    """
+    path = os.path.abspath(path)
+    parent = os.path.dirname(path)
+    os.makedirs(parent, exist_ok=True)
+
+    tmp = tempfile.mkdtemp(prefix=".tmp-", dir=parent)
+    try:
+        manifest = {"version": FORMAT_VERSION, "meta": meta or {}, "tables": {}}
+        if keep:
+            old = read_manifest(path)
+            for name in keep:
+                os.makedirs(os.path.join(tmp, name))
+                for column in old["tables"][name]["columns"]:
+                    _link_or_copy(
+                        os.path.join(path, column["file"]),
+                        os.path.join(tmp, column["file"]),
+                    )
+                manifest["tables"][name] = old["tables"][name]
+
+        for name, table in tables.items():
+            frame = pd.DataFrame(table)
+            os.makedirs(os.path.join(tmp, name))
+
+            columns = []
+            for i, (column, values) in enumerate(frame.items()):
+                array, restore = encode_column(values)
+                file = f"{name}/{i:03d}.npy"
+                np.save(os.path.join(tmp, file), array, allow_pickle=False)
+                columns.append(
+                    {
+                        "name": str(column),
+                        "dtype": array.dtype.str,
+                        "file": file,
+                        "restore": restore,
+                    }
+                )
+            manifest["tables"][name] = {"rows": len(frame), "columns": columns}
+
+        with open(os.path.join(tmp, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1, ensure_ascii=False)
+
+        _replace_dir(tmp, path)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    return manifest
+
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported columnar format in {path}")
+    return manifest
+
+
+def read_table(path, name, columns=None, mmap=True, manifest=None):
+    """Columns of one table as {name: array}, memory-mapped by default."""
+    manifest = manifest or read_manifest(path)
+    if name not in manifest["tables"]:
+        raise KeyError(f"Unknown table: {name}")
+
+    result = {}
+    for column in manifest["tables"][name]["columns"]:
+        if columns is not None and column["name"] not in columns:
+            continue
+        result[column["name"]] = np.load(
+            os.path.join(path, column["file"]),
+            mmap_mode="r" if mmap else None,
+            allow_pickle=False,
+        )
+    return result
+
+
+def read_frame(path, name, columns=None, manifest=None):
+    """One table as a DataFrame, with string and object columns restored."""
+    manifest = manifest or read_manifest(path)
+    arrays = read_table(path, name, columns, mmap=False, manifest=manifest)
+    restore = {c["name"]: c["restore"] for c in manifest["tables"][name]["columns"]}
+    return pd.DataFrame(
+        {
+            column: decode_column(values, restore[column])
+            for column, values in arrays.items()
+        }
+    )
+
+
+def read_tables(path, names=None):
+    """All (or the named) tables of a dataset as DataFrames."""
+    manifest = read_manifest(path)
+    names = list(manifest["tables"]) if names is None else names
+    return {name: read_frame(path, name, manifest=manifest) for name in names}
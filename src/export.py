@@ -0,0 +1,386 @@
+"""
+Exports of pipeline results as typed columnar datasets (see src/columnar.py).
+
+`export_processed` writes the processed per-student frames and the merged
+MA1/MA2 frames, one table per course-year; `load_processed` reopens them,
+reading only the partitions and columns asked for.
+
+`export_stats` flattens every analysis into one or more long-format tables
+keyed by course/year/exam/grade, e.g.
+
+    tables = load_stats("output")
+    tables["pass_by_exam"].query("course == 'MA2' and year == 2023")
+
+Columns are .npy files, so single columns can also be memory-mapped with
+src.columnar.read_table.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.analysis import GRADES, YEAR_INDEX_FIELDS
+from src.columnar import read_frame, read_manifest, read_tables, write_tables
+from src.processing import get_exam_columns
+
+STATS_DIR = "stats"
+PROCESSED_DIR = "processed"
+
+# Code for "did not pass MA2" on the MA2 axis of the grade tensor
+NOT_PASSED = 1
+
+
+def _records(nested, keys):
+    """
+    Rows of a dict nested len(keys) levels deep. Leaves that are dicts are
+    spread into columns, other leaves go to a `value` column. A None above
+    the leaf level (e.g. a year too small for ma1_predicts_ma2) has no rows.
+    """
+    rows = []
+
+    def walk(node, prefix):
+        if node is None and len(prefix) < len(keys):
+            return
+        if len(prefix) == len(keys):
+            row = dict(zip(keys, prefix))
+            if isinstance(node, dict):
+                row.update(node)
+            else:
+                row["value"] = node
+            rows.append(row)
+            return
+        for key, child in node.items():
+            walk(child, prefix + [key])
+
+    walk(nested, [])
+    return pd.DataFrame(rows, columns=None if rows else keys)
+
+
+def _single_course_tables(single_course):
+    nested = ["grade_distribution", "pass_by_exam"]
+    rows, grades, passes = [], [], []
+    for course in ["MA1", "MA2"]:
+        for year, s in sorted(single_course[course].items()):
+            rows.append({k: v for k, v in s.items() if k not in nested})
+            for grade, count in sorted(s["grade_distribution"].items()):
+                grades.append(
+                    {"course": course, "year": year, "grade": grade, "count": count}
+                )
+            for exam, count in s["pass_by_exam"].items():
+                passes.append(
+                    {"course": course, "year": year, "exam": exam, "passed": count}
+                )
+
+    return {
+        "single_course": pd.DataFrame(rows),
+        "grade_distribution": pd.DataFrame(
+            grades, columns=["course", "year", "grade", "count"]
+        ),
+        "passed_by_exam": pd.DataFrame(
+            passes, columns=["course", "year", "exam", "passed"]
+        ),
+    }
+
+
+def _grade_tensor_table(tensor):
+    counts = np.asarray(tensor["counts"])
+    ma2 = list(tensor["grades"]) + [NOT_PASSED]
+    years, ma1_idx, ma2_idx = np.indices(counts.shape).reshape(3, -1)
+    return pd.DataFrame(
+        {
+            "year": np.asarray(tensor["years"], dtype=int)[years],
+            "ma1_grade": np.asarray(tensor["grades"])[ma1_idx],
+            "ma2_grade": np.asarray(ma2)[ma2_idx],
+            "count": counts.ravel(),
+        }
+    )
+
+
+def _grade_matrix_table(grade_matrix):
+    parts = []
+    for year, matrix in sorted(grade_matrix.items()):
+        long = matrix.stack().rename("count").reset_index()
+        long.columns = ["ma1_grade", "ma2_grade", "count"]
+        long.insert(0, "year", year)
+        parts.append(long)
+    if not parts:
+        return pd.DataFrame(columns=["year", "ma1_grade", "ma2_grade", "count"])
+    return pd.concat(parts, ignore_index=True)
+
+
+def _year_index_table(year_index):
+    parts = []
+    for course, index in year_index.items():
+        # None for a course that was not loaded
+        if index is None:
+            continue
+        prefix = np.asarray(index["prefix"])
+        part = pd.DataFrame(prefix, columns=YEAR_INDEX_FIELDS)
+        # Row i holds the sums over all years before first_year + i
+        part.insert(0, "before_year", index["first_year"] + np.arange(len(prefix)))
+        part.insert(0, "course", course)
+        parts.append(part)
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+
+def _covid_tables(covid):
+    rows, differences = [], []
+    for course in ["MA1", "MA2"]:
+        for window, (start, end) in covid["windows"].items():
+            rows.append(
+                {
+                    "course": course,
+                    "window": window,
+                    "start": start,
+                    "end": end,
+                    "pass_rate": covid[course][f"{window}_pass_rate"],
+                }
+            )
+        # Only set when both the pre_covid and covid windows have data
+        difference = covid[course].get("covid_difference")
+        if difference is not None:
+            differences.append({"course": course, "covid_difference": difference})
+    tables = {"covid_impact": pd.DataFrame(rows)}
+    if differences:
+        tables["covid_difference"] = pd.DataFrame(differences)
+    return tables
+
+
+def _easiest_hardest_table(easiest_hardest):
+    table = pd.DataFrame(
+        easiest_hardest["all"], columns=["year", "course", "pass_rate"]
+    )
+    table["label"] = ""
+    for label in ["easiest", "hardest"]:
+        entry = easiest_hardest[label]
+        if entry:
+            match = (table["year"] == entry["year"]) & (
+                table["course"] == entry["course"]
+            )
+            table.loc[match, "label"] = label
+    return table
+
+
+def _cross_year_tables(rejections):
+    counts, students = [], []
+    for course in ["MA1", "MA2"]:
+        for pair, r in rejections[course].items():
+            from_year, to_year = (int(y) for y in pair.split("->"))
+            key = {"course": course, "from_year": from_year, "to_year": to_year}
+            counts.append({**key, "count": r["count"]})
+            students.extend({**key, "id": student} for student in r["students"])
+    return {
+        "cross_year_rejections": pd.DataFrame(
+            counts, columns=["course", "from_year", "to_year", "count"]
+        ),
+        "cross_year_rejection_students": pd.DataFrame(
+            students, columns=["course", "from_year", "to_year", "id"]
+        ),
+    }
+
+
+def _model_tables(result):
+    model = result["model"]
+    coefficients = pd.DataFrame(
+        {
+            "feature": model["features"],
+            "coefficient": model["coefficients"],
+            "mean": model["mean"],
+            "std": model["std"],
+        }
+    )
+    summary = pd.DataFrame(
+        [
+            {
+                "intercept": model["intercept"],
+                "l2": model["l2"],
+                "n_iter": model["n_iter"],
+                "n_students": result["n_students"],
+                "base_rate": result["base_rate"],
+            }
+        ]
+    )
+
+    cv_rows = []
+    for validation in ["cv", "cv_by_year"]:
+        cv = result[validation]
+        if not cv:
+            continue
+        folds = [{k: v for k, v in cv.items() if k not in ("folds", "per_fold")}]
+        folds += cv["per_fold"]
+        for fold, metrics in enumerate(folds, start=-1):
+            cv_rows.append({"validation": validation, "fold": fold, **metrics})
+
+    return {
+        "ma2_pass_model": summary,
+        "ma2_pass_model_coefficients": coefficients,
+        # fold -1 holds the metrics on all out-of-fold predictions
+        "ma2_pass_model_cv": pd.DataFrame(cv_rows),
+    }
+
+
+def _histogram_table(histograms):
+    parts = []
+    for course in ["MA1", "MA2"]:
+        for year, hist in sorted(histograms.get(course, {}).items()):
+            edges = np.asarray(hist["edges"])
+            passed = np.asarray(hist["passed"])
+            n_exams, n_bins = passed.shape
+            parts.append(
+                pd.DataFrame(
+                    {
+                        "course": course,
+                        "year": year,
+                        "exam": np.repeat(hist["exams"], n_bins),
+                        "bin_start": np.tile(edges[:-1], n_exams),
+                        "bin_end": np.tile(edges[1:], n_exams),
+                        "passed": passed.ravel(),
+                        "failed": np.asarray(hist["failed"]).ravel(),
+                    }
+                )
+            )
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+
+def stats_tables(stats):
+    """Flatten every computed analysis of `stats` into named DataFrames."""
+    tables = {}
+
+    if any(stats["single_course"].values()):
+        tables.update(_single_course_tables(stats["single_course"]))
+    for name, keys in [
+        ("pass_by_exam", ["course", "year", "exam"]),
+        ("attempts_dist", ["course", "year", "attempts"]),
+        ("failed_attempts_dist", ["course", "year", "attempts"]),
+    ]:
+        if any(stats[name].values()):
+            table = _records(stats[name], keys)
+            tables[name] = table.rename(columns={"value": "count"})
+    if stats["correlation"]:
+        tables["correlation"] = _records(stats["correlation"], ["year"])
+    if stats["grade_tensor"] is not None:
+        tables["grade_tensor"] = _grade_tensor_table(stats["grade_tensor"])
+    if stats["grade_matrix"]:
+        tables["grade_matrix"] = _grade_matrix_table(stats["grade_matrix"])
+    if stats["ma1_predicts_ma2"]:
+        tables["ma1_predicts_ma2"] = _records(
+            stats["ma1_predicts_ma2"], ["year", "ma1_grade"]
+        )
+    if stats["year_comparison"] is not None:
+        tables["year_comparison"] = stats["year_comparison"]
+    if stats["year_index"] is not None:
+        table = _year_index_table(stats["year_index"])
+        if not table.empty:
+            tables["year_index"] = table
+    if stats["rolling_windows"] is not None:
+        parts = [
+            pd.concat([pd.Series(c, index=df.index, name="course"), df], axis=1)
+            for c, df in stats["rolling_windows"].items()
+            if df is not None
+        ]
+        if parts:
+            tables["rolling_windows"] = pd.concat(parts, ignore_index=True)
+    if stats["covid_impact"] is not None:
+        tables.update(_covid_tables(stats["covid_impact"]))
+    if stats["easiest_hardest"] is not None:
+        tables["easiest_hardest"] = _easiest_hardest_table(stats["easiest_hardest"])
+    if stats["cross_year_rejections"] is not None:
+        tables.update(_cross_year_tables(stats["cross_year_rejections"]))
+    if stats["statistical_tests"] is not None:
+        tables["statistical_tests"] = _records(stats["statistical_tests"], ["test"])
+    if stats["grade_transition"] is not None:
+        tables["grade_transition"] = pd.DataFrame([stats["grade_transition"]])
+    if stats["dropout"] is not None:
+        tables["dropout"] = _records(stats["dropout"], ["course"])
+    if stats["perfect_scores"] is not None:
+        tables["perfect_scores"] = _records(
+            stats["perfect_scores"], ["course"]
+        ).rename(columns={"value": "count"})
+    if stats["ma2_pass_model"] is not None:
+        tables.update(_model_tables(stats["ma2_pass_model"]))
+    if stats["threshold_what_if"] is not None:
+        tables["threshold_sweep"] = stats["threshold_what_if"]["sweep"]
+        tables["threshold_curves"] = stats["threshold_what_if"]["curves"]
+    if stats["points_histograms"] is not None:
+        tables["points_histograms"] = _histogram_table(stats["points_histograms"])
+
+    return tables
+
+
+def export_stats(stats, output_dir):
+    path = os.path.join(output_dir, STATS_DIR)
+    manifest = write_tables(path, stats_tables(stats), meta={"grades": GRADES})
+    print(f"  - {STATS_DIR}/ ({len(manifest['tables'])} tables)... saved")
+    return manifest
+
+
+def load_stats(output_dir, names=None):
+    """Load exported analysis tables without re-running the pipeline."""
+    return read_tables(os.path.join(output_dir, STATS_DIR), names)
+
+
+def export_processed(processed, merged, output_dir, changed=None):
+    """
+    Write processed and merged frames to <output_dir>/processed. With
+    `changed` (course-years, e.g. from watch mode), only their tables and the
+    merged tables of their years are rewritten; the others are kept from the
+    existing export.
+    """
+    tables = {}
+    partitions = []
+    for course in ["MA1", "MA2"]:
+        for year, df in sorted(processed[course].items()):
+            tables[f"{course}_{year}"] = df
+            partitions.append({"course": course, "year": year})
+    for year, df in sorted(merged.items()):
+        tables[f"merged_{year}"] = df
+        partitions.append({"course": "merged", "year": year})
+
+    path = os.path.join(output_dir, PROCESSED_DIR)
+    keep = []
+    if changed is not None and os.path.exists(path):
+        years = {year for _, year in changed}
+        existing = read_manifest(path)["tables"]
+        keep = [
+            name
+            for name, p in zip(tables, partitions)
+            if name in existing
+            and (p["course"], p["year"]) not in changed
+            and not (p["course"] == "merged" and p["year"] in years)
+        ]
+    write_tables(
+        path,
+        {name: df for name, df in tables.items() if name not in keep},
+        meta={"partitions": partitions},
+        keep=keep,
+    )
+    unchanged = f", {len(keep)} unchanged" if keep else ""
+    print(f"  - {PROCESSED_DIR}/ ({len(partitions)} partitions{unchanged})... saved")
+
+
+def load_processed(output_dir, courses=None, years=None, columns=None):
+    """
+    Reload (processed, merged) written by export_processed. `courses` (which
+    may include "merged"), `years` and `columns` restrict what is read.
+    """
+    path = os.path.join(output_dir, PROCESSED_DIR)
+    manifest = read_manifest(path)
+
+    processed = {"MA1": {}, "MA2": {}}
+    merged = {}
+    for partition in manifest["meta"]["partitions"]:
+        course, year = partition["course"], partition["year"]
+        if courses is not None and course not in courses:
+            continue
+        if years is not None and year not in years:
+            continue
+
+        df = read_frame(path, f"{course}_{year}", columns, manifest=manifest)
+        if course == "merged":
+            merged[year] = df
+        else:
+            df.attrs["exams"] = get_exam_columns(df)
+            processed[course][year] = df
+
+    return processed, merged
@@ -3,6 +3,9 @@ import os
 from glob import glob
 import re
 
+from src import validation
+from src.profiling import stage
+
 REQUIRED_COLUMNS = ["id", "ISVU Bodovi", "ISVU Ocjena", "ISVU Rok"]
 
 
@@ -60,27 +63,69 @@ def validate_dataframe(df):
     return len(exams) >= 2
 
 
-def load_all_csvs(data_dir):
-    data = {"MA1": {}, "MA2": {}}
-
-    csv_files = glob(os.path.join(data_dir, "*.csv"))
-
-    for filepath in csv_files:
+def find_csv_files(data_dir, courses=None, years=None):
+    """Map (course, year) to the CSV file in `data_dir` holding it."""
+    files = {}
+    for filepath in sorted(glob(os.path.join(data_dir, "*.csv"))):
         course, year = extract_year_and_course(filepath)
         if course is None:
             continue
+        if courses is not None and course not in courses:
+            continue
+        if years is not None and year not in years:
+            continue
+        files[(course, year)] = filepath
+    return files
+
 
+def load_csv(filepath, verbose=True):
+    """
+    Parse and validate one course-year CSV; None if it lacks the required
+    columns. Data-quality checks run on every row (see src/validation.py).
+    """
+    with stage("load.parse_csv") as timed:
         df = parse_csv_file(filepath)
+        timed["rows"] = len(df)
 
-        if not validate_dataframe(df):
+    if not validate_dataframe(df):
+        if verbose:
             print(f"Warning: {filepath} has missing required columns")
-            continue
+        return None
 
+    with stage("load.parse_dates", len(df)):
         df = parse_dates(df)
-        df.attrs["exams"] = get_exam_columns(df)
+    df.attrs["exams"] = get_exam_columns(df)
+
+    course, year = extract_year_and_course(filepath)
+    with stage("load.validate", len(df)):
+        df = validation.apply(df, course, year, verbose)
+    return df
+
+
+def load_all_csvs(data_dir, courses=None, years=None, verbose=True):
+    """
+    Load every course-year CSV in `data_dir`. `courses` and `years` restrict
+    which files are read; others are skipped before parsing.
+
+    If `data_dir` is an SQLite database file (see src/storage.py), the
+    course-years are read from it instead. `verbose=False` loads silently.
+    """
+    if os.path.isfile(data_dir):
+        from src.storage import load_all
+
+        return load_all(data_dir, courses=courses, years=years, verbose=verbose)
+
+    data = {"MA1": {}, "MA2": {}}
+
+    for (course, year), filepath in find_csv_files(data_dir, courses, years).items():
+        df = load_csv(filepath, verbose)
+        if df is None:
+            continue
+
         data[course][year] = df
-        print(
-            f"  - Loaded {course}_{year}: {len(df)} students ({len(df.attrs['exams'])} exam periods)"
-        )
+        if verbose:
+            print(
+                f"  - Loaded {course}_{year}: {len(df)} students ({len(df.attrs['exams'])} exam periods)"
+            )
 
     return data
@@ -0,0 +1,156 @@
+"""
+Pipelined load -> process -> merge.
+
+A reader thread parses the course-year CSVs one at a time into a bounded
+queue. The main thread hands each parsed frame to a process pool as soon as
+it arrives, and merges a year as soon as both of its courses are processed.
+Parsing of later files overlaps processing of earlier ones, and the bounded
+queue plus the cap on in-flight tasks keep only a few frames in memory.
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from src import profiling
+from src.ingestion import find_csv_files, load_all_csvs, load_csv
+from src.processing import create_merged_data, merge_ma1_ma2, process_all_data
+
+# Parsed frames waiting to be processed
+QUEUE_SIZE = 2
+
+_DONE = object()
+
+
+def process_one(course, year, df):
+    """Process a single course-year exactly as process_all_data does."""
+    data = {"MA1": {}, "MA2": {}}
+    data[course][year] = df
+    return process_all_data(data)[course][year]
+
+
+def _process_task(course, year, df, profile, memory):
+    """process_one in a pool worker, returning its profiling records too."""
+    if profile and not profiling.enabled():
+        profiling.start(memory)
+    return process_one(course, year, df), profiling.collect()
+
+
+def _read_files(files, out, verbose):
+    """Reader thread: parse each CSV and put (course, year, df) on `out`."""
+    try:
+        for (course, year), path in files.items():
+            df = load_csv(path, verbose)
+            if df is not None:
+                out.put((course, year, df))
+        out.put(_DONE)
+    except BaseException as e:
+        out.put(e)
+
+
+def _pool(workers):
+    # Forking while the reader thread runs is unsafe
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context(
+        "forkserver" if "forkserver" in methods else "spawn"
+    )
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+def load_and_process(
+    data_dir,
+    courses=None,
+    years=None,
+    workers=None,
+    merge=True,
+    queue_size=QUEUE_SIZE,
+    verbose=True,
+):
+    """
+    Same (processed, merged) as load_all_csvs + process_all_data +
+    create_merged_data, with the stages overlapped. `workers` processes run
+    the processing (None means one per CPU); with 1 it runs in the main
+    thread while the reader thread parses ahead. SQLite databases are read
+    sequentially.
+    """
+    if os.path.isfile(data_dir):
+        processed = process_all_data(
+            load_all_csvs(data_dir, courses=courses, years=years, verbose=verbose)
+        )
+        return processed, create_merged_data(processed) if merge else {}
+
+    files = find_csv_files(data_dir, courses, years)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(files)))
+
+    parsed = queue.Queue(maxsize=queue_size)
+    reader = threading.Thread(
+        target=_read_files, args=(files, parsed, verbose), daemon=True
+    )
+
+    processed = {"MA1": {}, "MA2": {}}
+    merged = {}
+
+    def finish(course, year, df, records=()):
+        profiling.add(records)
+        processed[course][year] = df
+        if verbose:
+            print(
+                f"  - Processed {course}_{year}: {len(df)} students "
+                f"({len(df.attrs['exams'])} exam periods)"
+            )
+        other = processed["MA2" if course == "MA1" else "MA1"]
+        if merge and year in other:
+            ma1, ma2 = processed["MA1"][year], processed["MA2"][year]
+            with profiling.stage("process.merge_ma1_ma2", len(ma1) + len(ma2)):
+                merged[year] = merge_ma1_ma2(ma1, ma2)
+
+    pool = _pool(workers) if workers > 1 else None
+    reader.start()
+    try:
+        running = {}
+        while True:
+            item = parsed.get()
+            if item is _DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+
+            course, year, df = item
+            if pool is None:
+                finish(course, year, process_one(course, year, df))
+                continue
+
+            # Backpressure: at most `workers` frames are being processed
+            if len(running) >= workers:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finish(*running.pop(future), *future.result())
+            future = pool.submit(
+                _process_task,
+                course,
+                year,
+                df,
+                profiling.enabled(),
+                profiling.memory_enabled(),
+            )
+            running[future] = (course, year)
+
+        for future in list(running):
+            finish(*running.pop(future), *future.result())
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        # Unblock the reader if we stopped early
+        while reader.is_alive():
+            try:
+                parsed.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        reader.join()
+
+    processed = {course: dict(sorted(ys.items())) for course, ys in processed.items()}
+    return processed, dict(sorted(merged.items()))
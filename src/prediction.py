@@ -0,0 +1,203 @@
+import numpy as np
+import pandas as pd
+
+from src.processing import get_exam_columns
+
+FEATURES = [
+    "ma1_points",
+    "ma1_grade",
+    "ma1_attempts",
+    "ma1_passed_on_continual",
+    "ma1_pass_exam_position",
+]
+
+
+def ma1_feature_matrix(ma1_df):
+    """
+    Build the MA1 feature matrix (one row per student, columns in FEATURES order).
+
+    Students who did not pass MA1 get 0 points, grade 1 and a pass exam
+    position one past the last exam period.
+    """
+    exams = get_exam_columns(ma1_df)
+    exam_names = [name for name, _, _, _ in exams]
+
+    position = pd.Categorical(ma1_df["passed_on_exam"], categories=exam_names).codes
+    position = np.where(position < 0, len(exam_names), position)
+
+    X = np.column_stack(
+        [
+            ma1_df["final_points"].fillna(0).to_numpy(dtype=float),
+            ma1_df["final_grade"].fillna(1).to_numpy(dtype=float),
+            ma1_df["num_attempts"].to_numpy(dtype=float),
+            ma1_df["passed_on_continual"].astype(bool).to_numpy(dtype=float),
+            position.astype(float),
+        ]
+    )
+    return X
+
+
+def build_training_set(processed, years=None):
+    """
+    Build (X, y, groups) for MA1 students of the given years.
+
+    The target is whether the student passed MA2 in the same academic year;
+    `groups` holds the year of each row so it can be used for grouped CV.
+    """
+    if years is None:
+        years = sorted(set(processed["MA1"].keys()) & set(processed["MA2"].keys()))
+
+    X_parts, y_parts, group_parts = [], [], []
+    for year in years:
+        if year not in processed["MA1"] or year not in processed["MA2"]:
+            continue
+
+        ma1_df = processed["MA1"][year]
+        ma2_df = processed["MA2"][year]
+        ma2_passed_ids = ma2_df.loc[ma2_df["passed"], "id"]
+
+        X_parts.append(ma1_feature_matrix(ma1_df))
+        y_parts.append(ma1_df["id"].isin(ma2_passed_ids).to_numpy(dtype=float))
+        group_parts.append(np.full(len(ma1_df), year))
+
+    if not X_parts:
+        return np.empty((0, len(FEATURES))), np.empty(0), np.empty(0, dtype=int)
+
+    return np.vstack(X_parts), np.concatenate(y_parts), np.concatenate(group_parts)
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -35, 35)))
+
+
+def fit_logistic(X, y, l2=1.0, max_iter=50, tol=1e-8):
+    """
+    Fit an L2-regularized logistic regression with Newton's method (IRLS).
+
+    Features are standardized with the training mean/std, which are stored in
+    the returned model so scoring applies the same transform. The intercept is
+    not penalized.
+    """
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    mean = X.mean(axis=0)
+    std = X.std(axis=0)
+    std[std == 0] = 1.0
+
+    Z = np.column_stack([np.ones(len(X)), (X - mean) / std])
+    penalty = np.full(Z.shape[1], float(l2))
+    penalty[0] = 0.0
+
+    w = np.zeros(Z.shape[1])
+    n_iter = 0
+    for n_iter in range(1, max_iter + 1):
+        p = _sigmoid(Z @ w)
+        gradient = Z.T @ (p - y) + penalty * w
+        hessian = (Z * (p * (1 - p))[:, None]).T @ Z + np.diag(penalty)
+        step = np.linalg.solve(hessian + 1e-10 * np.eye(len(w)), gradient)
+        w -= step
+        if np.max(np.abs(step)) < tol:
+            break
+
+    return {
+        "features": list(FEATURES),
+        "intercept": float(w[0]),
+        "coefficients": w[1:],
+        "mean": mean,
+        "std": std,
+        "l2": float(l2),
+        "n_train": int(len(X)),
+        "n_iter": n_iter,
+    }
+
+
+def predict_proba(model, X):
+    X = np.asarray(X, dtype=float)
+    z = ((X - model["mean"]) / model["std"]) @ model["coefficients"]
+    return _sigmoid(z + model["intercept"])
+
+
+def score_cohort(model, ma1_df):
+    """Score a whole MA1 cohort at once; returns id and MA2 pass probability."""
+    proba = predict_proba(model, ma1_feature_matrix(ma1_df))
+    return pd.DataFrame({"id": ma1_df["id"].to_numpy(), "ma2_pass_probability": proba})
+
+
+def roc_auc(y, scores):
+    y = np.asarray(y, dtype=bool)
+    n_pos = int(y.sum())
+    n_neg = len(y) - n_pos
+    if n_pos == 0 or n_neg == 0:
+        return None
+
+    # Mann-Whitney U with average ranks for ties
+    ranks = pd.Series(scores).rank(method="average").to_numpy()
+    u = ranks[y].sum() - n_pos * (n_pos + 1) / 2
+    return float(u / (n_pos * n_neg))
+
+
+def classification_metrics(y, proba):
+    y = np.asarray(y, dtype=float)
+    p = np.clip(proba, 1e-12, 1 - 1e-12)
+    auc = roc_auc(y, proba)
+    return {
+        "accuracy": round(float(((proba >= 0.5) == (y == 1)).mean()), 4),
+        "log_loss": round(float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p))), 4),
+        "brier": round(float(np.mean((proba - y) ** 2)), 4),
+        "auc": round(auc, 4) if auc is not None else None,
+    }
+
+
+def cross_validate(X, y, k=5, l2=1.0, groups=None, seed=0):
+    """
+    K-fold cross-validated metrics on out-of-fold predictions.
+
+    If `groups` is given (e.g. the year of each row), each group is held out
+    in turn instead of using random folds.
+    """
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(X)
+
+    if groups is not None:
+        fold_ids = np.unique(groups, return_inverse=True)[1]
+    else:
+        rng = np.random.default_rng(seed)
+        fold_ids = rng.permutation(n) % k
+
+    n_folds = int(fold_ids.max()) + 1 if n > 0 else 0
+    if n_folds < 2:
+        return None
+
+    oof = np.empty(n)
+    per_fold = []
+    for fold in range(n_folds):
+        test = fold_ids == fold
+        model = fit_logistic(X[~test], y[~test], l2=l2)
+        oof[test] = predict_proba(model, X[test])
+        per_fold.append(classification_metrics(y[test], oof[test]))
+
+    result = classification_metrics(y, oof)
+    result["folds"] = n_folds
+    result["per_fold"] = per_fold
+    return result
+
+
+def ma2_pass_model(processed, years=None, l2=1.0):
+    X, y, groups = build_training_set(processed, years)
+    if len(X) < 10 or len(np.unique(y)) < 2:
+        return None
+
+    model = fit_logistic(X, y, l2=l2)
+    return {
+        "model": model,
+        "coefficients": dict(
+            zip(model["features"], np.round(model["coefficients"], 4).tolist())
+        ),
+        "intercept": round(model["intercept"], 4),
+        "n_students": int(len(X)),
+        "base_rate": round(float(y.mean()), 4),
+        "cv": cross_validate(X, y, l2=l2),
+        "cv_by_year": cross_validate(X, y, l2=l2, groups=groups),
+    }
@@ -0,0 +1,230 @@
+"""
+Fast preview on a stratified sample of every course-year.
+
+Students are stratified by whether they passed (have an ISVU grade) and by
+the first exam period they passed, both read from the raw export without
+processing it. Each stratum keeps the same fraction of its students (at
+least MIN_PER_STRATUM), so processing and analysis time is proportional to
+the sample size.
+
+Within a stratum the students with the lowest hash of their id are taken.
+The hash is the same in MA1 and MA2, so a student sampled in one course is
+likely sampled in the other and the merged frames keep enough pairs for
+the correlation.
+
+The headline statistics are estimated from the sample with a 95% bound:
+pass rate and average grade as stratified means (strata weighted by their
+full size, with the finite population correction), the points correlation
+with the Fisher z interval.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from src.processing import create_merged_data, process_all_data
+
+PREVIEW_FRACTION = 0.1
+MIN_PER_STRATUM = 2
+# Normal quantile of the reported bounds (95%)
+Z = 1.96
+
+
+def strata(df):
+    """Stratum of every raw row: "passed: <first exam passed>" or "not passed"."""
+    grade = pd.to_numeric(df["ISVU Ocjena"], errors="coerce")
+    label = pd.Series("", index=df.index, dtype="str")
+    for name, _, prolaz_col, _ in reversed(df.attrs["exams"]):
+        passed = df[prolaz_col].astype(str).str.strip().str.upper() == "DA"
+        label = label.mask(passed, name)
+    return ("passed: " + label).where(grade.notna(), "not passed")
+
+
+def sample_rank(ids, seed=0):
+    """Pseudo-random rank of every id, the same for an id in any course-year."""
+    key = f"{seed:016d}"[-16:]
+    return pd.util.hash_pandas_object(
+        ids.astype(str), index=False, hash_key=key
+    ).to_numpy()
+
+
+def stratified_sample(df, fraction=PREVIEW_FRACTION, seed=0):
+    """
+    Sample of `df` (index reset) and its design: the stratum of each sampled
+    row, and the population and sample size of every stratum.
+    """
+    labels = strata(df)
+    rank = sample_rank(df["id"], seed)
+    population = labels.value_counts()
+    sizes = np.maximum(
+        np.minimum(population, MIN_PER_STRATUM),
+        np.ceil(population * fraction).astype(int),
+    )
+
+    order = np.lexsort((rank, labels.to_numpy()))
+    position = labels.iloc[order].groupby(labels.iloc[order]).cumcount()
+    keep = order[(position < labels.iloc[order].map(sizes)).to_numpy()]
+    keep.sort()
+
+    sample = df.iloc[keep].reset_index(drop=True)
+    sample.attrs = dict(df.attrs)
+    design = {
+        "strata": labels.iloc[keep].reset_index(drop=True),
+        "population": population.to_dict(),
+        "sample": sizes.to_dict(),
+    }
+    return sample, design
+
+
+def sample_data(data, fraction=PREVIEW_FRACTION, seed=0):
+    """Stratified samples of loaded data; returns (sample data, designs)."""
+    sampled = {"MA1": {}, "MA2": {}}
+    designs = {"MA1": {}, "MA2": {}}
+    for course, years in data.items():
+        for year, df in years.items():
+            sampled[course][year], designs[course][year] = stratified_sample(
+                df, fraction, seed
+            )
+    return sampled, designs
+
+
+def stratified_mean(values, labels, population, strata_subset=None):
+    """
+    Stratified estimate of the mean of `values` (one per sampled row, in
+    stratum `labels`) and its 95% bound. `strata_subset` restricts the
+    estimate to those strata, e.g. the mean over passed students.
+    """
+    names = list(population if strata_subset is None else strata_subset)
+    total = sum(population[h] for h in names)
+    if total == 0:
+        return None, None
+
+    estimate = variance = 0.0
+    for h in names:
+        y = values[(labels == h).to_numpy()].dropna()
+        if len(y) == 0:
+            continue
+        weight = population[h] / total
+        estimate += weight * float(y.mean())
+        if len(y) > 1:
+            fpc = 1 - len(y) / population[h]
+            variance += weight**2 * fpc * float(y.var()) / len(y)
+    return estimate, Z * math.sqrt(variance)
+
+
+def correlation_interval(r, n, population):
+    """Fisher z 95% interval of a correlation from n of `population` pairs."""
+    if r is None or n <= 3:
+        return None, None
+    r = max(min(r, 0.999999), -0.999999)
+    fpc = max(1 - n / population, 0) if population else 1
+    half = Z * math.sqrt(fpc / (n - 3))
+    z = math.atanh(r)
+    return math.tanh(z - half), math.tanh(z + half)
+
+
+def _passed_ids(df):
+    grade = pd.to_numeric(df["ISVU Ocjena"], errors="coerce")
+    return df.loc[grade.notna(), "id"].astype(str).unique()
+
+
+def _entry(estimate, low, high, sample, population, digits=4):
+    def r(v):
+        return None if v is None else round(v, digits)
+
+    return {
+        "estimate": r(estimate),
+        "low": r(low),
+        "high": r(high),
+        "bound": None if low is None else r((high - low) / 2),
+        "sample": int(sample),
+        "population": int(population),
+    }
+
+
+def preview_estimates(data, processed, merged, designs, stats):
+    """
+    Headline statistics with 95% bounds: pass rate and average grade per
+    course-year, MA1/MA2 points correlation per year.
+    """
+    estimates = {"MA1": {}, "MA2": {}, "correlation": {}}
+    for course in ("MA1", "MA2"):
+        for year, df in processed[course].items():
+            design = designs[course][year]
+            labels, population = design["strata"], design["population"]
+            n, total = len(df), sum(population.values())
+
+            rate, bound = stratified_mean(
+                df["passed"].astype(float), labels, population
+            )
+            passed_strata = [h for h in population if h != "not passed"]
+            grade, grade_bound = stratified_mean(
+                df["final_grade"].astype(float), labels, population, passed_strata
+            )
+            estimates[course][year] = {
+                "students": int(total),
+                "pass_rate": _entry(rate, rate - bound, rate + bound, n, total),
+                "avg_grade": _entry(
+                    grade,
+                    None if grade is None else grade - grade_bound,
+                    None if grade is None else grade + grade_bound,
+                    int((labels != "not passed").sum()),
+                    sum(population[h] for h in passed_strata),
+                    digits=2,
+                ),
+            }
+
+    for year, merged_df in merged.items():
+        pairs = merged_df[merged_df["both_passed"]].dropna(
+            subset=["ma1_points", "ma2_points"]
+        )
+        population = len(
+            np.intersect1d(
+                _passed_ids(data["MA1"][year]), _passed_ids(data["MA2"][year])
+            )
+        )
+        r = stats.get("correlation", {}).get(year, {}).get("pearson_points")
+        low, high = correlation_interval(r, len(pairs), population)
+        estimates["correlation"][year] = _entry(r, low, high, len(pairs), population)
+    return estimates
+
+
+def load_preview(data, fraction=PREVIEW_FRACTION, seed=0, merge=True):
+    """
+    Process stratified samples of loaded `data`. Returns (processed, merged,
+    designs) for the samples.
+    """
+    sampled, designs = sample_data(data, fraction, seed)
+    processed = process_all_data(sampled)
+    return processed, create_merged_data(processed) if merge else {}, designs
+
+
+def format_estimates(estimates):
+    """Text table of preview_estimates."""
+
+    def cell(entry, spec):
+        if entry["estimate"] is None:
+            return "-"
+        text = format(entry["estimate"], spec)
+        if entry["bound"] is not None:
+            text += f" ± {format(entry['bound'], spec)}"
+        return text
+
+    lines = [
+        f"{'Course':<7}{'Year':<6}{'Sample':>15}  {'Pass rate':<18}{'Avg grade':<14}"
+    ]
+    for course in ("MA1", "MA2"):
+        for year, e in estimates[course].items():
+            sample = f"{e['pass_rate']['sample']}/{e['students']}"
+            lines.append(
+                f"{course:<7}{year:<6}{sample:>15}  "
+                f"{cell(e['pass_rate'], '.3f'):<18}{cell(e['avg_grade'], '.2f'):<14}"
+            )
+    if estimates["correlation"]:
+        lines.append("")
+        lines.append(f"{'Year':<6}{'Pairs':>15}  Correlation (points)")
+        for year, e in estimates["correlation"].items():
+            pairs = f"{e['sample']}/{e['population']}"
+            lines.append(f"{year:<6}{pairs:>15}  {cell(e, '.3f')}")
+    return "\n".join(lines)
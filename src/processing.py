@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
 
+from src.profiling import stage
+
 
 def get_exam_columns(df):
     if hasattr(df, "attrs") and "exams" in df.attrs:
@@ -127,6 +129,29 @@ def detect_grade_rejection(df, course, year=None):
     return df
 
 
+# Lower point boundaries for grades 2, 3, 4 and 5
+OLD_GRADE_BOUNDARIES = (45, 55, 70, 85)
+NEW_GRADE_BOUNDARIES = (50, 58, 72, 86)
+LAST_OLD_BOUNDARIES_YEAR = 2022
+
+
+def grade_boundaries(year=None):
+    """
+    Grade boundaries in effect for `year`.
+
+    Years up to and including 2022 use OLD_GRADE_BOUNDARIES, later (or
+    unknown) years use NEW_GRADE_BOUNDARIES.
+    """
+    try:
+        year_int = int(year) if year is not None else None
+    except Exception:
+        year_int = None
+
+    if year_int is not None and year_int <= LAST_OLD_BOUNDARIES_YEAR:
+        return OLD_GRADE_BOUNDARIES
+    return NEW_GRADE_BOUNDARIES
+
+
 def points_to_grade(points, year=None):
     """Convert `points` to a grade using year-specific boundaries.
 
@@ -138,35 +163,23 @@ def points_to_grade(points, year=None):
     if pd.isna(points):
         return None
 
-    try:
-        year_int = int(year) if year is not None else None
-    except Exception:
-        year_int = None
-
-    # Older boundaries for years up to and including 2022
-    if year_int is not None and year_int <= 2022:
-        if points < 45:
-            return None
-        elif points < 55:
-            return 2
-        elif points < 70:
-            return 3
-        elif points < 85:
-            return 4
-        else:
-            return 5
-
-    # Newer boundaries for years after 2022 (or unknown year)
-    if points < 50:
+    boundaries = grade_boundaries(year)
+    if points < boundaries[0]:
         return None
-    elif points < 58:
-        return 2
-    elif points < 72:
-        return 3
-    elif points < 86:
-        return 4
-    else:
-        return 5
+
+    grade = 2
+    for boundary in boundaries[1:]:
+        if points >= boundary:
+            grade += 1
+    return grade
+
+
+def points_to_grades(points, year=None):
+    """Vectorized points_to_grade: float grades, NaN below the passing boundary."""
+    boundaries = np.asarray(grade_boundaries(year), dtype=float)
+    points = np.asarray(points, dtype=float)
+    grades = np.searchsorted(boundaries, points, side="right").astype(float) + 1
+    return np.where(points >= boundaries[0], grades, np.nan)
 
 
 def merge_ma1_ma2(ma1_df, ma2_df):
@@ -219,9 +232,13 @@ def process_all_data(data):
 
     for course in ["MA1", "MA2"]:
         for year, df in data[course].items():
-            df_clean = clean_dataframe(df)
-            df_computed = add_computed_columns(df_clean, course)
-            df_final = detect_grade_rejection(df_computed, course, year)
+            rows = len(df)
+            with stage("process.clean_dataframe", rows):
+                df_clean = clean_dataframe(df)
+            with stage("process.add_computed_columns", rows):
+                df_computed = add_computed_columns(df_clean, course)
+            with stage("process.detect_grade_rejection", rows):
+                df_final = detect_grade_rejection(df_computed, course, year)
             processed[course][year] = df_final
 
     return processed
@@ -235,6 +252,8 @@ def create_merged_data(processed):
     common_years = ma1_years & ma2_years
 
     for year in common_years:
-        merged[year] = merge_ma1_ma2(processed["MA1"][year], processed["MA2"][year])
+        ma1, ma2 = processed["MA1"][year], processed["MA2"][year]
+        with stage("process.merge_ma1_ma2", len(ma1) + len(ma2)):
+            merged[year] = merge_ma1_ma2(ma1, ma2)
 
     return merged
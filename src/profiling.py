@@ -0,0 +1,200 @@
+"""
+Per-stage timing and memory instrumentation.
+
+    profiling.start()
+    with profiling.stage("analysis.dropout", rows=n):
+        ...
+    profiling.write_trace("output/profile.json")
+    print(profiling.format_table())
+
+Every stage records wall time, CPU time, the peak memory allocated while it
+ran (tracemalloc, above what was allocated when it started) and rows per
+second. Stages nest; each record names its parent. When profiling is not
+started, stage() does nothing.
+
+CPU time is process-wide and so is the tracemalloc peak, so stages that run
+at the same time on other threads (the CSV reader of src/pipeline.py) are
+included in each other's numbers. Stages run in worker processes are
+recorded there and handed back with collect().
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+# Records of this process; None while profiling is off
+_records = None
+_memory = False
+_local = threading.local()
+
+
+def start(memory=True):
+    """Start recording stages (and tracing allocations with `memory`)."""
+    global _records, _memory
+    _records = []
+    _memory = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def stop():
+    """Stop recording and return the records."""
+    global _records
+    records, _records = _records or [], None
+    if _memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return records
+
+
+def enabled():
+    return _records is not None
+
+
+def memory_enabled():
+    return enabled() and _memory
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+@contextlib.contextmanager
+def stage(name, rows=None):
+    """
+    Record the enclosed block as stage `name`. The yielded dict takes
+    "rows" if the row count is only known inside the block.
+    """
+    if _records is None:
+        yield {}
+        return
+
+    stack = _stack()
+    entry = {"name": name, "peak": 0, "current": 0, "rows": rows}
+    if _memory:
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            # The parent keeps the peak reached before this stage resets it
+            stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+        tracemalloc.reset_peak()
+        entry["current"] = current
+        entry["peak"] = current
+    stack.append(entry)
+
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    try:
+        yield entry
+    finally:
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+        stack.pop()
+        rows = entry["rows"]
+
+        record = {
+            "stage": name,
+            "parent": stack[-1]["name"] if stack else None,
+            "thread": threading.current_thread().name,
+            "wall_s": round(wall, 6),
+            "cpu_s": round(cpu, 6),
+            "peak_alloc_mb": None,
+            "rows": rows,
+            "rows_per_s": round(rows / wall, 1) if rows and wall > 0 else None,
+        }
+        if _memory:
+            peak = max(entry["peak"], tracemalloc.get_traced_memory()[1])
+            record["peak_alloc_mb"] = round((peak - entry["current"]) / 1024**2, 3)
+            if stack:
+                stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+        if _records is not None:
+            _records.append(record)
+
+
+def collect(since=0):
+    """
+    Records made after the first `since` ones, removed from this process's
+    trace. Used to return the records of a worker task to the parent.
+    """
+    if _records is None:
+        return []
+    records = _records[since:]
+    del _records[since:]
+    return records
+
+
+def add(records):
+    """Append records made elsewhere (e.g. in a worker process)."""
+    if _records is not None:
+        _records.extend(records)
+
+
+def records():
+    return list(_records or [])
+
+
+def summarize(records):
+    """Totals per stage name, in order of first appearance."""
+    summary = {}
+    for r in records:
+        s = summary.setdefault(
+            r["stage"],
+            {
+                "stage": r["stage"],
+                "calls": 0,
+                "wall_s": 0.0,
+                "cpu_s": 0.0,
+                "peak_alloc_mb": None,
+                "rows": None,
+            },
+        )
+        s["calls"] += 1
+        s["wall_s"] += r["wall_s"]
+        s["cpu_s"] += r["cpu_s"]
+        if r["peak_alloc_mb"] is not None:
+            s["peak_alloc_mb"] = max(s["peak_alloc_mb"] or 0, r["peak_alloc_mb"])
+        if r["rows"] is not None:
+            s["rows"] = (s["rows"] or 0) + r["rows"]
+
+    for s in summary.values():
+        s["wall_s"] = round(s["wall_s"], 6)
+        s["cpu_s"] = round(s["cpu_s"], 6)
+        s["rows_per_s"] = (
+            round(s["rows"] / s["wall_s"], 1) if s["rows"] and s["wall_s"] else None
+        )
+    return list(summary.values())
+
+
+def write_trace(path, trace=None):
+    """Write the records and their per-stage summary as JSON."""
+    trace = records() if trace is None else trace
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"stages": trace, "summary": summarize(trace)}, f, indent=1)
+
+
+def format_table(trace=None, limit=None):
+    """Per-stage summary as a text table, slowest stages first."""
+    trace = records() if trace is None else trace
+    rows = sorted(summarize(trace), key=lambda s: s["wall_s"], reverse=True)
+    if limit is not None:
+        rows = rows[:limit]
+
+    def fmt(value, spec):
+        return "-" if value is None else format(value, spec)
+
+    width = max([len("Stage")] + [len(s["stage"]) for s in rows])
+    lines = [
+        f"{'Stage':<{width}} {'Calls':>5} {'Wall s':>8} {'CPU s':>8} "
+        f"{'Peak MB':>8} {'Rows/s':>10}"
+    ]
+    for s in rows:
+        lines.append(
+            f"{s['stage']:<{width}} {s['calls']:>5} {s['wall_s']:>8.3f} "
+            f"{s['cpu_s']:>8.3f} {fmt(s['peak_alloc_mb'], '>8.2f')} "
+            f"{fmt(s['rows_per_s'], '>10,.0f')}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,345 @@
+"""
+Ad-hoc queries over all processed course-years.
+
+`build_store` flattens `processed` into two columnar tables:
+
+- enrollments: one row per student per course-year
+- attempts: one row per exam period a student attempted (points > 0 or "DA")
+
+Low-cardinality columns (course, year, passed, grades, exam, ...) get a
+precomputed bitmap per value, so predicates are answered by OR-ing/AND-ing
+bitmaps instead of rescanning the data. Attempt rows keep a pointer to their
+enrollment row, so attempts can be filtered and grouped by enrollment columns
+(e.g. MA1 grade).
+
+Example - MA2 pass rate by exam for students with MA1 grade >= 4 in 2021-2023:
+
+    store = build_store(processed)
+    store.query(
+        table="attempts",
+        where={"course": "MA2", "year": (2021, 2023), "ma1_grade": (4, None)},
+        group_by="exam",
+        agg={"pass_rate": ("passed", "mean"), "attempts": ("passed", "count")},
+    )
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from src.processing import get_exam_columns
+
+ENROLLMENT_INDEXED = [
+    "course",
+    "year",
+    "passed",
+    "grade",
+    "num_attempts",
+    "passed_on_exam",
+    "pass_exam_position",
+    "passed_on_continual",
+    "rejected_grade",
+    "ma1_passed",
+    "ma1_grade",
+    "ma2_passed",
+    "ma2_grade",
+]
+ATTEMPT_INDEXED = ["exam", "exam_position", "passed"]
+
+AGGREGATES = ["count", "sum", "mean", "min", "max"]
+
+
+def _cross_course_columns(processed, course, year, df):
+    """MA1/MA2 outcome of the same student in the same year (NaN if absent)."""
+    result = {}
+    for other in ["MA1", "MA2"]:
+        prefix = other.lower()
+        if other == course:
+            result[f"{prefix}_passed"] = df["passed"].to_numpy(dtype=bool)
+            result[f"{prefix}_grade"] = df["final_grade"].to_numpy(dtype=float)
+            continue
+
+        other_df = processed[other].get(year)
+        if other_df is None:
+            result[f"{prefix}_passed"] = np.zeros(len(df), dtype=bool)
+            result[f"{prefix}_grade"] = np.full(len(df), np.nan)
+            continue
+
+        lookup = other_df.drop_duplicates("id").set_index("id")
+        result[f"{prefix}_passed"] = (
+            df["id"].map(lookup["passed"]).fillna(False).to_numpy(dtype=bool)
+        )
+        result[f"{prefix}_grade"] = (
+            df["id"].map(lookup["final_grade"]).to_numpy(dtype=float)
+        )
+    return result
+
+
+def _index(values):
+    """Map each distinct value (None for NaN) to a boolean bitmap."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    index = {}
+    for code, value in enumerate(uniques):
+        key = value.item() if hasattr(value, "item") else value
+        index[key] = codes == code
+    if (codes < 0).any():
+        index[None] = codes < 0
+    return index
+
+
+class StudentStore:
+    def __init__(self, enrollments, attempts, cache_size=256):
+        self.tables = {"enrollments": enrollments, "attempts": attempts}
+        self.indexes = {
+            "enrollments": {c: _index(enrollments[c]) for c in ENROLLMENT_INDEXED},
+            "attempts": {c: _index(attempts[c]) for c in ATTEMPT_INDEXED},
+        }
+        # Predicate masks and query results, each an LRU of cache_size entries
+        self._mask_cache = OrderedDict()
+        self._result_cache = OrderedDict()
+        self._cache_size = cache_size
+
+    def _remember(self, cache, key, value):
+        """Add to an LRU cache, evicting the least recently used entry."""
+        cache[key] = value
+        if len(cache) > self._cache_size:
+            cache.popitem(last=False)
+
+    def __len__(self):
+        return len(self.tables["enrollments"]["id"])
+
+    def columns(self, table="enrollments"):
+        cols = list(self.tables[table].keys())
+        if table == "attempts":
+            cols += [c for c in self.tables["enrollments"] if c not in cols]
+        return cols
+
+    def _resolve(self, table, column):
+        """Return (table that owns the column, row mapping or None)."""
+        if column in self.tables[table]:
+            return table, None
+        if table == "attempts" and column in self.tables["enrollments"]:
+            return "enrollments", self.tables["attempts"]["row"]
+        raise KeyError(f"Unknown column: {column}")
+
+    def _column(self, table, column):
+        owner, rows = self._resolve(table, column)
+        values = self.tables[owner][column]
+        return values if rows is None else values[rows]
+
+    def _predicate_mask(self, table, column, condition):
+        """
+        Evaluate one predicate. `condition` can be a value, a (lo, hi)
+        inclusive range (None for an open end), a list/set of values or a
+        callable taking the column array.
+        """
+        if callable(condition):
+            return np.asarray(condition(self._column(table, column)), dtype=bool)
+
+        if isinstance(condition, set):
+            condition = sorted(condition, key=repr)
+        key = (table, column, repr(condition))
+        if key in self._mask_cache:
+            self._mask_cache.move_to_end(key)
+            return self._mask_cache[key]
+
+        owner, rows = self._resolve(table, column)
+        index = self.indexes[owner].get(column)
+        n_owner = len(self.tables[owner]["id" if owner == "enrollments" else "row"])
+
+        if index is not None:
+            if isinstance(condition, tuple):
+                lo, hi = condition
+                keys = [
+                    k
+                    for k in index
+                    if k is not None
+                    and (lo is None or k >= lo)
+                    and (hi is None or k <= hi)
+                ]
+            elif isinstance(condition, list):
+                keys = [k for k in condition if k in index]
+            else:
+                keys = [condition] if condition in index else []
+
+            mask = np.zeros(n_owner, dtype=bool)
+            for k in keys:
+                mask |= index[k]
+        else:
+            values = self.tables[owner][column]
+            if isinstance(condition, tuple):
+                lo, hi = condition
+                mask = np.ones(n_owner, dtype=bool)
+                if lo is not None:
+                    mask &= values >= lo
+                if hi is not None:
+                    mask &= values <= hi
+            elif isinstance(condition, list):
+                mask = np.isin(values, condition)
+            else:
+                mask = values == condition
+
+        if rows is not None:
+            mask = mask[rows]
+
+        self._remember(self._mask_cache, key, mask)
+        return mask
+
+    def select(self, where=None, table="enrollments"):
+        """Boolean mask of the rows of `table` matching all predicates."""
+        n = len(self.tables[table]["id" if table == "enrollments" else "row"])
+        mask = np.ones(n, dtype=bool)
+        for column, condition in (where or {}).items():
+            mask = mask & self._predicate_mask(table, column, condition)
+        return mask
+
+    def frame(self, where=None, columns=None, table="enrollments"):
+        """Materialize matching rows as a DataFrame."""
+        mask = self.select(where, table)
+        columns = columns or self.columns(table)
+        return pd.DataFrame({c: self._column(table, c)[mask] for c in columns})
+
+    def query(self, where=None, group_by=None, agg=None, table="enrollments"):
+        """
+        Filter, group and aggregate.
+
+        `agg` maps output names to (column, function) with function one of
+        AGGREGATES; the default is a row count. Results of queries without
+        callable predicates are cached.
+        """
+        agg = agg or {"count": ("id" if table == "enrollments" else "row", "count")}
+        if isinstance(group_by, str):
+            group_by = [group_by]
+        group_by = list(group_by or [])
+
+        cacheable = not any(callable(c) for c in (where or {}).values())
+        cache_key = None
+        if cacheable:
+            cache_key = repr(
+                (
+                    table,
+                    sorted((where or {}).items(), key=repr),
+                    group_by,
+                    sorted(agg.items()),
+                )
+            )
+            if cache_key in self._result_cache:
+                self._result_cache.move_to_end(cache_key)
+                return self._result_cache[cache_key].copy()
+
+        mask = self.select(where, table)
+
+        if group_by:
+            codes = np.zeros(int(mask.sum()), dtype=np.int64)
+            levels = []
+            for column in group_by:
+                col_codes, uniques = pd.factorize(
+                    self._column(table, column)[mask], sort=True, use_na_sentinel=False
+                )
+                codes = codes * len(uniques) + col_codes
+                levels.append(uniques)
+            group_codes, codes = np.unique(codes, return_inverse=True)
+            n_groups = len(group_codes)
+
+            keys = {}
+            remainder = group_codes
+            for column, uniques in reversed(list(zip(group_by, levels))):
+                keys[column] = np.asarray(uniques)[remainder % len(uniques)]
+                remainder = remainder // len(uniques)
+            result = {column: keys[column] for column in group_by}
+        else:
+            codes = np.zeros(int(mask.sum()), dtype=np.int64)
+            n_groups = 1
+            result = {}
+
+        for name, (column, func) in agg.items():
+            if func not in AGGREGATES:
+                raise ValueError(f"Unknown aggregate: {func}")
+            values = self._column(table, column)[mask]
+            if func == "count":
+                result[name] = np.bincount(codes, minlength=n_groups)
+                continue
+
+            values = values.astype(float)
+            valid = ~np.isnan(values)
+            counts = np.bincount(codes[valid], minlength=n_groups)
+            if func in ("sum", "mean"):
+                sums = np.bincount(
+                    codes[valid], weights=values[valid], minlength=n_groups
+                )
+                if func == "sum":
+                    result[name] = sums
+                else:
+                    with np.errstate(invalid="ignore", divide="ignore"):
+                        result[name] = np.where(counts > 0, sums / counts, np.nan)
+            else:
+                grouped = pd.Series(values[valid]).groupby(codes[valid])
+                reduced = grouped.min() if func == "min" else grouped.max()
+                result[name] = reduced.reindex(range(n_groups)).to_numpy()
+
+        df = pd.DataFrame(result)
+        if cache_key is not None:
+            self._remember(self._result_cache, cache_key, df)
+            return df.copy()
+        return df
+
+
+def build_store(processed):
+    enrollment_parts = []
+    attempt_parts = []
+    offset = 0
+
+    for course in ["MA1", "MA2"]:
+        for year in sorted(processed[course].keys()):
+            df = processed[course][year]
+            n = len(df)
+            exams = get_exam_columns(df)
+            exam_names = [name for name, _, _, _ in exams]
+
+            position = pd.Categorical(
+                df["passed_on_exam"], categories=exam_names
+            ).codes.astype(np.int16)
+
+            part = {
+                "id": df["id"].to_numpy(dtype=object),
+                "course": np.full(n, course, dtype=object),
+                "year": np.full(n, year, dtype=np.int32),
+                "passed": df["passed"].to_numpy(dtype=bool),
+                "grade": df["final_grade"].to_numpy(dtype=float),
+                "points": df["final_points"].to_numpy(dtype=float),
+                "num_attempts": df["num_attempts"].to_numpy(dtype=np.int32),
+                "passed_on_exam": df["passed_on_exam"].to_numpy(dtype=object),
+                "pass_exam_position": position,
+                "passed_on_continual": df["passed_on_continual"].to_numpy(dtype=bool),
+                "rejected_grade": df["rejected_grade"].to_numpy(dtype=bool),
+                "grade_change": df["grade_change"].to_numpy(dtype=np.int32),
+            }
+            part.update(_cross_course_columns(processed, course, year, df))
+            enrollment_parts.append(part)
+
+            for pos, (name, points_col, prolaz_col, time_col) in enumerate(exams):
+                points = df[points_col].to_numpy(dtype=float)
+                passed = df[prolaz_col].to_numpy(dtype=bool)
+                attempted = np.flatnonzero((points > 0) | passed)
+                attempt_parts.append(
+                    {
+                        "row": attempted + offset,
+                        "exam": np.full(len(attempted), name, dtype=object),
+                        "exam_position": np.full(len(attempted), pos, dtype=np.int16),
+                        "exam_points": points[attempted],
+                        "passed": passed[attempted],
+                        "date": df[time_col].to_numpy()[attempted],
+                    }
+                )
+
+            offset += n
+
+    def concat(parts, fallback):
+        if not parts:
+            return {c: np.empty(0) for c in fallback}
+        return {c: np.concatenate([p[c] for p in parts]) for c in parts[0]}
+
+    enrollments = concat(enrollment_parts, ["id"] + ENROLLMENT_INDEXED)
+    attempts = concat(attempt_parts, ["row", "exam_points", "date"] + ATTEMPT_INDEXED)
+    return StudentStore(enrollments, attempts)
@@ -0,0 +1,444 @@
+"""
+Single-file HTML report.
+
+The report embeds a compact, column-oriented JSON digest of the stats dict
+and draws its charts client-side as inline SVG, so it needs no images or
+network assets and grows only by a few numbers per additional year.
+"""
+
+import json
+import math
+import os
+
+import numpy as np
+
+REPORT_FILE = "report.html"
+REPORT_TITLE = "MATAN - analiza ispita"
+
+# Analyses the report is drawn from; missing ones just drop their section
+REPORT_ANALYSES = [
+    "single_course",
+    "pass_by_exam",
+    "correlation",
+    "grade_matrix",
+    "ma1_predicts_ma2",
+    "covid_impact",
+    "threshold_what_if",
+    "points_histograms",
+]
+
+
+def _value(value, digits=4):
+    """Plain JSON value: numpy scalars unwrapped, NaN as null, floats rounded."""
+    if isinstance(value, (np.integer, np.bool_)):
+        return value.item()
+    if isinstance(value, (float, np.floating)):
+        value = float(value)
+        return None if math.isnan(value) else round(value, digits)
+    return value
+
+
+def _column(values, digits=4):
+    return [_value(v, digits) for v in values]
+
+
+def _courses(stats):
+    result = {}
+    for course in ["MA1", "MA2"]:
+        single = stats["single_course"][course]
+        years = sorted(single)
+        if not years:
+            continue
+
+        pass_by_exam = (stats.get("pass_by_exam") or {}).get(course, {})
+        exams = []
+        for year in years:
+            for exam in pass_by_exam.get(year, {}):
+                if exam not in exams:
+                    exams.append(exam)
+
+        result[course] = {
+            "years": years,
+            "total": _column(single[y]["total_students"] for y in years),
+            "passed": _column(single[y]["passed_students"] for y in years),
+            "pass_rate": _column(single[y]["pass_rate"] for y in years),
+            "avg_grade": _column(single[y]["avg_grade"] for y in years),
+            "avg_points": _column(single[y]["avg_points_passed"] for y in years),
+            "threshold": _column(single[y]["pass_threshold"] for y in years),
+            "grades": [
+                [single[y]["grade_distribution"].get(g, 0) for g in [2, 3, 4, 5]]
+                for y in years
+            ],
+            "exams": exams,
+            "exam_rate": [
+                _column(
+                    pass_by_exam.get(y, {}).get(exam, {}).get("rate") for y in years
+                )
+                for exam in exams
+            ],
+        }
+    return result
+
+
+def _correlation(stats):
+    correlation = stats.get("correlation") or {}
+    years = sorted(correlation)
+    if not years:
+        return None
+    return {
+        "years": years,
+        "pearson_points": _column(correlation[y]["pearson_points"] for y in years),
+        "pearson_grades": _column(correlation[y]["pearson_grades"] for y in years),
+        "ma2_before_ma1": _column(correlation[y]["ma2_before_ma1"] for y in years),
+    }
+
+
+def _covid(stats):
+    covid = stats.get("covid_impact")
+    if not covid:
+        return None
+
+    # Same period labels as the figures, on one line
+    from src.visualization import covid_period_labels
+
+    labels = [label.replace("\n", " ") for label in covid_period_labels(covid)]
+    result = {"labels": labels}
+    for course in ["MA1", "MA2"]:
+        result[course] = _column(
+            covid[course][f"{name}_pass_rate"] for name in covid["windows"]
+        )
+    return result
+
+
+def _transitions(stats):
+    matrices = stats.get("grade_matrix") or {}
+    predicts = stats.get("ma1_predicts_ma2") or {}
+    years = sorted(matrices)
+    if not years:
+        return None
+    return {
+        "years": years,
+        "matrix": [
+            np.asarray(matrices[y], dtype=int).tolist() if len(matrices[y]) else []
+            for y in years
+        ],
+        "ma2_pass_rate": [
+            _column(
+                (predicts.get(y) or {}).get(g, {}).get("ma2_pass_rate")
+                for g in [2, 3, 4, 5]
+            )
+            for y in years
+        ],
+    }
+
+
+def _what_if(stats):
+    what_if = stats.get("threshold_what_if")
+    if not what_if or what_if["curves"].empty:
+        return None
+
+    from src.processing import OLD_GRADE_BOUNDARIES, NEW_GRADE_BOUNDARIES
+
+    curves = what_if["curves"]
+    result = {"old": OLD_GRADE_BOUNDARIES[0], "new": NEW_GRADE_BOUNDARIES[0]}
+    for course in ["MA1", "MA2"]:
+        c = curves[curves["course"] == course]
+        result[course] = {
+            "threshold": _column(c["boundary_2"], 2),
+            "pass_rate": _column(c["pass_rate"]),
+        }
+    return result
+
+
+def _histograms(stats):
+    histograms = stats.get("points_histograms")
+    if not histograms:
+        return None
+
+    result = {"edges": None, "groups": []}
+    for course in ["MA1", "MA2"]:
+        for year, hist in sorted(histograms.get(course, {}).items()):
+            result["edges"] = _column(hist["edges"], 2)
+            result["groups"].append(
+                {
+                    "label": f"{course} {year}",
+                    "exams": hist["exams"],
+                    "passed": np.asarray(hist["passed"]).tolist(),
+                    "failed": np.asarray(hist["failed"]).tolist(),
+                }
+            )
+    return result if result["groups"] else None
+
+
+def _colors():
+    """The figures' course, pass/fail and grade colours."""
+    from src.visualization import COLORS, GRADE_COLORS
+
+    return dict(COLORS, grades=GRADE_COLORS)
+
+
+def report_data(stats):
+    """Compact, JSON-serializable digest of the stats the report draws."""
+    return {
+        "colors": _colors(),
+        "courses": _courses(stats),
+        "correlation": _correlation(stats),
+        "covid": _covid(stats),
+        "transitions": _transitions(stats),
+        "what_if": _what_if(stats),
+        "histograms": _histograms(stats),
+    }
+
+
+def render_html(stats, title=REPORT_TITLE):
+    data = json.dumps(report_data(stats), separators=(",", ":"), allow_nan=False)
+    # Keep the embedded JSON from closing its <script> element
+    data = data.replace("</", "<\\/")
+    return HTML_TEMPLATE.replace("__TITLE__", title).replace("__DATA__", data)
+
+
+def write_html_report(stats, output_dir, filename=REPORT_FILE, title=REPORT_TITLE):
+    reports_dir = os.path.join(output_dir, "reports")
+    os.makedirs(reports_dir, exist_ok=True)
+
+    path = os.path.join(reports_dir, filename)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render_html(stats, title))
+    os.replace(tmp_path, path)
+    print(f"  - {filename}... saved")
+
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="hr">
+<head>
+<meta charset="utf-8">
+<title>__TITLE__</title>
+<style>
+body{font-family:sans-serif;margin:2em auto;max-width:1100px;color:#222}
+h1{font-size:1.6em}h2{font-size:1.2em;margin-top:2em;border-bottom:1px solid #ddd}
+.row{display:flex;flex-wrap:wrap;gap:1em}.chart{flex:1 1 500px}
+svg{width:100%;height:auto;font-size:11px}
+table{border-collapse:collapse;font-size:13px}
+td,th{border:1px solid #ddd;padding:3px 8px;text-align:right}
+.legend span{display:inline-block;margin-right:1em}
+.legend i{display:inline-block;width:10px;height:10px;margin-right:4px}
+</style>
+</head>
+<body>
+<h1>__TITLE__</h1>
+<div id="report"></div>
+<script type="application/json" id="data">__DATA__</script>
+<script>
+"use strict";
+const D = JSON.parse(document.getElementById("data").textContent);
+const C = D.colors;
+const GRADE_COLORS = C.grades;
+const PALETTE = [C.MA1, C.MA2, "#F18F01", "#7B2CBF", "#555"];
+const W = 520, H = 280, M = {l: 45, r: 10, t: 10, b: 40};
+const root = document.getElementById("report");
+
+function el(tag, attrs, parent) {
+  const ns = ["svg", "line", "rect", "path", "text", "circle", "title"].includes(tag);
+  const e = ns ? document.createElementNS("http://www.w3.org/2000/svg", tag)
+               : document.createElement(tag);
+  for (const [k, v] of Object.entries(attrs || {})) {
+    if (k === "text") e.textContent = v; else e.setAttribute(k, v);
+  }
+  if (parent) parent.appendChild(e);
+  return e;
+}
+
+function section(title) {
+  el("h2", {text: title}, root);
+  return el("div", {class: "row"}, root);
+}
+
+function legend(parent, names, colors) {
+  const div = el("div", {class: "legend"}, parent);
+  names.forEach((n, i) => {
+    const s = el("span", {}, div);
+    el("i", {style: "background:" + colors[i % colors.length]}, s);
+    s.appendChild(document.createTextNode(n));
+  });
+}
+
+// Axes for an x domain of category labels and a numeric y domain
+function frame(parent, title, labels, yMax, yLabel) {
+  const box = el("div", {class: "chart"}, parent);
+  el("h3", {text: title, style: "font-size:1em"}, box);
+  const svg = el("svg", {viewBox: `0 0 ${W} ${H}`}, box);
+  const iw = W - M.l - M.r, ih = H - M.t - M.b;
+  const y = v => M.t + ih - (v / yMax) * ih;
+  for (let i = 0; i <= 4; i++) {
+    const v = yMax * i / 4;
+    el("line", {x1: M.l, x2: W - M.r, y1: y(v), y2: y(v), stroke: "#eee"}, svg);
+    el("text", {x: M.l - 4, y: y(v) + 4, "text-anchor": "end",
+                text: +v.toFixed(2)}, svg);
+  }
+  const step = iw / labels.length;
+  const every = Math.ceil(labels.length / 12);
+  labels.forEach((l, i) => {
+    if (i % every === 0) {
+      el("text", {x: M.l + step * (i + 0.5), y: H - M.b + 14,
+                  "text-anchor": "middle", text: l}, svg);
+    }
+  });
+  el("text", {x: 12, y: M.t + ih / 2, "text-anchor": "middle",
+              transform: `rotate(-90 12 ${M.t + ih / 2})`, text: yLabel}, svg);
+  return {box, svg, y, step, x: i => M.l + step * (i + 0.5), ih};
+}
+
+function lineChart(parent, title, labels, series, yMax, yLabel) {
+  const f = frame(parent, title, labels, yMax, yLabel);
+  series.forEach(s => {
+    const pts = s.values.map((v, i) => v === null ? null : [f.x(i), f.y(v)]);
+    const d = pts.filter(p => p).map((p, i) => (i ? "L" : "M") + p.join(",")).join("");
+    el("path", {d, fill: "none", stroke: s.color, "stroke-width": 2}, f.svg);
+    pts.forEach((p, i) => {
+      if (!p) return;
+      el("circle", {cx: p[0], cy: p[1], r: 3, fill: s.color}, f.svg)
+        .appendChild(el("title", {text: `${s.name} ${labels[i]}: ${s.values[i]}`}));
+    });
+  });
+  legend(f.box, series.map(s => s.name), series.map(s => s.color));
+}
+
+function barChart(parent, title, labels, series, yLabel, stacked) {
+  const totals = labels.map((_, i) => series.reduce((a, s) => a + (s.values[i] || 0), 0));
+  const peak = stacked ? Math.max(...totals)
+                       : Math.max(...series.flatMap(s => s.values.map(v => v || 0)));
+  const f = frame(parent, title, labels, peak || 1, yLabel);
+  const width = f.step * 0.8 / (stacked ? 1 : series.length);
+  labels.forEach((l, i) => {
+    let base = 0;
+    series.forEach((s, j) => {
+      const v = s.values[i] || 0;
+      const x0 = f.x(i) - f.step * 0.4 + (stacked ? 0 : j * width);
+      const top = f.y(base + v);
+      el("rect", {x: x0, y: top, width: width, height: f.y(base) - top,
+                  fill: s.color}, f.svg)
+        .appendChild(el("title", {text: `${s.name} ${l}: ${v}`}));
+      if (stacked) base += v;
+    });
+  });
+  legend(f.box, series.map(s => s.name), series.map(s => s.color));
+}
+
+function table(parent, head, rows) {
+  const t = el("table", {}, el("div", {class: "chart"}, parent));
+  const tr = el("tr", {}, t);
+  head.forEach(h => el("th", {text: h}, tr));
+  rows.forEach(r => {
+    const row = el("tr", {}, t);
+    r.forEach(c => el("td", c && c.style ? c : {text: c === null ? "-" : c}, row));
+  });
+  return t;
+}
+
+const pct = v => v === null ? null : +(v * 100).toFixed(1);
+const courses = Object.keys(D.courses);
+
+if (courses.length) {
+  const years = [...new Set(courses.flatMap(c => D.courses[c].years))].sort();
+  const at = (c, key) => years.map(y => {
+    const i = D.courses[c].years.indexOf(y);
+    return i < 0 ? null : D.courses[c][key][i];
+  });
+
+  let row = section("Prolaznost i upisi");
+  lineChart(row, "Prolaznost po godinama", years,
+    courses.map(c => ({name: c, color: C[c], values: at(c, "pass_rate").map(pct)})),
+    100, "Prolaznost (%)");
+  barChart(row, "Upisani studenti", years,
+    courses.map(c => ({name: c, color: C[c], values: at(c, "total")})), "Studenti");
+
+  table(root, ["Kolegij", "Godina", "Studenti", "Položili", "Prolaznost (%)",
+               "Prag", "Prosj. bodovi", "Prosj. ocjena"],
+    courses.flatMap(c => D.courses[c].years.map((y, i) => [c, y,
+      D.courses[c].total[i], D.courses[c].passed[i], pct(D.courses[c].pass_rate[i]),
+      D.courses[c].threshold[i], D.courses[c].avg_points[i], D.courses[c].avg_grade[i]])));
+
+  row = section("Distribucija ocjena");
+  courses.forEach(c => barChart(row, c, D.courses[c].years,
+    [2, 3, 4, 5].map((g, j) => ({name: "Ocjena " + g, color: GRADE_COLORS[j],
+      values: D.courses[c].grades.map(r => r[j])})), "Studenti", true));
+
+  row = section("Prolaznost po ispitnom roku");
+  courses.filter(c => D.courses[c].exams.length).forEach(c => lineChart(row, c,
+    D.courses[c].years, D.courses[c].exams.map((e, j) => ({name: e,
+      color: PALETTE[j % PALETTE.length], values: D.courses[c].exam_rate[j].map(pct)})),
+    100, "Prolaznost (%)"));
+}
+
+if (D.covid) {
+  const row = section("Utjecaj COVID-a");
+  barChart(row, "Prolaznost po razdobljima", D.covid.labels,
+    ["MA1", "MA2"].map(c => ({name: c, color: C[c], values: D.covid[c].map(pct)})),
+    "Prolaznost (%)");
+}
+
+if (D.correlation) {
+  const row = section("Povezanost MA1 i MA2");
+  lineChart(row, "Korelacija MA1 i MA2", D.correlation.years, [
+    {name: "Bodovi (Pearson)", color: PALETTE[0], values: D.correlation.pearson_points},
+    {name: "Ocjene (Pearson)", color: PALETTE[1], values: D.correlation.pearson_grades},
+  ], 1, "Korelacija");
+  barChart(row, "MA2 položen prije MA1", D.correlation.years,
+    [{name: "Studenti", color: C.MA2, values: D.correlation.ma2_before_ma1}], "Studenti");
+}
+
+if (D.transitions) {
+  const T = D.transitions;
+  const row = section("Ocjena MA1 → MA2");
+  const box = el("div", {class: "chart"}, row);
+  const select = el("select", {}, box);
+  T.years.forEach((y, i) => el("option", {value: i, text: y}, select));
+  const holder = el("div", {}, box);
+  const draw = () => {
+    holder.innerHTML = "";
+    const m = T.matrix[select.value];
+    const peak = Math.max(1, ...m.flat());
+    table(holder, ["MA1 \\\\ MA2", 2, 3, 4, 5, "MA2 prolaznost (%)"],
+      m.map((r, i) => [i + 2, ...r.map(v => ({text: v,
+        style: `background:rgba(46,134,171,${(v / peak).toFixed(2)})`})),
+        pct(T.ma2_pass_rate[select.value][i])]));
+  };
+  select.onchange = draw;
+  select.value = T.years.length - 1;
+  draw();
+}
+
+if (D.what_if) {
+  const Q = D.what_if;
+  const row = section("Simulacija praga prolaznosti");
+  const labels = Q.MA1.threshold.length ? Q.MA1.threshold : Q.MA2.threshold;
+  lineChart(row, `Prolaznost ovisno o pragu (stari ${Q.old}, novi ${Q.new})`, labels,
+    ["MA1", "MA2"].filter(c => Q[c].pass_rate.length)
+      .map(c => ({name: c, color: C[c], values: Q[c].pass_rate.map(pct)})),
+    100, "Prolaznost (%)");
+}
+
+if (D.histograms) {
+  const Hg = D.histograms;
+  const row = section("Bodovi po ispitnom roku");
+  const box = el("div", {class: "chart"}, row);
+  const select = el("select", {}, box);
+  Hg.groups.forEach((g, i) => el("option", {value: i, text: g.label}, select));
+  const holder = el("div", {class: "row"}, box);
+  const labels = Hg.edges.slice(0, -1);
+  const draw = () => {
+    holder.innerHTML = "";
+    const g = Hg.groups[select.value];
+    g.exams.forEach((e, j) => barChart(holder, e, labels, [
+      {name: "Pao", color: C.failed, values: g.failed[j]},
+      {name: "Položio", color: C.passed, values: g.passed[j]},
+    ], "Studenti", true));
+  };
+  select.onchange = draw;
+  draw();
+}
+</script>
+</body>
+</html>
+"""
@@ -0,0 +1,261 @@
+"""
+Local HTTP service over the analysis results.
+
+Data is loaded and processed once and kept in memory together with the
+merged frames and the stats. Endpoints:
+
+    GET  /analyses               names of the analyses
+    GET  /analyses/<name>        one analysis as JSON
+    GET  /figures                file names of the figures
+    GET  /figures/<file>.png     one figure, rendered on first request
+    POST /reload                 re-read added, changed or removed CSVs
+
+Requests are handled on threads; responses are cached per path until the
+next reload, so repeat requests are answered from memory.
+"""
+
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from src.analysis import ANALYSES, compute_all_statistics, update_statistics
+from src.ingestion import load_all_csvs
+from src.processing import create_merged_data, process_all_data
+from src.watch import apply_changes, diff_scans, scan
+
+HOST = "127.0.0.1"
+PORT = 8765
+
+
+def _file_signature(path):
+    """(mtime_ns, size) of a file, None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def jsonable(obj):
+    """Convert stats values (numpy, DataFrames, tuple/int keys) to JSON types."""
+    if isinstance(obj, dict):
+        return {str(k): jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [jsonable(v) for v in obj]
+    if isinstance(obj, pd.DataFrame):
+        return jsonable(obj.reset_index().to_dict(orient="records"))
+    if isinstance(obj, pd.Series):
+        return jsonable(obj.to_dict())
+    if isinstance(obj, np.ndarray):
+        return jsonable(obj.tolist())
+    if isinstance(obj, np.generic):
+        obj = obj.item()
+    # NaN and +-inf have no JSON representation
+    if isinstance(obj, float) and not math.isfinite(obj):
+        return None
+    if isinstance(obj, (pd.Timestamp, np.datetime64)):
+        return str(obj)
+    return obj
+
+
+class StatsService:
+    """
+    In-memory data, processed frames, merged frames and stats. A reload
+    builds a new state and swaps it in, so requests always see one
+    consistent generation.
+    """
+
+    def __init__(self, data_dir, covid_windows=None):
+        self.data_dir = data_dir
+        self.covid_windows = covid_windows
+        self.state = {
+            "files": {},
+            "processed": {"MA1": {}, "MA2": {}},
+            "merged": {},
+            "stats": None,
+            "generation": 0,
+            "cache": {},
+        }
+        self._reload_lock = threading.Lock()
+        self._render_lock = threading.Lock()
+        self.reload()
+
+    @property
+    def generation(self):
+        return self.state["generation"]
+
+    def reload(self):
+        """
+        Re-read only the course-year CSVs that were added, modified or
+        removed since the last load, reusing the stats of untouched
+        course-years. Returns the changed course-years.
+
+        An SQLite `data_dir` (see src/storage.py) is re-read whole when the
+        database or its write-ahead log changed.
+        """
+        with self._reload_lock:
+            old = self.state
+            if os.path.isfile(self.data_dir):
+                files = {
+                    "database": _file_signature(self.data_dir),
+                    "wal": _file_signature(self.data_dir + "-wal"),
+                }
+                if files == old["files"] and old["stats"] is not None:
+                    return []
+                processed = process_all_data(
+                    load_all_csvs(self.data_dir, verbose=False)
+                )
+                merged = create_merged_data(processed)
+                changed = sorted(
+                    {
+                        (course, year)
+                        for state in (old["processed"], processed)
+                        for course in state
+                        for year in state[course]
+                    }
+                )
+            else:
+                files = scan(self.data_dir)
+                changed = diff_scans(old["files"], files)
+                if not changed and old["stats"] is not None:
+                    return []
+                processed, merged = apply_changes(
+                    old["processed"], old["merged"], files, changed
+                )
+
+            if old["stats"] is None:
+                stats = compute_all_statistics(processed, merged, self.covid_windows)
+            else:
+                stats = update_statistics(
+                    old["stats"], processed, merged, changed, self.covid_windows
+                )
+
+            self.state = {
+                "files": files,
+                "processed": processed,
+                "merged": merged,
+                "stats": stats,
+                "generation": old["generation"] + 1,
+                "cache": {},
+            }
+            return changed
+
+    def analysis(self, name):
+        if name not in ANALYSES:
+            raise KeyError(name)
+        state = self.state
+        key = ("analysis", name)
+        if key not in state["cache"]:
+            body = json.dumps(jsonable(state["stats"][name]))
+            state["cache"][key] = body.encode("utf-8")
+        return state["cache"][key]
+
+    def _figure_tasks(self, state):
+        from src.visualization import figure_tasks
+
+        key = ("figure_tasks",)
+        if key not in state["cache"]:
+            state["cache"][key] = figure_tasks(state["merged"], state["stats"])
+        return state["cache"][key]
+
+    def figure_files(self):
+        tasks = self._figure_tasks(self.state)
+        return [f for _, _, outputs in tasks for f in outputs]
+
+    def figure(self, filename):
+        """PNG bytes of one figure; all outputs of its plot task are cached."""
+        state = self.state
+        cache = state["cache"]
+        key = ("figure", filename)
+        if key in cache:
+            return cache[key]
+
+        for func, args, outputs in self._figure_tasks(state):
+            if filename in outputs:
+                break
+        else:
+            raise KeyError(filename)
+
+        from src.visualization import _init_render_worker, _render_task
+
+        # pyplot is not thread-safe
+        with self._render_lock:
+            if key not in cache:
+                _init_render_worker()
+                with tempfile.TemporaryDirectory() as tmp:
+                    _render_task((func, args, tmp))
+                    for output in outputs:
+                        with open(os.path.join(tmp, output), "rb") as f:
+                            cache[("figure", output)] = f.read()
+        return cache[key]
+
+
+class StatsHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def _send(self, status, body, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, obj, status=200):
+        self._send(status, json.dumps(obj).encode("utf-8"))
+
+    def do_GET(self):
+        service = self.service
+        parts = [p for p in self.path.split("?")[0].split("/") if p]
+        try:
+            if parts == ["analyses"]:
+                self._send_json(ANALYSES)
+            elif len(parts) == 2 and parts[0] == "analyses":
+                self._send(200, service.analysis(parts[1]))
+            elif parts == ["figures"]:
+                self._send_json(service.figure_files())
+            elif len(parts) == 2 and parts[0] == "figures":
+                self._send(200, service.figure(parts[1]), "image/png")
+            elif parts == ["health"]:
+                self._send_json({"generation": service.generation})
+            else:
+                self._send_json({"error": "not found"}, 404)
+        except KeyError as e:
+            self._send_json({"error": f"unknown: {e.args[0]}"}, 404)
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/reload":
+            self._send_json({"error": "not found"}, 404)
+            return
+        start = time.perf_counter()
+        changed = self.service.reload()
+        self._send_json(
+            {
+                "changed": [f"{course}_{year}" for course, year in changed],
+                "generation": self.service.generation,
+                "seconds": round(time.perf_counter() - start, 3),
+            }
+        )
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(data_dir, host=HOST, port=PORT, covid_windows=None):
+    print(f"Loading {data_dir}...")
+    service = StatsService(data_dir, covid_windows)
+    handler = type("Handler", (StatsHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"Serving on http://{host}:{port}/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
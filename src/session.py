@@ -0,0 +1,143 @@
+"""
+Programmatic access to the pipeline for notebooks and services.
+
+    from src.session import Session
+
+    session = Session("data/MATAN")
+    session.single_course["MA1"][2023]    # loads, processes, computes once
+    session.single_course["MA2"][2023]    # answered from memory
+    session.invalidate("data")            # e.g. after the CSVs changed
+
+Loaded data, processed frames, merged frames and every analysis in
+ANALYSES are computed on first access and memoized. Nothing is loaded at
+construction or import time and nothing is printed.
+"""
+
+import threading
+
+from src.analysis import (
+    ANALYSES,
+    MERGED_ANALYSES,
+    compute_all_statistics,
+    needs_merged,
+    resolve_analyses,
+)
+from src.ingestion import load_all_csvs
+from src.processing import create_merged_data, process_all_data
+
+STAGES = ["data", "processed", "merged"]
+
+
+def _dependents(names):
+    """`names` plus every analysis that (transitively) depends on them."""
+    result = set(names)
+    for name in ANALYSES:
+        if set(resolve_analyses([name])) & result:
+            result.add(name)
+    return result
+
+
+class Session:
+    """
+    Lazily computed, memoized pipeline results for one data directory (or
+    SQLite database). Analyses are also available as attributes, e.g.
+    `session.correlation`.
+    """
+
+    def __init__(self, data_dir, courses=None, years=None, covid_windows=None):
+        self.data_dir = data_dir
+        self.courses = courses
+        self.years = years
+        self.covid_windows = covid_windows
+        self._cache = {}
+        self._lock = threading.RLock()
+
+    def _get(self, key, compute):
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = compute()
+            return self._cache[key]
+
+    @property
+    def data(self):
+        return self._get(
+            "data",
+            lambda: load_all_csvs(
+                self.data_dir, courses=self.courses, years=self.years, verbose=False
+            ),
+        )
+
+    @property
+    def processed(self):
+        return self._get("processed", lambda: process_all_data(self.data))
+
+    @property
+    def merged(self):
+        return self._get("merged", lambda: create_merged_data(self.processed))
+
+    def analysis(self, name):
+        """One analysis (as in the stats dict), computed on first request."""
+        if name not in ANALYSES:
+            raise KeyError(f"Unknown analysis: {name}")
+        with self._lock:
+            if name not in self._cache:
+                self._compute([name])
+            return self._cache[name]
+
+    @property
+    def stats(self):
+        """All analyses, as returned by compute_all_statistics."""
+        with self._lock:
+            self._compute([name for name in ANALYSES if name not in self._cache])
+            return {name: self._cache[name] for name in ANALYSES}
+
+    def _compute(self, names):
+        if not names:
+            return
+        merged = self.merged if needs_merged(names) else {}
+        stats = compute_all_statistics(
+            self.processed, merged, self.covid_windows, analyses=names
+        )
+        for name in resolve_analyses(names):
+            self._cache.setdefault(name, stats[name])
+
+    def invalidate(self, *names):
+        """
+        Drop cached results so they are recomputed on next access. Names are
+        stages ("data", "processed", "merged") or analyses; everything derived
+        from them is dropped too. With no names, everything is dropped.
+        """
+        unknown = set(names) - set(STAGES) - set(ANALYSES)
+        if unknown:
+            raise ValueError(f"Unknown names: {', '.join(sorted(unknown))}")
+
+        with self._lock:
+            if not names:
+                self._cache.clear()
+                return
+
+            stale = set(names)
+            # Later stages are derived from earlier ones
+            for i, stage in enumerate(STAGES):
+                if stage in stale:
+                    stale |= set(STAGES[i:])
+            if "processed" in stale:
+                stale |= set(ANALYSES)
+            if "merged" in stale:
+                stale |= MERGED_ANALYSES
+            for key in _dependents(stale & set(ANALYSES)) | stale:
+                self._cache.pop(key, None)
+
+    def cached(self):
+        """Names of the stages and analyses currently held in memory."""
+        return [key for key in STAGES + ANALYSES if key in self._cache]
+
+    def __getattr__(self, name):
+        if name in ANALYSES:
+            return self.analysis(name)
+        raise AttributeError(
+            f"{type(self).__name__!r} object has no attribute {name!r}"
+        )
+
+    def __dir__(self):
+        return sorted(set(super().__dir__()) | set(ANALYSES))
@@ -0,0 +1,146 @@
+"""
+Shared-memory handoff of frames to worker processes.
+
+    with SharedFrames(merged) as shared:
+        pool.map(task, [(shared.handle, ...), ...])
+
+    # in the worker
+    merged = attach(handle)
+
+SharedFrames copies the columns of a dict of DataFrames into one
+multiprocessing.shared_memory block, encoded as in src/columnar.py. Only
+the handle (segment name and column layout) is pickled to workers, so the
+fan-out cost does not depend on the size of the data. Workers attach
+read-only numpy views of the block. Only numeric, bool and datetime columns
+are zero-copy: string columns (e.g. `id`) and object columns of bools (e.g.
+`ma1_passed` in the merged frames) are rebuilt from the block as in
+read_frame, so each worker holds its own copy of them.
+
+The creating process owns the block and unlinks it on close().
+"""
+
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from src.columnar import decode_column, encode_column
+
+ALIGNMENT = 64
+
+# Blocks attached in this process, by segment name
+_attached = {}
+_frames = {}
+
+
+class FramesHandle:
+    """Picklable description of a SharedFrames block."""
+
+    def __init__(self, name, frames):
+        self.name = name
+        self.frames = frames
+
+
+def _layout(frames):
+    """Encoded arrays and their (offset, dtype, shape, restore) in the block."""
+    arrays, specs = [], {}
+    offset = 0
+    for key, df in frames.items():
+        index_columns, index_names = [], None
+        if not isinstance(df.index, pd.RangeIndex):
+            index_names = list(df.index.names)
+            df = df.reset_index()
+            index_columns = list(df.columns[: len(index_names)])
+        columns = []
+        for column, values in df.items():
+            array, restore = encode_column(values)
+            array = np.ascontiguousarray(array)
+            offset = -(-offset // ALIGNMENT) * ALIGNMENT
+            arrays.append((offset, array))
+            columns.append((column, offset, array.dtype.str, array.shape, restore))
+            offset += array.nbytes
+        specs[key] = {
+            "index": df.index,
+            "index_columns": index_columns,
+            "index_names": index_names,
+            "columns": columns,
+            "attrs": dict(df.attrs),
+        }
+    return arrays, specs, offset
+
+
+class SharedFrames:
+    """
+    Publish `frames` ({key: DataFrame}) in shared memory once. Use as a
+    context manager or call close() to release the block.
+    """
+
+    def __init__(self, frames):
+        arrays, specs, size = _layout(frames)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        try:
+            for offset, array in arrays:
+                view = np.ndarray(
+                    array.shape, array.dtype, buffer=self._shm.buf, offset=offset
+                )
+                view[...] = array
+        except BaseException:
+            self.close()
+            raise
+        self.handle = FramesHandle(self._shm.name, specs)
+
+    def close(self):
+        if self._shm is None:
+            return
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach(handle):
+    """
+    The frames of a SharedFrames block as DataFrames over read-only views of
+    the shared memory. Attaching again in the same process is free.
+    """
+    if handle.name in _frames:
+        return _frames[handle.name]
+
+    if handle.name not in _attached:
+        _attached[handle.name] = shared_memory.SharedMemory(name=handle.name)
+    shm = _attached[handle.name]
+    frames = {}
+    for key, spec in handle.frames.items():
+        data = {}
+        for column, offset, dtype, shape, restore in spec["columns"]:
+            view = np.ndarray(shape, np.dtype(dtype), buffer=shm.buf, offset=offset)
+            view.flags.writeable = False
+            data[column] = decode_column(view, restore)
+        df = pd.DataFrame(data, index=spec["index"], copy=False)
+        if spec["index_columns"]:
+            df = df.set_index(spec["index_columns"])
+            df.index.names = spec["index_names"]
+        df.attrs = spec["attrs"]
+        frames[key] = df
+
+    _frames[handle.name] = frames
+    return frames
+
+
+def detach(handle=None):
+    """
+    Drop this process's frames of `handle` (default: all attached blocks)
+    and unmap them. Raises BufferError while the caller still references
+    frames or columns obtained from attach().
+    """
+    names = list(_attached) if handle is None else [handle.name]
+    for name in names:
+        _frames.pop(name, None)
+        if name in _attached:
+            _attached[name].close()
+            del _attached[name]
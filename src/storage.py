@@ -0,0 +1,294 @@
+"""
+SQLite storage of the ingested exam data.
+
+Normalized schema:
+
+- students: one row per student id
+- enrollments: one row per student per course-year, with the ISVU result
+- exams: the exam periods of each course-year, in column order
+- attempts: one row per enrollment and exam period (points, pass, date)
+
+Course-years are written with bulk inserts in a single transaction, so
+ingesting a new year is an append and re-ingesting a year replaces it.
+`load_all` rebuilds the same frames `load_all_csvs` returns, so processing
+and the analyses run unchanged on top of the database.
+"""
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from src import validation
+from src.ingestion import get_exam_columns, load_all_csvs
+from src.profiling import stage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    id TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS enrollments (
+    enrollment_id INTEGER PRIMARY KEY,
+    student_id TEXT NOT NULL REFERENCES students (id),
+    course TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    row INTEGER NOT NULL,
+    isvu_points REAL,
+    isvu_grade REAL,
+    isvu_date TEXT,
+    UNIQUE (course, year, row)
+);
+CREATE TABLE IF NOT EXISTS exams (
+    exam_id INTEGER PRIMARY KEY,
+    course TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    integer_points INTEGER NOT NULL,
+    UNIQUE (course, year, position)
+);
+CREATE TABLE IF NOT EXISTS attempts (
+    enrollment_id INTEGER NOT NULL REFERENCES enrollments (enrollment_id),
+    exam_id INTEGER NOT NULL REFERENCES exams (exam_id),
+    points REAL,
+    passed INTEGER NOT NULL,
+    date TEXT,
+    PRIMARY KEY (enrollment_id, exam_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS enrollments_student ON enrollments (student_id);
+CREATE INDEX IF NOT EXISTS enrollments_course_year ON enrollments (course, year);
+CREATE INDEX IF NOT EXISTS exams_name ON exams (name);
+CREATE INDEX IF NOT EXISTS attempts_exam ON attempts (exam_id);
+"""
+
+
+def connect(path):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _values(series):
+    """Column as a list of Python values with NaN/NaT as None."""
+    if pd.api.types.is_datetime64_dtype(series.dtype):
+        text = series.dt.strftime("%Y-%m-%d %H:%M:%S")
+        return text.where(series.notna(), None).tolist()
+    values = series.astype(object)
+    return values.where(series.notna(), None).tolist()
+
+
+def _numbers(series):
+    """Points as floats, accepting the decimal commas found in some exports."""
+    text = series.astype(str).str.replace(",", ".", regex=False)
+    return _values(pd.to_numeric(text, errors="coerce"))
+
+
+def _dates(values):
+    return pd.to_datetime(pd.Series(values, dtype=object), errors="coerce")
+
+
+def _delete_course_year(conn, course, year):
+    conn.execute(
+        "DELETE FROM attempts WHERE enrollment_id IN "
+        "(SELECT enrollment_id FROM enrollments WHERE course = ? AND year = ?)",
+        (course, year),
+    )
+    conn.execute(
+        "DELETE FROM enrollments WHERE course = ? AND year = ?", (course, year)
+    )
+    conn.execute("DELETE FROM exams WHERE course = ? AND year = ?", (course, year))
+
+
+def store_frame(conn, course, year, df):
+    """Insert (or replace) one course-year as read by load_all_csvs."""
+    exams = get_exam_columns(df)
+    ids = df["id"].astype(str).tolist()
+    n = len(df)
+
+    with conn:
+        _delete_course_year(conn, course, year)
+
+        first_enrollment = conn.execute(
+            "SELECT COALESCE(MAX(enrollment_id), 0) + 1 FROM enrollments"
+        ).fetchone()[0]
+        first_exam = conn.execute(
+            "SELECT COALESCE(MAX(exam_id), 0) + 1 FROM exams"
+        ).fetchone()[0]
+        enrollment_ids = list(range(first_enrollment, first_enrollment + n))
+
+        conn.executemany(
+            "INSERT OR IGNORE INTO students (id) VALUES (?)", ((i,) for i in ids)
+        )
+        conn.executemany(
+            "INSERT INTO exams (exam_id, course, year, position, name, "
+            "integer_points) VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    first_exam + pos,
+                    course,
+                    year,
+                    pos,
+                    name,
+                    int(pd.api.types.is_integer_dtype(df[points_col].dtype)),
+                )
+                for pos, (name, points_col, _, _) in enumerate(exams)
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO enrollments (enrollment_id, student_id, course, year, row, "
+            "isvu_points, isvu_grade, isvu_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            zip(
+                enrollment_ids,
+                ids,
+                [course] * n,
+                [year] * n,
+                range(n),
+                _numbers(df["ISVU Bodovi"]),
+                _numbers(df["ISVU Ocjena"]),
+                _values(df["ISVU Rok"]),
+            ),
+        )
+        for pos, (_, points_col, prolaz_col, time_col) in enumerate(exams):
+            passed = df[prolaz_col].astype(str).str.strip().str.upper() == "DA"
+            conn.executemany(
+                "INSERT INTO attempts (enrollment_id, exam_id, points, passed, date) "
+                "VALUES (?, ?, ?, ?, ?)",
+                zip(
+                    enrollment_ids,
+                    [first_exam + pos] * n,
+                    _numbers(df[points_col]),
+                    passed.astype(int).tolist(),
+                    _values(df[time_col]),
+                ),
+            )
+
+
+def course_years(conn):
+    return conn.execute(
+        "SELECT DISTINCT course, year FROM enrollments ORDER BY course, year"
+    ).fetchall()
+
+
+def load_frame(conn, course, year, verbose=True):
+    """
+    Rebuild the wide per-student frame of one course-year and run the
+    data-quality checks on it, as load_csv does.
+    """
+    enrollments = conn.execute(
+        "SELECT student_id, isvu_points, isvu_grade, isvu_date FROM enrollments "
+        "WHERE course = ? AND year = ? ORDER BY row",
+        (course, year),
+    ).fetchall()
+    exams = conn.execute(
+        "SELECT name, integer_points FROM exams WHERE course = ? AND year = ? "
+        "ORDER BY position",
+        (course, year),
+    ).fetchall()
+    attempts = conn.execute(
+        "SELECT e.row, x.position, a.points, a.passed, a.date FROM attempts a "
+        "JOIN enrollments e USING (enrollment_id) "
+        "JOIN exams x USING (exam_id) "
+        "WHERE e.course = ? AND e.year = ?",
+        (course, year),
+    ).fetchall()
+
+    ids, isvu_points, isvu_grade, isvu_date = (
+        zip(*enrollments) if enrollments else ([], [], [], [])
+    )
+    n, n_exams = len(ids), len(exams)
+
+    points = np.full((n, n_exams), np.nan)
+    passed = np.zeros((n, n_exams), dtype=bool)
+    dates = np.full((n, n_exams), None, dtype=object)
+    if attempts:
+        rows, positions, a_points, a_passed, a_dates = zip(*attempts)
+        cells = (np.asarray(rows), np.asarray(positions))
+        points[cells] = np.array(a_points, dtype=float)
+        passed[cells] = np.array(a_passed, dtype=bool)
+        dates[cells] = a_dates
+
+    columns = {
+        "id": pd.Series(ids, dtype="str"),
+        "ISVU Bodovi": pd.Series(isvu_points, dtype=float),
+        "ISVU Ocjena": pd.Series(isvu_grade, dtype=float),
+        "ISVU Rok": _dates(isvu_date),
+    }
+    for pos, (name, integer_points) in enumerate(exams):
+        exam_points = pd.Series(points[:, pos])
+        if integer_points:
+            exam_points = exam_points.astype(np.int64)
+        columns[f"{name} - bodovi"] = exam_points
+        columns[f"{name} - prolaz"] = pd.Series(
+            np.where(passed[:, pos], "DA", None), dtype="str"
+        )
+        columns[f"{name} - vrijeme"] = _dates(dates[:, pos])
+
+    df = pd.DataFrame(columns)
+    df.attrs["exams"] = get_exam_columns(df)
+    with stage("load.validate", len(df)):
+        return validation.apply(df, course, year, verbose)
+
+
+def load_all(path, courses=None, years=None, verbose=True):
+    """Same structure as load_all_csvs, read from the database at `path`."""
+    data = {"MA1": {}, "MA2": {}}
+    conn = connect(path)
+    try:
+        for course, year in course_years(conn):
+            if course not in data:
+                continue
+            if courses is not None and course not in courses:
+                continue
+            if years is not None and year not in years:
+                continue
+
+            df = load_frame(conn, course, year, verbose)
+            data[course][year] = df
+            if verbose:
+                print(
+                    f"  - Loaded {course}_{year} from {path}: {len(df)} students "
+                    f"({len(df.attrs['exams'])} exam periods)"
+                )
+    finally:
+        conn.close()
+    return data
+
+
+def ingest_csvs(path, data_dir, courses=None, years=None):
+    """Append (or replace) the course-years found in `data_dir`."""
+    data = load_all_csvs(data_dir, courses=courses, years=years)
+    conn = connect(path)
+    try:
+        for course in ["MA1", "MA2"]:
+            for year, df in sorted(data[course].items()):
+                store_frame(conn, course, year, df)
+                print(f"  - Stored {course}_{year} in {path}")
+    finally:
+        conn.close()
+
+
+def student_history(conn, student_id):
+    """All enrollments and exam attempts of one student (index lookups)."""
+    rows = conn.execute(
+        "SELECT e.course, e.year, x.name, a.points, a.passed, a.date, "
+        "e.isvu_points, e.isvu_grade FROM enrollments e "
+        "JOIN attempts a USING (enrollment_id) "
+        "JOIN exams x USING (exam_id) "
+        "WHERE e.student_id = ? ORDER BY e.course, e.year, x.position",
+        (student_id,),
+    ).fetchall()
+    return pd.DataFrame(
+        rows,
+        columns=[
+            "course",
+            "year",
+            "exam",
+            "points",
+            "passed",
+            "date",
+            "final_points",
+            "final_grade",
+        ],
+    )
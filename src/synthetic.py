@@ -0,0 +1,162 @@
+"""
+Synthetic MA1/MA2 exports in the exact MA*_YYYY_clean.csv schema.
+
+Each year has an MA1 cohort of new students plus students repeating MA1,
+and an MA2 cohort made of most of that year's MA1 students plus students
+repeating MA2, so the data has the same cross-course and cross-year overlap
+as the real exports. Students try the exam periods in order until they
+pass ("DA"); most then accept the grade in ISVU, the rest reject it and may
+re-enroll the next year.
+
+Like the real files, some years are written with ";" separators, comma
+decimals and "DA " flags with a trailing space, others with "," and dots.
+"""
+
+import csv
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.processing import grade_boundaries, points_to_grades
+
+MA1_EXAMS = [
+    "Kontinuirana nastava",
+    "1. ispitni rok",
+    "2. ispitni rok",
+    "3. ispitni rok",
+    "Dekanski rok",
+]
+MA2_EXAMS = ["Kontinuirana nastava", "1. ispitni rok", "2. ispitni rok", "Dekanski rok"]
+
+# Month and day of each exam period, relative to the academic year start
+MA1_DATES = [(1, 30), (2, 13), (7, 7), (9, 1), (9, 12)]
+MA2_DATES = [(6, 27), (7, 13), (9, 5), (9, 15)]
+
+# Chance of taking each exam period (if not passed yet)
+MA1_ATTEMPT_RATES = [0.94, 0.45, 0.25, 0.3, 0.2]
+MA2_ATTEMPT_RATES = [0.88, 0.4, 0.35, 0.25]
+
+# Share of a year's MA1 students enrolled in MA2 the same year
+MA2_FROM_MA1 = 0.95
+# Share of the students who did not finish a course that re-enroll next year
+REPEAT_RATE = 0.3
+# Share of passed exams whose grade the student rejects
+REJECT_RATE = 0.1
+
+
+def _hex_ids(numbers, key):
+    """Distinct 8-hex-digit ids (a bijection of the numbers on 32 bits)."""
+    x = (numbers.astype(np.uint64) * np.uint64(key)) % np.uint64(2**32)
+    return np.char.mod("%08x", x.astype(np.int64))
+
+
+def _course_year(rng, ability, year, exams, attempt_rates, dates):
+    """Columns of one course-year export and which students accepted a grade."""
+    n = len(ability)
+    threshold = grade_boundaries(year)[0]
+    exam_columns = {}
+    passed = np.zeros(n, dtype=bool)
+    done = np.zeros(n, dtype=bool)
+    best_points = np.full(n, np.nan)
+    pass_date = np.full(n, np.datetime64("NaT"), dtype="datetime64[D]")
+
+    for name, rate, (month, day) in zip(exams, attempt_rates, dates):
+        date = np.datetime64(f"{year + (month < 10)}-{month:02d}-{day:02d}")
+        tries = ~done & (rng.random(n) < rate)
+        noise = rng.normal(0, 12, n)
+        points = np.where(tries, np.clip(ability + noise, 0, 100).round(1), 0.0)
+        ok = tries & (points >= threshold)
+
+        exam_columns[f"{name} - bodovi"] = points
+        exam_columns[f"{name} - prolaz"] = ok
+        exam_columns[f"{name} - vrijeme"] = np.full(n, date)
+
+        best_points = np.where(ok, np.fmax(best_points, points), best_points)
+        pass_date = np.where(ok, date, pass_date)
+        passed |= ok
+        # Rejecting the grade means trying again in a later exam period
+        done |= ok & (rng.random(n) >= REJECT_RATE)
+
+    # Some who rejected every grade leave without one and may re-enroll
+    accepted = passed & (done | (rng.random(n) >= REJECT_RATE))
+    isvu_points = np.where(accepted, best_points.round(0), np.nan)
+    columns = {
+        "ISVU Bodovi": isvu_points,
+        "ISVU Ocjena": points_to_grades(isvu_points, year),
+        "ISVU Rok": np.where(
+            accepted, pass_date + np.timedelta64(7, "D"), np.datetime64("NaT")
+        ),
+    }
+    columns.update(exam_columns)
+    return columns, accepted
+
+
+def _write(ids, columns, path, european):
+    """Write one export; `european` uses ";", comma decimals and "DA "."""
+    out = {"id": ids}
+    for col, values in columns.items():
+        if col.endswith(" - prolaz"):
+            out[col] = np.where(values, "DA " if european else "DA", "")
+        elif col.endswith(" - vrijeme") or col == "ISVU Rok":
+            text = np.datetime_as_string(values, unit="D")
+            out[col] = np.where(np.isnat(values), "", text)
+        elif european and col != "ISVU Ocjena":
+            text = np.char.replace(values.astype(str), ".", ",")
+            out[col] = np.where(np.isnan(values), "", text)
+        else:
+            out[col] = values
+
+    pd.DataFrame(out).to_csv(
+        path,
+        sep=";" if european else ",",
+        index=False,
+        quoting=csv.QUOTE_NONNUMERIC if european else csv.QUOTE_MINIMAL,
+        encoding="utf-8",
+    )
+
+
+def generate_dataset(output_dir, students=1000, years=range(2018, 2025), seed=0):
+    """
+    Write MA1/MA2 CSVs for `years` to `output_dir`, with about `students`
+    MA1 students per year. Returns {(course, year): path}.
+    """
+    years = sorted(years)
+    rng = np.random.default_rng(seed)
+    key = int(rng.integers(1, 2**31)) * 2 + 1
+    # Everyone who could ever enroll; students are numbered in order of
+    # their first MA1 enrollment
+    ability = rng.normal(58, 18, students * len(years))
+    os.makedirs(output_dir, exist_ok=True)
+
+    next_student = 0
+    repeat = {"MA1": np.empty(0, dtype=np.int64), "MA2": np.empty(0, dtype=np.int64)}
+    paths = {}
+
+    for i, year in enumerate(years):
+        # Alternate the two export formats, starting with the ";" one
+        european = i % 2 == 0
+        n_new = max(students - len(repeat["MA1"]), 1)
+        new = np.arange(next_student, next_student + n_new)
+        next_student += n_new
+
+        ma1 = np.concatenate([new, repeat["MA1"]])
+        ma2 = ma1[rng.random(len(ma1)) < MA2_FROM_MA1]
+        cohorts = {"MA1": ma1, "MA2": np.union1d(ma2, repeat["MA2"])}
+
+        for course, exams, rates, dates, shift in [
+            ("MA1", MA1_EXAMS, MA1_ATTEMPT_RATES, MA1_DATES, 0),
+            ("MA2", MA2_EXAMS, MA2_ATTEMPT_RATES, MA2_DATES, -5),
+        ]:
+            students_ = rng.permutation(cohorts[course])
+            columns, accepted = _course_year(
+                rng, ability[students_] + shift, year, exams, rates, dates
+            )
+            path = os.path.join(output_dir, f"{course}_{year}_clean.csv")
+            _write(_hex_ids(students_, key), columns, path, european)
+            paths[(course, year)] = path
+
+            unfinished = students_[~accepted]
+            repeat[course] = unfinished[rng.random(len(unfinished)) < REPEAT_RATE]
+
+    return paths
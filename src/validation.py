@@ -0,0 +1,246 @@
+"""
+Data-quality checks of a raw course-year export.
+
+    masks = check_frame(df, year)       # one boolean column per check
+    counts = summarize(masks)           # {check: rows failing it}
+
+Every check is a vectorized boolean mask over the rows of the frame as
+read by load_csv, computed in one pass over its columns. load_csv runs them
+on every file, stores the counts in df.attrs["quality"] and prints a one
+line report when a check fails.
+
+With quarantine on (see start_quarantine), rows failing any check are
+removed from the loaded frame and written with the names of their failed
+checks to <directory>/<course>_<year>_quarantine.csv.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.processing import points_to_grades
+
+CHECKS = [
+    "missing_id",
+    "duplicate_id",
+    "invalid_points",
+    "points_out_of_range",
+    "pass_without_points",
+    "invalid_grade",
+    "grade_without_points",
+    "grade_points_mismatch",
+    "pass_dates_out_of_order",
+]
+
+# _by_value judges how repetitive a column is from its first SAMPLE_ROWS
+# values and skips factorizing when more than DISTINCT_RATIO of them are
+# distinct
+SAMPLE_ROWS = 1000
+DISTINCT_RATIO = 0.9
+
+# Directory quarantined rows are written to; None while quarantine is off
+_quarantine_dir = None
+# Counts of quarantined rows per (course, year) since start_quarantine()
+_quarantined = {}
+
+
+def start_quarantine(directory):
+    """Remove failing rows from every frame loaded from now on."""
+    global _quarantine_dir
+    _quarantine_dir = directory
+    _quarantined.clear()
+
+
+def stop_quarantine():
+    """Turn quarantine off and return {(course, year): rows quarantined}."""
+    global _quarantine_dir
+    _quarantine_dir = None
+    counts = dict(_quarantined)
+    _quarantined.clear()
+    return counts
+
+
+def _by_value(values, func, missing):
+    """
+    (func applied to every value of a column, `missing` for missing values;
+    whether each value is present). Exports repeat the same few flags and
+    point values, so func runs once per distinct value and is spread back
+    to the rows, unless nearly all of the column's first SAMPLE_ROWS values
+    are distinct, where factorizing costs more than it saves.
+    """
+    head = values.iloc[:SAMPLE_ROWS]
+    if head.nunique() > len(head) * DISTINCT_RATIO:
+        present = values.notna().to_numpy()
+        mapped = np.asarray(func(values.astype(object)))
+        return np.where(present, mapped, missing), present
+    codes, uniques = pd.factorize(values)
+    mapped = np.asarray(func(pd.Series(uniques, dtype=object)))
+    return np.append(mapped, missing)[codes], codes >= 0
+
+
+def _points(values):
+    """
+    (points as floats, parsed as clean_dataframe does, NaN if unparseable;
+    whether the value was present at all).
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        points = values.to_numpy(dtype=float)
+        return points, ~np.isnan(points)
+    return _by_value(
+        values,
+        lambda u: pd.to_numeric(
+            u.astype(str).str.replace(",", ".", regex=False), errors="coerce"
+        ).to_numpy(dtype=float),
+        np.nan,
+    )
+
+
+def _is_da(values):
+    """Rows whose pass flag is "DA" (any case or padding), as clean_dataframe."""
+    # Pass flags take a handful of distinct values
+    codes, uniques = pd.factorize(values)
+    flags = [str(flag).strip().upper() == "DA" for flag in uniques]
+    return np.append(np.array(flags, dtype=bool), False)[codes]
+
+
+def _days(values):
+    """Dates of a column as whole days since the epoch (NaN if missing)."""
+    if not pd.api.types.is_datetime64_dtype(values):
+        values = pd.to_datetime(values, errors="coerce")
+    days = values.to_numpy().astype("datetime64[D]")
+    return np.where(np.isnat(days), np.nan, days.astype(np.int64))
+
+
+def check_frame(df, year=None):
+    """Boolean mask of the rows failing each check in CHECKS."""
+    n = len(df)
+    masks = {}
+    exams = df.attrs["exams"]
+    # pandas deep-copies attrs into every column taken from the frame
+    df = df.copy(deep=False)
+    df.attrs = {}
+
+    # parse_csv_file already reads empty ids as missing (na_values)
+    ids = df["id"]
+    missing = ids.isna().to_numpy()
+    masks["missing_id"] = missing
+    # Every copy of a repeated id fails: there is no telling which is right
+    masks["duplicate_id"] = ids.duplicated(keep=False).to_numpy() & ~missing
+
+    invalid = np.zeros(n, dtype=bool)
+    out_of_range = np.zeros(n, dtype=bool)
+    pass_without_points = np.zeros(n, dtype=bool)
+    out_of_order = np.zeros(n, dtype=bool)
+    # Latest pass date seen so far in exam order, as days (NaN: none yet)
+    latest = np.full(n, np.nan)
+
+    for _, points_col, prolaz_col, time_col in exams:
+        points, present = _points(df[points_col])
+        invalid |= np.isnan(points) & present
+        out_of_range |= (points < 0) | (points > 100)
+
+        passed = _is_da(df[prolaz_col])
+        pass_without_points |= passed & ~(points > 0)
+
+        days = np.where(passed, _days(df[time_col]), np.nan)
+        out_of_order |= days < latest
+        latest = np.fmax(latest, days)
+
+    isvu_points, present = _points(df["ISVU Bodovi"])
+    invalid |= np.isnan(isvu_points) & present
+    out_of_range |= (isvu_points < 0) | (isvu_points > 100)
+
+    raw_grade = df["ISVU Ocjena"]
+    grade = pd.to_numeric(raw_grade, errors="coerce").to_numpy(dtype=float)
+    has_grade = ~np.isnan(grade)
+    valid_grade = np.isin(grade, [2, 3, 4, 5])
+    has_points = ~np.isnan(isvu_points)
+
+    masks["invalid_points"] = invalid
+    masks["points_out_of_range"] = out_of_range
+    masks["pass_without_points"] = pass_without_points
+    masks["invalid_grade"] = (has_grade & ~valid_grade) | (
+        ~has_grade & raw_grade.notna().to_numpy()
+    )
+    masks["grade_without_points"] = has_grade & ~has_points
+    masks["grade_points_mismatch"] = (
+        valid_grade & has_points & (grade != points_to_grades(isvu_points, year))
+    )
+    masks["pass_dates_out_of_order"] = out_of_order
+
+    return pd.DataFrame(masks, index=df.index)[CHECKS]
+
+
+def summarize(masks):
+    """Rows failing each check, only for checks that some row fails."""
+    counts = masks.sum()
+    return {check: int(count) for check, count in counts.items() if count}
+
+
+def format_counts(counts):
+    """Compact one-line form of summarize(), e.g. "duplicate_id 3, ..."."""
+    return ", ".join(f"{check} {count}" for check, count in counts.items())
+
+
+def quarantine(df, masks):
+    """
+    Split `df` into (kept rows, failing rows). The failing rows get a
+    "violations" column naming their failed checks.
+    """
+    failing = masks.any(axis=1).to_numpy()
+    kept = df[~failing].reset_index(drop=True)
+    kept.attrs = dict(df.attrs)
+
+    rejected = df[failing].copy()
+    flags = masks[failing]
+    rejected.insert(
+        0,
+        "violations",
+        [";".join(flags.columns[row]) for row in flags.to_numpy()],
+    )
+    return kept, rejected
+
+
+def apply(df, course, year, verbose=True):
+    """
+    Run the checks on a freshly loaded frame, record the counts in
+    df.attrs["quality"] and quarantine failing rows if quarantine is on.
+    """
+    masks = check_frame(df, year)
+    counts = summarize(masks)
+    df.attrs["quality"] = counts
+    if counts and verbose:
+        failing = int(masks.any(axis=1).sum())
+        print(
+            f"  - Warning: {course}_{year}: {failing} rows fail data checks "
+            f"({format_counts(counts)})"
+        )
+
+    if _quarantine_dir is None or not counts:
+        return df
+
+    kept, rejected = quarantine(df, masks)
+    os.makedirs(_quarantine_dir, exist_ok=True)
+    path = os.path.join(_quarantine_dir, f"{course}_{year}_quarantine.csv")
+    rejected.to_csv(path, index=False, encoding="utf-8")
+    _quarantined[(course, year)] = len(rejected)
+    if verbose:
+        print(f"  - Quarantined {len(rejected)} rows of {course}_{year} to {path}")
+    return kept
+
+
+def quality_report(data):
+    """{course: {year: counts}} from the frames of loaded or processed data."""
+    return {
+        course: {year: df.attrs.get("quality", {}) for year, df in years.items()}
+        for course, years in data.items()
+    }
+
+
+def write_report(path, data):
+    """Write quality_report(data) as JSON."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(quality_report(data), f, indent=1)
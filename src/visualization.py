@@ -1,13 +1,18 @@
+import contextlib
+import hashlib
+import io
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
 import matplotlib.pyplot as plt
 from matplotlib.ticker import MaxNLocator
-import seaborn as sns
 import pandas as pd
 import numpy as np
 import os
-from scipy import stats
 
-plt.style.use("seaborn-v0_8-whitegrid")
-sns.set_palette("husl")
+from src import profiling
+from src.sharedmem import FramesHandle, SharedFrames, attach
 
 FIGSIZE_SINGLE = (10, 6)
 FIGSIZE_WIDE = (14, 6)
@@ -15,12 +20,70 @@ FIGSIZE_TALL = (10, 10)
 FIGSIZE_GRID = (16, 12)
 DPI = 150
 
+# Above this many points per panel, scatter plots switch to hexbin density
+SCATTER_DENSITY_THRESHOLD = 5000
+SCATTER_DENSITY_GRIDSIZE = 40
+
+# Cache keys cover this module's source; bump to invalidate all cached
+# figures after a change elsewhere that affects how they are drawn
+FIGURE_CACHE_VERSION = 1
+FIGURE_CACHE_FILE = ".figure_cache.json"
+# sha256 of this module's source, read once (see _source_hash)
+_source_digest = None
+
+_style_applied = False
+
+# Figure name -> stats keys ("merged" for the merged frames) it is drawn from
+FIGURE_INPUTS = {
+    "summary_dashboard": [
+        "single_course",
+        "ma1_predicts_ma2",
+        "covid_impact",
+        "correlation",
+        "grade_transition",
+        "dropout",
+        "perfect_scores",
+        "statistical_tests",
+    ],
+    "pass_rate_trend": ["single_course"],
+    "enrollment": ["single_course"],
+    "grade_distribution": ["single_course"],
+    "covid_comparison": ["covid_impact"],
+    "correlation_trend": ["correlation"],
+    "ma2_before_ma1": ["correlation"],
+    "most_common_pass_exam": ["single_course"],
+    "rejection_analysis": ["single_course", "cross_year_rejections"],
+    "failed_analysis": ["single_course"],
+    "attempts_distribution": ["attempts_dist", "failed_attempts_dist"],
+    "pass_rate_by_exam": ["pass_by_exam"],
+    "points_by_exam": ["points_histograms"],
+    "grade_matrix": ["grade_matrix"],
+    "scatter_points": ["merged"],
+    "ma1_predicts_ma2": ["ma1_predicts_ma2"],
+    "threshold_what_if": ["threshold_what_if"],
+}
+
 COLORS = {
     "MA1": "#2ecc71",
     "MA2": "#3498db",
     "passed": "#27ae60",
     "failed": "#e74c3c",
 }
+# Grades 2-5
+GRADE_COLORS = ["#e74c3c", "#f39c12", "#3498db", "#2ecc71"]
+
+
+def apply_style():
+    """Set the shared plot style; done once, on first use rather than on import."""
+    global _style_applied
+    if _style_applied:
+        return
+
+    import seaborn as sns
+
+    plt.style.use("seaborn-v0_8-whitegrid")
+    sns.set_palette("husl")
+    _style_applied = True
 
 
 def get_exam_labels_by_position(n_exams, course):
@@ -125,10 +188,12 @@ def plot_enrollment_trend(stats, output_dir):
     save_figure(fig, "enrollment_passed_failed.png", output_dir)
 
 
-def plot_grade_distribution_combined(processed, output_dir):
+def plot_grade_distribution_combined(stats, output_dir):
     for course in ["MA1", "MA2"]:
-        years = sorted(processed[course].keys())
+        years = sorted(stats["single_course"][course].keys())
         n_years = len(years)
+        if n_years == 0:
+            continue
 
         fig, axes = plt.subplots(
             2, (n_years + 1) // 2, figsize=(4 * ((n_years + 1) // 2), 8)
@@ -137,9 +202,7 @@ def plot_grade_distribution_combined(processed, output_dir):
 
         i = 0
         for i, year in enumerate(years):
-            df = processed[course][year]
-            passed_df = df[df["passed"]]
-            grades = passed_df["final_grade"].value_counts().sort_index()
+            grades = stats["single_course"][course][year]["grade_distribution"]
 
             ax = axes[i]
             bars = ax.bar(
@@ -172,80 +235,78 @@ def plot_grade_distribution_combined(processed, output_dir):
         save_figure(fig, f"grade_distribution_{course}_all.png", output_dir)
 
 
-def plot_points_by_exam_period(processed, output_dir):
-    from src.processing import get_exam_columns
+def plot_points_by_exam(hist, course, year, output_dir):
+    """Draw one course-year from its pre-binned histograms (see exam_histograms)."""
+    n_exams = len(hist["exams"])
+    edges = hist["edges"]
+    labels = get_exam_labels_by_position(n_exams, course)
 
-    for course in ["MA1", "MA2"]:
-        for year, df in processed[course].items():
-            exams = get_exam_columns(df)
-            n_exams = len(exams)
-            labels = get_exam_labels_by_position(n_exams, course)
+    n_cols = min(3, n_exams)
+    n_rows = (n_exams + n_cols - 1) // n_cols
 
-            n_cols = min(3, n_exams)
-            n_rows = (n_exams + n_cols - 1) // n_cols
+    fig, axes = plt.subplots(n_rows, n_cols, figsize=(5 * n_cols, 5 * n_rows))
+    if n_exams == 1:
+        axes = np.array([[axes]])
+    elif n_rows == 1:
+        axes = axes.reshape(1, -1)
+    axes_flat = axes.flatten()
 
-            fig, axes = plt.subplots(n_rows, n_cols, figsize=(5 * n_cols, 5 * n_rows))
-            if n_exams == 1:
-                axes = np.array([[axes]])
-            elif n_rows == 1:
-                axes = axes.reshape(1, -1)
-            axes_flat = axes.flatten()
+    for i in range(n_exams):
+        ax = axes_flat[i]
 
-            for i, (name, points_col, prolaz_col, time_col) in enumerate(exams):
-                ax = axes_flat[i]
+        failed = hist["failed"][i]
+        passed = hist["passed"][i]
 
-                attempted = df[df[points_col] > 0][points_col]
-                passed = (
-                    df[df[prolaz_col]][points_col]
-                    if prolaz_col in df.columns
-                    else pd.Series()
-                )
-                failed = (
-                    df[(df[points_col] > 0) & (~df[prolaz_col])][points_col]
-                    if prolaz_col in df.columns
-                    else pd.Series()
-                )
+        if failed.sum() > 0:
+            ax.hist(
+                edges[:-1],
+                bins=edges,
+                weights=failed,
+                alpha=0.7,
+                label="Pali",
+                color=COLORS["failed"],
+                edgecolor="black",
+            )
+        if passed.sum() > 0:
+            ax.hist(
+                edges[:-1],
+                bins=edges,
+                weights=passed,
+                alpha=0.7,
+                label="Prošli",
+                color=COLORS["passed"],
+                edgecolor="black",
+            )
 
-                if len(failed) > 0:
-                    ax.hist(
-                        failed,
-                        bins=15,
-                        alpha=0.7,
-                        label="Pali",
-                        color=COLORS["failed"],
-                        edgecolor="black",
-                    )
-                if len(passed) > 0:
-                    ax.hist(
-                        passed,
-                        bins=15,
-                        alpha=0.7,
-                        label="Prošli",
-                        color=COLORS["passed"],
-                        edgecolor="black",
-                    )
+        ax.set_xlabel("Bodovi")
+        ax.set_ylabel("Broj studenata")
+        ax.set_title(labels[i], fontsize=10)
+        ax.legend(fontsize=8)
+        ax.yaxis.set_major_locator(MaxNLocator(integer=True))
 
-                ax.set_xlabel("Bodovi")
-                ax.set_ylabel("Broj studenata")
-                ax.set_title(labels[i], fontsize=10)
-                ax.legend(fontsize=8)
-                ax.yaxis.set_major_locator(MaxNLocator(integer=True))
+    for j in range(n_exams, len(axes_flat)):
+        axes_flat[j].set_visible(False)
 
-            for j in range(n_exams, len(axes_flat)):
-                axes_flat[j].set_visible(False)
+    fig.suptitle(
+        f"{course} {year} - Distribucija bodova po roku",
+        fontsize=12,
+        fontweight="bold",
+    )
+    plt.tight_layout()
+    save_figure(fig, f"points_by_exam_{course}_{year}.png", output_dir)
 
-            fig.suptitle(
-                f"{course} {year} - Distribucija bodova po roku",
-                fontsize=12,
-                fontweight="bold",
-            )
-            plt.tight_layout()
-            save_figure(fig, f"points_by_exam_{course}_{year}.png", output_dir)
+
+def plot_points_by_exam_period(stats, output_dir):
+    for course in ["MA1", "MA2"]:
+        for year, hist in stats["points_histograms"][course].items():
+            plot_points_by_exam(hist, course, year, output_dir)
 
 
 def plot_pass_rate_by_exam_period(stats, output_dir):
     for course in ["MA1", "MA2"]:
         years = sorted(stats["pass_by_exam"][course].keys())
+        if not years:
+            continue
 
         year_groups = []
         for i in range(0, len(years), 4):
@@ -392,6 +453,8 @@ def plot_attempts_distribution(stats, output_dir):
 
 
 def plot_grade_heatmap_combined(stats, output_dir):
+    import seaborn as sns
+
     years = sorted(stats["grade_matrix"].keys())
     n_years = len(years)
 
@@ -429,7 +492,19 @@ def plot_grade_heatmap_combined(stats, output_dir):
     save_figure(fig, "grade_matrix_all.png", output_dir)
 
 
-def plot_scatter_points_combined(merged, stats, output_dir):
+def plot_scatter_points_combined(
+    merged, stats, output_dir, density_threshold=None
+):
+    """
+    MA1 vs MA2 points per year with a regression line. Years with more than
+    `density_threshold` students (default SCATTER_DENSITY_THRESHOLD) are drawn
+    as a hexbin density instead of one marker per student.
+    """
+    from scipy.stats import linregress
+
+    if density_threshold is None:
+        density_threshold = SCATTER_DENSITY_THRESHOLD
+
     years = sorted(merged.keys())
     n_years = len(years)
 
@@ -464,18 +539,30 @@ def plot_scatter_points_combined(merged, stats, output_dir):
             ax.set_title(f"{year}")
             continue
 
-        ax.scatter(
-            both["ma1_points"],
-            both["ma2_points"],
-            alpha=0.5,
-            edgecolors="black",
-            linewidths=0.3,
-            s=30,
-        )
-
         x = both["ma1_points"].values
         y = both["ma2_points"].values
-        linreg = stats_module.linregress(x, y)
+
+        if len(both) > density_threshold:
+            # Rasterized hexbin keeps render time and file size flat
+            ax.hexbin(
+                x,
+                y,
+                gridsize=SCATTER_DENSITY_GRIDSIZE,
+                mincnt=1,
+                cmap="YlGnBu",
+                rasterized=True,
+            )
+        else:
+            ax.scatter(
+                x,
+                y,
+                alpha=0.5,
+                edgecolors="black",
+                linewidths=0.3,
+                s=30,
+            )
+
+        linreg = linregress(x, y)
         slope: float = linreg[0]  # type: ignore
         intercept: float = linreg[1]  # type: ignore
         r_value: float = linreg[2]  # type: ignore
@@ -540,25 +627,31 @@ def plot_ma1_predicts_ma2(stats, output_dir):
     save_figure(fig, "ma1_predicts_ma2.png", output_dir)
 
 
+def covid_period_labels(covid):
+    titles = {"pre_covid": "Pre-COVID", "covid": "COVID", "post_covid": "Post-COVID"}
+    labels = []
+    for name, (start, end) in covid["windows"].items():
+        years = str(start) if start == end else f"{start}-{end}"
+        labels.append(f"{titles.get(name, name)}\n({years})")
+    return labels
+
+
+def covid_period_rates(covid, course):
+    return [
+        (covid[course][f"{name}_pass_rate"] or 0) * 100 for name in covid["windows"]
+    ]
+
+
 def plot_covid_comparison(stats, output_dir):
     fig, ax = plt.subplots(figsize=FIGSIZE_SINGLE)
 
     covid = stats["covid_impact"]
 
-    x = np.arange(3)
+    x = np.arange(len(covid["windows"]))
     width = 0.35
 
-    ma1_rates = [
-        (covid["MA1"]["pre_covid_pass_rate"] or 0) * 100,
-        (covid["MA1"]["covid_pass_rate"] or 0) * 100,
-        (covid["MA1"]["post_covid_pass_rate"] or 0) * 100,
-    ]
-
-    ma2_rates = [
-        (covid["MA2"]["pre_covid_pass_rate"] or 0) * 100,
-        (covid["MA2"]["covid_pass_rate"] or 0) * 100,
-        (covid["MA2"]["post_covid_pass_rate"] or 0) * 100,
-    ]
+    ma1_rates = covid_period_rates(covid, "MA1")
+    ma2_rates = covid_period_rates(covid, "MA2")
 
     ax.bar(x - width / 2, ma1_rates, width, label="MA1", color=COLORS["MA1"])
     ax.bar(x + width / 2, ma2_rates, width, label="MA2", color=COLORS["MA2"])
@@ -567,9 +660,7 @@ def plot_covid_comparison(stats, output_dir):
     ax.set_ylabel("Prolaznost (%)")
     ax.set_title("Usporedba prolaznosti: Pre-COVID vs COVID vs Post-COVID")
     ax.set_xticks(x)
-    ax.set_xticklabels(
-        ["Pre-COVID\n(2018)", "COVID\n(2019-2020)", "Post-COVID\n(2021-2024)"]
-    )
+    ax.set_xticklabels(covid_period_labels(covid))
     ax.legend()
     ax.yaxis.set_major_locator(MaxNLocator(integer=True))
 
@@ -638,7 +729,7 @@ def plot_most_common_pass_exam(stats, output_dir):
     save_figure(fig, "most_common_pass_exam.png", output_dir)
 
 
-def plot_rejection_analysis(processed, stats, output_dir):
+def plot_rejection_analysis(stats, output_dir):
     fig, axes = plt.subplots(2, 2, figsize=FIGSIZE_GRID)
 
     for idx, course in enumerate(["MA1", "MA2"]):
@@ -648,11 +739,14 @@ def plot_rejection_analysis(processed, stats, output_dir):
         worsened = 0
         same = 0
 
-        for year, df in processed[course].items():
-            rejected = df[df["rejected_grade"]]
-            improved += (rejected["grade_change"] > 0).sum()
-            worsened += (rejected["grade_change"] < 0).sum()
-            same += (rejected["grade_change"] == 0).sum()
+        for year, s in stats["single_course"][course].items():
+            improved += s["grade_improved_after_reject"]
+            worsened += s["grade_worsened_after_reject"]
+            same += (
+                s["students_rejected_grade"]
+                - s["grade_improved_after_reject"]
+                - s["grade_worsened_after_reject"]
+            )
 
         values = [improved, same, worsened]
         labels = ["Poboljšana", "Ista", "Pogoršana"]
@@ -697,11 +791,11 @@ def plot_rejection_analysis(processed, stats, output_dir):
     save_figure(fig, "rejection_analysis.png", output_dir)
 
 
-def plot_failed_analysis(processed, stats, output_dir):
+def plot_failed_analysis(stats, output_dir):
     fig, axes = plt.subplots(2, 2, figsize=FIGSIZE_GRID)
 
     for idx, course in enumerate(["MA1", "MA2"]):
-        years = sorted(processed[course].keys())
+        years = sorted(stats["single_course"][course].keys())
 
         ax1 = axes[0, idx]
         never_tried = [
@@ -785,7 +879,51 @@ def plot_correlation_trend(stats, output_dir):
     save_figure(fig, "correlation_trend.png", output_dir)
 
 
-stats_module = stats
+def plot_threshold_what_if(stats, output_dir):
+    from src.processing import OLD_GRADE_BOUNDARIES, NEW_GRADE_BOUNDARIES
+
+    curves = stats["threshold_what_if"]["curves"]
+
+    fig, axes = plt.subplots(1, 2, figsize=FIGSIZE_WIDE)
+
+    ax1 = axes[0]
+    for course in ["MA1", "MA2"]:
+        c = curves[curves["course"] == course]
+        ax1.plot(
+            c["boundary_2"],
+            c["pass_rate"] * 100,
+            linewidth=2,
+            label=course,
+            color=COLORS[course],
+        )
+    ax1.axvline(OLD_GRADE_BOUNDARIES[0], color="gray", linestyle="--", alpha=0.7)
+    ax1.axvline(NEW_GRADE_BOUNDARIES[0], color="black", linestyle="--", alpha=0.7)
+    ax1.set_xlabel("Prag prolaznosti (bodovi)")
+    ax1.set_ylabel("Prolaznost (%)")
+    ax1.set_title("Simulirana prolaznost ovisno o pragu")
+    ax1.legend()
+    ax1.grid(True, alpha=0.3)
+
+    ax2 = axes[1]
+    for course, linestyle in [("MA1", "-"), ("MA2", "--")]:
+        c = curves[curves["course"] == course]
+        for grade, color in zip([2, 3, 4, 5], GRADE_COLORS):
+            ax2.plot(
+                c["boundary_2"],
+                c[f"grade_{grade}_share"] * 100,
+                linestyle=linestyle,
+                linewidth=1.5,
+                color=color,
+                label=f"{course} - {grade}",
+            )
+    ax2.set_xlabel("Prag prolaznosti (bodovi)")
+    ax2.set_ylabel("Udio među položenima (%)")
+    ax2.set_title("Simulirana distribucija ocjena ovisno o granicama")
+    ax2.legend(fontsize=8, ncol=2)
+    ax2.grid(True, alpha=0.3)
+
+    plt.tight_layout()
+    save_figure(fig, "threshold_what_if.png", output_dir)
 
 
 def plot_summary_dashboard(stats, output_dir):
@@ -797,7 +935,9 @@ def plot_summary_dashboard(stats, output_dir):
     
     # 1. Pass rate comparison (top-left, spans 2 columns)
     ax1 = fig.add_subplot(gs[0, 0:2])
-    years = sorted(stats["single_course"]["MA1"].keys())
+    years = sorted(
+        set(stats["single_course"]["MA1"]) & set(stats["single_course"]["MA2"])
+    )
     ma1_rates = [stats["single_course"]["MA1"][y]["pass_rate"] * 100 for y in years]
     ma2_rates = [stats["single_course"]["MA2"][y]["pass_rate"] * 100 for y in years]
     
@@ -824,9 +964,8 @@ def plot_summary_dashboard(stats, output_dir):
                 if grade in grades:
                     grades[grade] += count
         
-        colors_pie = ['#e74c3c', '#f39c12', '#3498db', '#2ecc71']
         labels = [f'2 ({grades[2]})', f'3 ({grades[3]})', f'4 ({grades[4]})', f'5 ({grades[5]})']
-        ax.pie(grades.values(), labels=labels, colors=colors_pie, autopct='%1.1f%%', startangle=90)
+        ax.pie(grades.values(), labels=labels, colors=GRADE_COLORS, autopct='%1.1f%%', startangle=90)
         ax.set_title(f'{course} - Distribucija ocjena', fontweight='bold')
     
     # 3. MA1 predicts MA2 (middle-left)
@@ -843,8 +982,7 @@ def plot_summary_dashboard(stats, output_dir):
     
     grades = [2, 3, 4, 5]
     rates = [agg_pred[g]["passed"]/agg_pred[g]["total"]*100 if agg_pred[g]["total"] > 0 else 0 for g in grades]
-    colors_bar = ['#e74c3c', '#f39c12', '#3498db', '#2ecc71']
-    bars = ax3.bar(grades, rates, color=colors_bar, edgecolor='black')
+    bars = ax3.bar(grades, rates, color=GRADE_COLORS, edgecolor='black')
     ax3.set_xlabel('Ocjena iz MA1')
     ax3.set_ylabel('Prolaznost na MA2 (%)')
     ax3.set_title('Kako ocjena iz MA1 predviđa uspjeh na MA2', fontweight='bold')
@@ -857,13 +995,9 @@ def plot_summary_dashboard(stats, output_dir):
     # 4. COVID impact (middle-right)
     ax4 = fig.add_subplot(gs[1, 2:4])
     covid = stats["covid_impact"]
-    periods = ['Pre-COVID\n(2018)', 'COVID\n(2019-2020)', 'Post-COVID\n(2021-2024)']
-    ma1_covid = [(covid["MA1"]["pre_covid_pass_rate"] or 0) * 100,
-                 (covid["MA1"]["covid_pass_rate"] or 0) * 100,
-                 (covid["MA1"]["post_covid_pass_rate"] or 0) * 100]
-    ma2_covid = [(covid["MA2"]["pre_covid_pass_rate"] or 0) * 100,
-                 (covid["MA2"]["covid_pass_rate"] or 0) * 100,
-                 (covid["MA2"]["post_covid_pass_rate"] or 0) * 100]
+    periods = covid_period_labels(covid)
+    ma1_covid = covid_period_rates(covid, "MA1")
+    ma2_covid = covid_period_rates(covid, "MA2")
     
     x = np.arange(len(periods))
     ax4.bar(x - width/2, ma1_covid, width, label='MA1', color=COLORS["MA1"], edgecolor='black')
@@ -943,27 +1077,298 @@ def plot_summary_dashboard(stats, output_dir):
     save_figure(fig, "summary_dashboard.png", output_dir)
 
 
-def generate_all_visualizations(processed, merged, all_stats, output_dir):
+def _pick(all_stats, *keys):
+    return {k: all_stats.get(k) for k in keys}
+
+
+def _has_data(value):
+    """False for analyses that were not computed or have no rows."""
+    if value is None:
+        return False
+    if isinstance(value, pd.DataFrame):
+        return not value.empty
+    if isinstance(value, dict):
+        if set(value) == {"MA1", "MA2"}:
+            return any(_has_data(v) for v in value.values())
+        return len(value) > 0
+    return True
+
+
+def resolve_figures(names=None):
+    if names is None:
+        return list(FIGURE_INPUTS)
+
+    unknown = set(names) - set(FIGURE_INPUTS)
+    if unknown:
+        raise ValueError(f"Unknown figures: {', '.join(sorted(unknown))}")
+    return [name for name in FIGURE_INPUTS if name in names]
+
+
+def figure_analyses(names=None):
+    """Analyses (keys of the stats dict) the selected figures are drawn from."""
+    analyses = []
+    for name in resolve_figures(names):
+        for key in FIGURE_INPUTS[name]:
+            if key != "merged" and key not in analyses:
+                analyses.append(key)
+    return analyses
+
+
+def figure_tasks(merged, all_stats, figures=None):
+    """
+    The selected figures (default: all of FIGURE_INPUTS) as independent
+    (plot function, args, output files) tasks, in output order. Each function
+    is called as func(*args, output_dir).
+
+    Stats-based plots only get the parts of the stats dict they read, so the
+    args are exactly the data slice the figure depends on. Figures whose
+    inputs are empty (e.g. course or years filtered out) are skipped.
+    """
+    functions = {
+        "summary_dashboard": plot_summary_dashboard,
+        "pass_rate_trend": plot_pass_rate_by_year,
+        "enrollment": plot_enrollment_trend,
+        "grade_distribution": plot_grade_distribution_combined,
+        "covid_comparison": plot_covid_comparison,
+        "correlation_trend": plot_correlation_trend,
+        "ma2_before_ma1": plot_ma2_before_ma1,
+        "most_common_pass_exam": plot_most_common_pass_exam,
+        "rejection_analysis": plot_rejection_analysis,
+        "failed_analysis": plot_failed_analysis,
+        "attempts_distribution": plot_attempts_distribution,
+        "pass_rate_by_exam": plot_pass_rate_by_exam_period,
+        "grade_matrix": plot_grade_heatmap_combined,
+        "scatter_points": plot_scatter_points_combined,
+        "ma1_predicts_ma2": plot_ma1_predicts_ma2,
+        "threshold_what_if": plot_threshold_what_if,
+    }
+    outputs = {
+        "summary_dashboard": ["summary_dashboard.png"],
+        "pass_rate_trend": ["pass_rate_trend.png"],
+        "enrollment": ["enrollment_passed_failed.png"],
+        "covid_comparison": ["covid_comparison.png"],
+        "correlation_trend": ["correlation_trend.png"],
+        "ma2_before_ma1": ["ma2_before_ma1.png"],
+        "most_common_pass_exam": ["most_common_pass_exam.png"],
+        "rejection_analysis": ["rejection_analysis.png"],
+        "failed_analysis": ["failed_analysis.png"],
+        "attempts_distribution": ["attempts_distribution_all.png"],
+        "grade_matrix": ["grade_matrix_all.png"],
+        "scatter_points": ["scatter_points_all.png"],
+        "ma1_predicts_ma2": ["ma1_predicts_ma2.png"],
+        "threshold_what_if": ["threshold_what_if.png"],
+    }
+    single_course = all_stats.get("single_course") or {}
+    # The dashboard compares the courses year by year
+    both_courses = bool(
+        set(single_course.get("MA1") or {}) & set(single_course.get("MA2") or {})
+    )
+
+    tasks = []
+    for name in resolve_figures(figures):
+        keys = FIGURE_INPUTS[name]
+        inputs = {k: merged if k == "merged" else all_stats.get(k) for k in keys}
+        if not all(_has_data(v) for v in inputs.values()):
+            continue
+
+        if name == "summary_dashboard" and not both_courses:
+            continue
+
+        if name == "points_by_exam":
+            histograms = inputs["points_histograms"]
+            for course in ["MA1", "MA2"]:
+                for year, hist in sorted(histograms.get(course, {}).items()):
+                    tasks.append(
+                        (
+                            plot_points_by_exam,
+                            (hist, course, year),
+                            [f"points_by_exam_{course}_{year}.png"],
+                        )
+                    )
+            continue
+
+        if name == "grade_distribution":
+            courses = [c for c in ["MA1", "MA2"] if single_course.get(c)]
+            files = [f"grade_distribution_{c}_all.png" for c in courses]
+        elif name == "pass_rate_by_exam":
+            courses = [c for c in ["MA1", "MA2"] if inputs["pass_by_exam"].get(c)]
+            files = [f"pass_rate_by_exam_{c}.png" for c in courses]
+        else:
+            files = outputs[name]
+
+        if name == "scatter_points":
+            args = (merged, {})
+        else:
+            args = (_pick(all_stats, *keys),)
+        tasks.append((functions[name], args, files))
+
+    return tasks
+
+
+def _hash_update(h, obj):
+    """Feed a stable representation of `obj` into hash object `h`."""
+    if isinstance(obj, pd.DataFrame):
+        h.update(b"DataFrame")
+        h.update(repr(list(zip(obj.columns, map(str, obj.dtypes)))).encode())
+        h.update(repr(obj.attrs).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, pd.Series):
+        h.update(b"Series")
+        h.update(str(obj.dtype).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(f"ndarray{obj.dtype}{obj.shape}".encode())
+        h.update(repr(obj.tolist()).encode() if obj.dtype == object else obj.tobytes())
+    elif isinstance(obj, dict):
+        h.update(f"dict{len(obj)}".encode())
+        for key in sorted(obj, key=repr):
+            _hash_update(h, key)
+            _hash_update(h, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        h.update(f"{type(obj).__name__}{len(obj)}".encode())
+        for item in obj:
+            _hash_update(h, item)
+    else:
+        h.update(f"{type(obj).__name__}:{obj!r}".encode())
+
+
+def _source_hash():
+    """
+    Hash of this module's source: plot functions, their helpers and the
+    style constants all live here, so any edit to them changes every key.
+    """
+    global _source_digest
+    if _source_digest is None:
+        with open(__file__, "rb") as f:
+            _source_digest = hashlib.sha256(f.read()).hexdigest()
+    return _source_digest
+
+
+def figure_cache_key(func, args):
+    """Hash of the plotting code, the plot function's name and its data slice."""
+    h = hashlib.sha256()
+    _hash_update(h, FIGURE_CACHE_VERSION)
+    _hash_update(h, matplotlib.__version__)
+    _hash_update(h, _source_hash())
+    _hash_update(h, f"{func.__module__}.{func.__qualname__}")
+    _hash_update(h, args)
+    return h.hexdigest()
+
+
+def load_figure_cache(figures_dir):
+    path = os.path.join(figures_dir, FIGURE_CACHE_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_figure_cache(cache, figures_dir):
+    path = os.path.join(figures_dir, FIGURE_CACHE_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _init_render_worker(profile=False, memory=False):
+    matplotlib.use("Agg")
+    apply_style()
+    if profile:
+        profiling.start(memory)
+
+
+def _render_task(task):
+    """
+    Run one plot task in a worker and return what it printed and its
+    profiling records. Args published with SharedFrames arrive as handles
+    and are attached here.
+    """
+    func, args, output_dir = task
+    args = [attach(a) if isinstance(a, FramesHandle) else a for a in args]
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        with profiling.stage(f"figure.{func.__name__}"):
+            func(*args, output_dir)
+    return buffer.getvalue(), profiling.collect()
+
+
+def generate_all_visualizations(
+    merged, all_stats, output_dir, workers=1, use_cache=True, figures=None
+):
+    """
+    Render the figures named in `figures` (default: all) into
+    `output_dir`/figures.
+
+    With `use_cache`, a figure is skipped when its output files exist and the
+    hash of its inputs matches the one recorded when it was last rendered.
+
+    With `workers` > 1 (None means one per CPU) the independent plot tasks are
+    dispatched to a process pool using the non-interactive Agg backend. Log
+    lines are printed in task order, so output is the same as a sequential run.
+    """
     figures_dir = os.path.join(output_dir, "figures")
     ensure_dir(figures_dir)
+    apply_style()
 
     print("\nGenerating visualizations...")
 
-    plot_summary_dashboard(all_stats, figures_dir)
-    plot_pass_rate_by_year(all_stats, figures_dir)
-    plot_enrollment_trend(all_stats, figures_dir)
-    plot_grade_distribution_combined(processed, figures_dir)
-    plot_covid_comparison(all_stats, figures_dir)
-    plot_correlation_trend(all_stats, figures_dir)
-    plot_ma2_before_ma1(all_stats, figures_dir)
-    plot_most_common_pass_exam(all_stats, figures_dir)
-    plot_rejection_analysis(processed, all_stats, figures_dir)
-    plot_failed_analysis(processed, all_stats, figures_dir)
-
-    plot_attempts_distribution(all_stats, figures_dir)
-    plot_pass_rate_by_exam_period(all_stats, figures_dir)
-    plot_points_by_exam_period(processed, figures_dir)
-
-    plot_grade_heatmap_combined(all_stats, figures_dir)
-    plot_scatter_points_combined(merged, all_stats, figures_dir)
-    plot_ma1_predicts_ma2(all_stats, figures_dir)
+    cache = load_figure_cache(figures_dir) if use_cache else {}
+    pending = []
+    hits = 0
+    for func, args, outputs in figure_tasks(merged, all_stats, figures):
+        key = figure_cache_key(func, args) if use_cache else None
+        if use_cache and all(
+            cache.get(name) == key and os.path.exists(os.path.join(figures_dir, name))
+            for name in outputs
+        ):
+            hits += 1
+            for name in outputs:
+                print(f"  - {name}... cached")
+            continue
+        pending.append((func, args, outputs, key))
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(pending))
+
+    if workers <= 1:
+        for func, args, outputs, key in pending:
+            with profiling.stage(f"figure.{func.__name__}"):
+                func(*args, figures_dir)
+    else:
+        # The merged frames are published once instead of pickled per task;
+        # they are the only frames the figure tasks take
+        shared = None
+        if any(arg is merged for _, args, _, _ in pending for arg in args):
+            shared = SharedFrames(merged)
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_render_worker,
+                initargs=(profiling.enabled(), profiling.memory_enabled()),
+            ) as pool:
+                jobs = [
+                    (
+                        func,
+                        [shared.handle if arg is merged else arg for arg in args],
+                        figures_dir,
+                    )
+                    for func, args, _, _ in pending
+                ]
+                for log, records in pool.map(_render_task, jobs):
+                    print(log, end="")
+                    profiling.add(records)
+        finally:
+            if shared is not None:
+                shared.close()
+
+    if use_cache:
+        for func, args, outputs, key in pending:
+            for name in outputs:
+                cache[name] = key
+        save_figure_cache(cache, figures_dir)
+        print(f"  Figure cache: {hits} hits, {len(pending)} misses")
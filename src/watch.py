@@ -0,0 +1,130 @@
+"""
+Incremental reloading of the data directory and a polling watch mode.
+
+`scan` records the modification time and size of every course-year CSV.
+Comparing two scans gives the course-years that were added, modified or
+removed; `apply_changes` re-reads and reprocesses only those and rebuilds
+the merged frames of the affected years, and update_statistics reuses the
+results of untouched course-years.
+"""
+
+import os
+import time
+
+from src.analysis import compute_all_statistics, update_statistics
+from src.ingestion import find_csv_files, load_csv
+from src.processing import create_merged_data, process_all_data
+
+POLL_SECONDS = 1.0
+# A burst of writes is handled once no file changed for this long
+DEBOUNCE_SECONDS = 2.0
+
+
+def scan(data_dir, courses=None, years=None):
+    """
+    Map (course, year) to (path, mtime_ns, size) of its CSV. `courses` and
+    `years` restrict which course-years are watched, as in find_csv_files.
+    """
+    files = {}
+    for key, path in find_csv_files(data_dir, courses, years).items():
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        files[key] = (path, st.st_mtime_ns, st.st_size)
+    return files
+
+
+def diff_scans(old, new):
+    """Course-years added, modified or removed between two scans, sorted."""
+    changed = {key for key in new if old.get(key) != new[key]}
+    changed |= {key for key in old if key not in new}
+    return sorted(changed)
+
+
+def apply_changes(processed, merged, files, changed):
+    """
+    New (processed, merged) with the `changed` course-years re-read from
+    `files` (a scan) or dropped if they are no longer there.
+    """
+    processed = {course: dict(years) for course, years in processed.items()}
+    loaded = {"MA1": {}, "MA2": {}}
+    for course, year in changed:
+        processed[course].pop(year, None)
+        if (course, year) in files:
+            df = load_csv(files[(course, year)][0])
+            if df is not None:
+                loaded[course][year] = df
+    for course, years in process_all_data(loaded).items():
+        processed[course].update(years)
+        processed[course] = dict(sorted(processed[course].items()))
+
+    years = {year for _, year in changed}
+    merged = {y: df for y, df in merged.items() if y not in years}
+    merged.update(
+        create_merged_data(
+            {
+                course: {y: df for y, df in processed[course].items() if y in years}
+                for course in processed
+            }
+        )
+    )
+    return processed, dict(sorted(merged.items()))
+
+
+def _wait_until_quiet(data_dir, files, debounce, courses=None, years=None):
+    """Poll until the directory has not changed for `debounce` seconds."""
+    quiet_since = time.monotonic()
+    while time.monotonic() - quiet_since < debounce:
+        time.sleep(min(POLL_SECONDS, debounce))
+        current = scan(data_dir, courses, years)
+        if current != files:
+            files = current
+            quiet_since = time.monotonic()
+    return files
+
+
+def watch(
+    data_dir,
+    on_update,
+    covid_windows=None,
+    courses=None,
+    years=None,
+    poll=POLL_SECONDS,
+    debounce=DEBOUNCE_SECONDS,
+):
+    """
+    Load everything once, then poll `data_dir` and, after each debounced
+    burst of changes, reprocess only the changed course-years and call
+    on_update(processed, merged, stats, changed). `courses` and `years`
+    restrict the watched course-years; other files are ignored.
+    """
+    files = scan(data_dir, courses, years)
+    changed = diff_scans({}, files)
+    processed, merged = apply_changes({"MA1": {}, "MA2": {}}, {}, files, changed)
+    stats = compute_all_statistics(processed, merged, covid_windows)
+    on_update(processed, merged, stats, changed)
+
+    print(f"\nWatching {data_dir} for changes (Ctrl+C to stop)...")
+    try:
+        while True:
+            time.sleep(poll)
+            current = scan(data_dir, courses, years)
+            if current == files:
+                continue
+
+            current = _wait_until_quiet(data_dir, current, debounce, courses, years)
+            changed = diff_scans(files, current)
+            files = current
+            if not changed:
+                continue
+
+            start = time.perf_counter()
+            names = ", ".join(f"{course}_{year}" for course, year in changed)
+            print(f"\nChanged: {names}")
+            processed, merged = apply_changes(processed, merged, files, changed)
+            stats = update_statistics(stats, processed, merged, changed, covid_windows)
+            on_update(processed, merged, stats, changed)
+            print(f"Updated in {time.perf_counter() - start:.1f}s")
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+
+from src.processing import get_exam_columns, NEW_GRADE_BOUNDARIES
+
+GRADES = [2, 3, 4, 5]
+
+
+def student_points(df):
+    """
+    Points each student is re-graded on: the final ISVU points for students
+    who passed, otherwise their best result over all exam periods.
+    """
+    exams = get_exam_columns(df)
+    points_cols = [points_col for _, points_col, _, _ in exams]
+
+    best = (
+        df[points_cols].max(axis=1).to_numpy(dtype=float)
+        if points_cols
+        else np.zeros(len(df))
+    )
+    final = df["final_points"].to_numpy(dtype=float)
+    points = np.where(np.isnan(final), best, final)
+    return np.nan_to_num(points, nan=0.0)
+
+
+def shifted_boundary_grid(base=NEW_GRADE_BOUNDARIES, shifts=None):
+    """Boundary sets obtained by shifting all of `base` by each shift."""
+    if shifts is None:
+        shifts = np.arange(-15, 15.5, 0.5)
+    shifts = np.asarray(shifts, dtype=float)
+    return np.asarray(base, dtype=float)[None, :] + shifts[:, None]
+
+
+def threshold_sweep(processed, boundary_sets):
+    """
+    Re-grade every student of every course-year under each boundary set.
+
+    `boundary_sets` is an (m, 4) array of lower point boundaries for grades
+    2-5. The points of each course-year are sorted once, and one
+    searchsorted over all (boundary set, grade) queries yields the number
+    of its students at or above every boundary. Returns one row per
+    (boundary set, course, year).
+    """
+    boundary_sets = np.atleast_2d(np.asarray(boundary_sets, dtype=float))
+    if not np.isfinite(boundary_sets).all():
+        raise ValueError("Grade boundaries must be finite numbers")
+    m = len(boundary_sets)
+
+    groups = []
+    points_by_group = []
+    for course in ["MA1", "MA2"]:
+        for year in sorted(processed[course].keys()):
+            points_by_group.append(student_points(processed[course][year]))
+            groups.append(
+                {
+                    "course": course,
+                    "year": year,
+                    "n": len(points_by_group[-1]),
+                    "actual_pass_rate": float(processed[course][year]["passed"].mean()),
+                }
+            )
+
+    n_groups = len(groups)
+    if n_groups == 0:
+        return pd.DataFrame()
+
+    at_or_above = np.stack(
+        [
+            len(points) - np.searchsorted(np.sort(points), boundary_sets, side="left")
+            for points in points_by_group
+        ]
+    )
+
+    grade_counts = np.empty_like(at_or_above)
+    grade_counts[..., :-1] = at_or_above[..., :-1] - at_or_above[..., 1:]
+    grade_counts[..., -1] = at_or_above[..., -1]
+
+    n = np.array([g["n"] for g in groups])
+    passed = at_or_above[..., 0]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pass_rate = passed / n[:, None]
+
+    result = {
+        "set": np.tile(np.arange(m), n_groups),
+        "course": np.repeat([g["course"] for g in groups], m),
+        "year": np.repeat([g["year"] for g in groups], m),
+        "n": np.repeat(n, m),
+        "actual_pass_rate": np.repeat([g["actual_pass_rate"] for g in groups], m),
+    }
+    for i, grade in enumerate(GRADES):
+        result[f"boundary_{grade}"] = np.tile(boundary_sets[:, i], n_groups)
+    result["passed"] = passed.ravel()
+    result["pass_rate"] = pass_rate.ravel()
+    for i, grade in enumerate(GRADES):
+        result[f"grade_{grade}"] = grade_counts[..., i].ravel()
+
+    return pd.DataFrame(result)
+
+
+def sweep_curves(sweep):
+    """Pool a sweep over years: pass rate and grade shares per course and set."""
+    if sweep.empty:
+        return sweep
+
+    boundary_cols = [f"boundary_{g}" for g in GRADES]
+    grade_cols = [f"grade_{g}" for g in GRADES]
+
+    curves = (
+        sweep.groupby(["course", "set"] + boundary_cols, sort=True)[
+            ["n", "passed"] + grade_cols
+        ]
+        .sum()
+        .reset_index()
+    )
+    curves["pass_rate"] = curves["passed"] / curves["n"]
+    for col in grade_cols:
+        curves[f"{col}_share"] = curves[col] / curves["passed"].where(
+            curves["passed"] > 0
+        )
+    return curves
+
+
+def threshold_what_if(processed, boundary_sets=None):
+    if boundary_sets is None:
+        boundary_sets = shifted_boundary_grid()
+
+    sweep = threshold_sweep(processed, boundary_sets)
+    return {
+        "boundary_sets": np.atleast_2d(boundary_sets),
+        "sweep": sweep,
+        "curves": sweep_curves(sweep),
+    }
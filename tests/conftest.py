@@ -0,0 +1,23 @@
+import os
+import shutil
+
+import pytest
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "MATAN")
+
+
+@pytest.fixture(scope="session")
+def small_year_dir(tmp_path_factory):
+    """
+    The 2024 exports plus a 2025 MA1/MA2 pair of only 8 students, too few
+    passers for ma1_predicts_ma2 (which gives None for that year).
+    """
+    path = tmp_path_factory.mktemp("small_year")
+    for course in ["MA1", "MA2"]:
+        source = os.path.join(DATA_DIR, f"{course}_2024_clean.csv")
+        shutil.copy(source, path / f"{course}_2024_clean.csv")
+        with open(source, encoding="utf-8") as f:
+            head = [next(f) for _ in range(9)]
+        with open(path / f"{course}_2025_clean.csv", "w", encoding="utf-8") as f:
+            f.writelines(head)
+    return str(path)
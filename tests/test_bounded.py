@@ -0,0 +1,21 @@
+import os
+
+from src.analysis import compute_all_statistics
+from src.bounded import run_bounded
+from src.ingestion import load_all_csvs
+from src.processing import create_merged_data, process_all_data
+from src.server import jsonable
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "MATAN")
+
+
+def test_run_bounded_matches_in_memory_stats(capsys):
+    processed = process_all_data(load_all_csvs(DATA_DIR, verbose=False))
+    expected = compute_all_statistics(processed, create_merged_data(processed))
+    capsys.readouterr()
+
+    _, _, stats, _ = run_bounded(DATA_DIR, budget_mb=float("inf"), verbose=False)
+    assert capsys.readouterr().out == ""
+    assert sorted(stats) == sorted(expected)
+    for name in expected:
+        assert jsonable(stats[name]) == jsonable(expected[name]), name
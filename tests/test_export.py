@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from src.analysis import compute_all_statistics
+from src.export import export_processed, export_stats, load_processed, load_stats
+from src.ingestion import load_all_csvs
+from src.processing import create_merged_data, process_all_data
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "MATAN")
+
+
+def run(courses, years, data_dir=DATA_DIR):
+    data = load_all_csvs(data_dir, courses=courses, years=years, verbose=False)
+    processed = process_all_data(data)
+    return compute_all_statistics(processed, create_merged_data(processed))
+
+
+@pytest.mark.parametrize(
+    "courses, years",
+    [
+        # One course: year_index and rolling_windows are None for the other
+        (["MA1"], [2022, 2023]),
+        # No pre-COVID year: covid_impact has no covid_difference
+        (None, [2022, 2023, 2024]),
+    ],
+)
+def test_export_filtered_run(tmp_path, courses, years):
+    stats = run(courses, years)
+    manifest = export_stats(stats, str(tmp_path))
+    tables = load_stats(str(tmp_path))
+
+    assert set(tables) == set(manifest["tables"])
+    assert "covid_difference" not in tables
+    assert set(tables["covid_impact"]["course"]) == {"MA1", "MA2"}
+    exported = set(tables["year_index"]["course"])
+    assert exported == ({"MA1"} if courses == ["MA1"] else {"MA1", "MA2"})
+    assert set(tables["rolling_windows"]["course"]) <= exported
+
+
+@pytest.mark.parametrize("courses", [None, ["MA1"]])
+def test_export_year_with_too_few_passers(tmp_path, small_year_dir, courses):
+    stats = run(courses, None, small_year_dir)
+    export_stats(stats, str(tmp_path))
+    tables = load_stats(str(tmp_path))
+
+    if courses is None:
+        # ma1_predicts_ma2 is None for 2025: no rows for that year
+        assert stats["ma1_predicts_ma2"][2025] is None
+        assert set(tables["ma1_predicts_ma2"]["year"]) == {2024}
+    assert set(tables["single_course"]["year"]) == {2024, 2025}
+
+
+def test_export_covid_difference(tmp_path):
+    stats = run(["MA1"], [2018, 2019, 2020])
+    export_stats(stats, str(tmp_path))
+    difference = load_stats(str(tmp_path), ["covid_difference"])["covid_difference"]
+    assert list(difference["course"]) == ["MA1"]
+
+
+def test_export_processed_changed(tmp_path):
+    data = load_all_csvs(DATA_DIR, years=[2022, 2023], verbose=False)
+    processed = process_all_data(data)
+    merged = create_merged_data(processed)
+    export_processed(processed, merged, str(tmp_path))
+    kept = os.stat(tmp_path / "processed" / "MA1_2022" / "000.npy").st_ino
+
+    # MA1_2023 changed: only it and merged_2023 are rewritten
+    processed["MA1"][2023] = processed["MA1"][2023].iloc[:-1].reset_index(drop=True)
+    merged = create_merged_data(processed)
+    export_processed(processed, merged, str(tmp_path), changed=[("MA1", 2023)])
+
+    assert os.stat(tmp_path / "processed" / "MA1_2022" / "000.npy").st_ino == kept
+    reloaded, reloaded_merged = load_processed(str(tmp_path))
+    for course in processed:
+        for year, df in processed[course].items():
+            assert len(reloaded[course][year]) == len(df)
+    for year, df in merged.items():
+        assert len(reloaded_merged[year]) == len(df)
@@ -0,0 +1,25 @@
+import os
+
+from src.ingestion import load_all_csvs
+from src.processing import process_all_data
+from src.query import build_store
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "MATAN")
+
+
+def test_caches_are_bounded():
+    processed = process_all_data(load_all_csvs(DATA_DIR, verbose=False))
+    store = build_store(processed)
+    store._cache_size = 4
+
+    counts = []
+    for low in range(0, 100, 5):
+        where = {"course": "MA1", "points": (low, None)}
+        counts.append(int(store.query(where)["count"][0]))
+        assert len(store._mask_cache) <= 4
+        assert len(store._result_cache) <= 4
+
+    # Evicted entries are recomputed with the same result
+    again = store.query({"course": "MA1", "points": (0, None)})
+    assert int(again["count"][0]) == counts[0]
+    assert counts == sorted(counts, reverse=True)
@@ -0,0 +1,26 @@
+from src.analysis import compute_all_statistics
+from src.ingestion import load_all_csvs
+from src.processing import create_merged_data, process_all_data
+from src.report import render_html, report_data
+from src.visualization import COLORS, GRADE_COLORS, covid_period_labels
+
+
+def test_report_year_with_too_few_passers(small_year_dir):
+    processed = process_all_data(load_all_csvs(small_year_dir, verbose=False))
+    stats = compute_all_statistics(processed, create_merged_data(processed))
+    assert stats["ma1_predicts_ma2"][2025] is None
+
+    transitions = report_data(stats)["transitions"]
+    assert transitions["years"] == [2024, 2025]
+    assert all(rate is None for rate in transitions["ma2_pass_rate"][1])
+    assert "2025" in render_html(stats)
+
+
+def test_report_reuses_figure_labels_and_colors(small_year_dir):
+    processed = process_all_data(load_all_csvs(small_year_dir, verbose=False))
+    stats = compute_all_statistics(processed, create_merged_data(processed))
+    data = report_data(stats)
+
+    labels = covid_period_labels(stats["covid_impact"])
+    assert data["covid"]["labels"] == [label.replace("\n", " ") for label in labels]
+    assert data["colors"] == dict(COLORS, grades=GRADE_COLORS)
@@ -0,0 +1,32 @@
+import json
+import os
+
+import numpy as np
+
+from src.server import StatsService, jsonable
+from src.storage import ingest_csvs
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "MATAN")
+
+
+def test_jsonable_non_finite():
+    values = [float("nan"), float("inf"), -np.inf, np.float64(np.inf), 1.5]
+    assert jsonable(values) == [None, None, None, None, 1.5]
+    json.loads(json.dumps(jsonable({"x": np.array([np.inf, 2.0])})))
+
+
+def test_service_reads_sqlite(tmp_path):
+    path = str(tmp_path / "matan.sqlite")
+    ingest_csvs(path, DATA_DIR, years=[2023, 2024])
+
+    service = StatsService(path)
+    expected = StatsService(DATA_DIR)
+    assert service.state["processed"]["MA2"]
+    served = json.loads(service.analysis("single_course"))
+    reference = json.loads(expected.analysis("single_course"))
+    for course in ["MA1", "MA2"]:
+        assert served[course] == {y: reference[course][y] for y in ["2023", "2024"]}
+    served = json.loads(service.analysis("correlation"))
+    reference = json.loads(expected.analysis("correlation"))
+    assert served == {y: reference[y] for y in ["2023", "2024"]}
+    assert service.reload() == []
@@ -0,0 +1,69 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import sharedmem
+from src.ingestion import load_all_csvs
+from src.processing import create_merged_data, process_all_data
+from src.sharedmem import SharedFrames, attach, detach
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "MATAN")
+
+
+def zero_copy_columns(df):
+    return [
+        column
+        for column, dtype in df.dtypes.items()
+        if pd.api.types.is_numeric_dtype(dtype)
+        or pd.api.types.is_bool_dtype(dtype)
+        or pd.api.types.is_datetime64_dtype(dtype)
+    ]
+
+
+def inspect_shared(handle):
+    """Runs in a spawned worker: which columns are views of the block."""
+    frames = attach(handle)
+    block = np.frombuffer(sharedmem._attached[handle.name].buf, np.uint8)
+    result = {}
+    for key, df in frames.items():
+        result[key] = {
+            "shared": {
+                column: np.shares_memory(df[column].to_numpy(), block)
+                for column in zero_copy_columns(df)
+            },
+            "frame": df.copy(),
+        }
+    del frames, df, block
+    detach(handle)
+    return result
+
+
+@pytest.fixture(scope="module")
+def merged():
+    processed = process_all_data(load_all_csvs(DATA_DIR, verbose=False))
+    return create_merged_data(processed)
+
+
+def test_shared_frames_in_spawned_worker(merged):
+    shared = SharedFrames(merged)
+    name = shared.handle.name
+    try:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            result = pool.submit(inspect_shared, shared.handle).result()
+    finally:
+        shared.close()
+
+    assert sorted(result) == sorted(merged)
+    for year, df in merged.items():
+        assert result[year]["shared"]
+        assert all(result[year]["shared"].values())
+        pd.testing.assert_frame_equal(result[year]["frame"], df)
+
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
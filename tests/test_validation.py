@@ -0,0 +1,81 @@
+import os
+
+import pandas as pd
+import pytest
+
+from src import validation
+from src.ingestion import load_csv
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "MATAN")
+
+# Columns of MA1_2024: id, ISVU Bodovi/Ocjena/Rok, then points, pass flag and
+# date of each exam, starting with Kontinuirana nastava and Zimski rok
+GOOD_ROW = (
+    '"{id}";65.0;3.0;"2025-02-10";65;"DA ";"2025-02-19";0.0;"";"2024-09-25"'
+    + ';0.0;"";"2024-09-25"' * 3
+)
+
+# id -> {column index: value} turning a good row into one failing `check`
+BAD_ROWS = {
+    "missing_id": ("", {}),
+    "duplicate_id": ("dup", {}),
+    "invalid_points": ("invalid", {7: "abc"}),
+    "points_out_of_range": ("range", {7: "150"}),
+    "pass_without_points": ("nopoints", {4: "0"}),
+    "invalid_grade": ("grade", {2: "7.0"}),
+    "grade_without_points": ("gradeonly", {1: ""}),
+    "grade_points_mismatch": ("mismatch", {2: "5.0"}),
+    "pass_dates_out_of_order": ("order", {7: "70", 8: '"DA"'}),
+}
+
+
+def make_row(student_id, changes):
+    values = GOOD_ROW.format(id=student_id).split(";")
+    for column, value in changes.items():
+        values[column] = value
+    return ";".join(values)
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    with open(os.path.join(DATA_DIR, "MA1_2024_clean.csv"), encoding="utf-8") as f:
+        lines = f.read().splitlines()[:6]
+    for student_id, changes in BAD_ROWS.values():
+        lines.append(make_row(student_id, changes))
+    # Both copies of a repeated id fail duplicate_id
+    lines.append(make_row("dup", {}))
+
+    path = tmp_path / "MA1_2024_clean.csv"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("check", validation.CHECKS)
+def test_check_frame(csv_path, check):
+    df = load_csv(csv_path, verbose=False)
+    masks = validation.check_frame(df, 2024)
+
+    student_id = BAD_ROWS[check][0]
+    expected = df["id"].isna() if student_id == "" else df["id"] == student_id
+    assert masks[check].tolist() == expected.tolist()
+    # Each bad row fails only its own check
+    assert masks[expected.to_numpy()].drop(columns=check).sum().sum() == 0
+    assert df.attrs["quality"][check] == expected.sum()
+
+
+def test_quarantine_file(csv_path, tmp_path):
+    directory = str(tmp_path / "quarantine")
+    validation.start_quarantine(directory)
+    try:
+        df = load_csv(csv_path, verbose=False)
+    finally:
+        counts = validation.stop_quarantine()
+
+    assert len(df) == 5
+    assert validation.check_frame(df, 2024).to_numpy().sum() == 0
+    assert counts == {("MA1", 2024): len(BAD_ROWS) + 1}
+
+    rejected = pd.read_csv(os.path.join(directory, "MA1_2024_quarantine.csv"))
+    assert rejected["violations"].value_counts().to_dict() == {
+        check: 2 if check == "duplicate_id" else 1 for check in validation.CHECKS
+    }
@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.ingestion import load_all_csvs
+from src.processing import process_all_data
+from src.whatif import GRADES, shifted_boundary_grid, student_points, threshold_sweep
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "MATAN")
+
+
+@pytest.fixture(scope="module")
+def processed():
+    data = load_all_csvs(DATA_DIR, verbose=False)
+    return process_all_data(data)
+
+
+@pytest.mark.parametrize(
+    "boundary_sets",
+    [
+        shifted_boundary_grid(),
+        # Outside the 0-100 point range: everyone passes / nobody passes
+        [[-20, -10, -5, 0], [50, 60, 1000, 2500]],
+        # Fractional boundaries equal to students' points, next to a
+        # negative set
+        [[3.3, 8.3, 46.7, 87.9], [-7.3, 0, 6.67, 33.3], [50.1, 60.2, 70.3, 80.4]],
+    ],
+)
+def test_threshold_sweep_counts(processed, boundary_sets):
+    boundary_sets = np.atleast_2d(boundary_sets)
+    sweep = threshold_sweep(processed, boundary_sets)
+
+    for row in sweep.itertuples():
+        points = student_points(processed[row.course][row.year])
+        above = [(points >= b).sum() for b in boundary_sets[row.set]]
+        assert row.passed == above[0]
+        for i, grade in enumerate(GRADES):
+            expected = above[i] - (above[i + 1] if i + 1 < len(GRADES) else 0)
+            assert getattr(row, f"grade_{grade}") == expected
+
+
+def test_threshold_sweep_rejects_non_finite(processed):
+    with pytest.raises(ValueError):
+        threshold_sweep(processed, [[50, 60, np.inf, 90]])